@@ -0,0 +1,119 @@
+"""
+Generates reproducible synthetic source trees to benchmark ratchet against.
+"""
+
+import dataclasses
+import pathlib
+import random
+from collections.abc import Mapping, Sequence
+
+
+# The codes that generated suppressions use, by the tool that counts them.
+CODES: Mapping[str, Sequence[str]] = {
+    "noqa": ("F401", "E501", "B008", "N802", "C901"),
+    "fixit": ("NoAssertTrueForComparisons", "UseFstring"),
+    "mypy": ("assignment", "arg-type", "no-untyped-def"),
+}
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class TreeSpec:
+    """
+    The shape of a synthetic source tree.
+
+    `files` python files of `lines` lines each are spread evenly over directories nested
+    `depth` levels deep, `fanout` subdirectories wide. `comment_density` is the fraction
+    of lines that have a plain comment and `suppression_density` the fraction that have a
+    `# noqa:`, `# lint-fixme:` or `# type: ignore[...]` suppression. The same spec and
+    `seed` always generate the same tree.
+    """
+
+    files: int
+    lines: int
+    depth: int = 3
+    fanout: int = 4
+    comment_density: float = 0.1
+    suppression_density: float = 0.02
+    seed: int = 0
+
+
+SCENARIOS: Mapping[str, TreeSpec] = {
+    # A large project with lots of small modules and a typical amount of suppressions.
+    "monorepo": TreeSpec(files=1000, lines=100),
+    # A handful of very large generated modules, such as migrations or protobuf stubs.
+    "generated": TreeSpec(
+        files=2, lines=25_000, depth=0, comment_density=0.01, suppression_density=0.001
+    ),
+    # A single chain of deeply nested directories, with a module at every level.
+    "deep": TreeSpec(files=500, lines=20, depth=500, fanout=1),
+    # A project without any suppressions, so no file needs its comments extracted.
+    "clean": TreeSpec(files=1000, lines=100, suppression_density=0.0),
+}
+
+
+def generate_tree(root: pathlib.Path, spec: TreeSpec) -> list[pathlib.Path]:
+    """
+    Generate the tree for `spec` under `root`, returning the paths of the python files.
+    """
+    rng = random.Random(spec.seed)
+    directories = _directories(root, spec)
+    paths = []
+    for i in range(spec.files):
+        directory = directories[i % len(directories)]
+        path = directory / f"module_{i}.py"
+        path.write_text(_module(rng, spec))
+        paths.append(path)
+    return paths
+
+
+def _directories(root: pathlib.Path, spec: TreeSpec) -> list[pathlib.Path]:
+    """
+    Create the directories of the tree, parents first, returning the ones that hold files.
+    """
+    root.mkdir(parents=True, exist_ok=True)
+    levels = [[root]]
+    for _ in range(spec.depth):
+        level = []
+        for parent in levels[-1]:
+            for j in range(spec.fanout):
+                child = parent / f"p{j}"
+                child.mkdir(exist_ok=True)
+                level.append(child)
+                # Wide trees would otherwise grow to fanout ** depth directories.
+                if len(level) >= spec.files:
+                    break
+        levels.append(level)
+    return levels[-1] if spec.fanout > 1 else [level[0] for level in levels]
+
+
+def _module(rng: random.Random, spec: TreeSpec) -> str:
+    lines = ['"""', "A generated module. # Not a comment.", '"""', "import os", ""]
+    for i in range(spec.lines - len(lines)):
+        line = rng.choice(_STATEMENTS).format(i=i)
+        roll = rng.random()
+        if roll < spec.suppression_density:
+            line += _suppression(rng)
+        elif roll < spec.suppression_density + spec.comment_density:
+            line += "  # A comment explaining the line above."
+        lines.append(line)
+    return "\n".join(lines) + "\n"
+
+
+def _suppression(rng: random.Random) -> str:
+    tool = rng.choice(list(CODES))
+    codes = ", ".join(rng.sample(CODES[tool], rng.randint(1, 2)))
+    if tool == "noqa":
+        return f"  # noqa: {codes}"
+    if tool == "fixit":
+        return f"  # lint-fixme: {codes}"
+    return f"  # type: ignore[{codes}]"
+
+
+_STATEMENTS = (
+    "value_{i} = {i} * 2",
+    "name_{i} = 'string #{i} with a hash'",
+    'template_{i} = f"{{os.sep}}#{i}"',
+    "items_{i} = [os.path.join('a', 'b') for _ in range({i})]",
+    "def function_{i}(argument): return argument",
+    "mapping_{i} = {{'key': {i}, 'other': \"#\"}}",
+)
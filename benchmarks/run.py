@@ -0,0 +1,269 @@
+"""
+Times each stage of checking a synthetic tree, and the `ratchet check` command as a whole.
+
+Usage:
+
+    python -m benchmarks.run                                  # Print the results
+    python -m benchmarks.run -o base.json                     # Also write them to a file
+    python -m benchmarks.run --compare --baseline base.json   # Fail if throughput regressed
+
+Throughput depends on the machine and on whatever else it's running, so a baseline is only
+comparable when it was recorded in the same job. The `benchmarks` Nox session records one
+from the base branch before running the benchmarks for the checkout.
+"""
+
+import dataclasses
+import io
+import json
+import pathlib
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Callable, Mapping, Sequence
+
+import click
+
+from lint_ratchet import check, configuration, parsing
+from lint_ratchet.checkers import Checkers, get_checkers
+
+from . import generate
+
+
+RESULTS_FORMAT = 1
+
+# How much slower than the baseline a stage may be before it counts as a regression.
+DEFAULT_MAX_REGRESSION = 0.25
+
+# Stages that took less than this in the baseline are too noisy to compare.
+MIN_COMPARED_SECONDS = 0.01
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class StageResult:
+    seconds: float
+    files: int
+    bytes: int
+
+    @property
+    def mb_per_second(self) -> float:
+        return self.bytes / self.seconds / 1_000_000 if self.seconds else float("inf")
+
+    def to_json(self) -> dict[str, float]:
+        return {
+            "seconds": round(self.seconds, 6),
+            "files": self.files,
+            "bytes": self.bytes,
+            "mb_per_second": round(self.mb_per_second, 3),
+        }
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class Regression:
+    scenario: str
+    stage: str
+    baseline: float
+    current: float
+
+    def __str__(self) -> str:
+        return f"{self.scenario}.{self.stage}: {self.current:.3f} MB/s < {self.baseline:.3f} MB/s"
+
+
+def config_for(check_dir: pathlib.Path) -> configuration.Config:
+    """
+    Return a configuration that counts every code the generator uses.
+    """
+    rules = [
+        configuration.Rule(configuration.Tool(tool), code, 10**9)
+        for tool, codes in generate.CODES.items()
+        for code in codes
+    ]
+    return configuration.Config(path=check_dir, rules=rules, excluded_folders=[])
+
+
+def run_scenario(
+    root: pathlib.Path, spec: generate.TreeSpec, repeat: int
+) -> dict[str, StageResult]:
+    """
+    Generate the tree for `spec` under `root` and time each stage of checking it.
+
+    Each stage is run `repeat` times and the fastest run is kept, as it is the one least
+    disturbed by everything else running on the machine.
+    """
+    paths = generate.generate_tree(root, spec)
+    config = config_for(pathlib.Path("."))
+    with (root / ".ratchet.toml").open("w") as fp:
+        configuration.write_configuration(config, fp)
+
+    sources = [path.read_bytes() for path in paths]
+    total_bytes = sum(len(source) for source in sources)
+    comments = [list(parsing.extract_comments_fast(io.BytesIO(source))) for source in sources]
+    checkers = Checkers(get_checkers(config.rules))
+
+    def walk() -> object:
+        return list(check.walk(root, config.excluder))
+
+    def read() -> object:
+        return [path.read_bytes() for path in paths]
+
+    def extract(engine: parsing.Engine) -> Callable[[], object]:
+        extractor = parsing.get_extractor(engine)
+        return lambda: [list(extractor(io.BytesIO(source))) for source in sources]
+
+    def count() -> object:
+        return [checkers.check(file_comments) for file_comments in comments]
+
+    def check_recursive(engine: parsing.Engine) -> Callable[[], object]:
+        engine_config = dataclasses.replace(config, engine=engine)
+        return lambda: list(check.check_recursive(root, engine_config, jobs=1))
+
+    def cli() -> object:
+        return subprocess.run(
+            [sys.executable, "-m", "lint_ratchet", "--root", str(root), "check"],
+            check=True,
+            capture_output=True,
+        )
+
+    stages: Mapping[str, Callable[[], object]] = {
+        "walk": walk,
+        "read": read,
+        "extract[tokenize]": extract("tokenize"),
+        "extract[fast]": extract("fast"),
+        "count": count,
+        "check_recursive[tokenize]": check_recursive("tokenize"),
+        "check_recursive[fast]": check_recursive("fast"),
+        "cli": cli,
+    }
+    return {
+        stage: StageResult(_best_time(function, repeat), len(paths), total_bytes)
+        for stage, function in stages.items()
+    }
+
+
+def compare(
+    baseline: Mapping[str, Mapping[str, Mapping[str, float]]],
+    results: Mapping[str, Mapping[str, StageResult]],
+    max_regression: float,
+) -> list[Regression]:
+    """
+    Return the stages whose throughput dropped more than `max_regression` below the baseline.
+
+    Stages and scenarios that aren't in the baseline, or that were too quick in the baseline
+    to time reliably, are ignored.
+    """
+    regressions = []
+    for scenario, stages in results.items():
+        for stage, result in stages.items():
+            expected = baseline.get(scenario, {}).get(stage)
+            if expected is None or expected["seconds"] < MIN_COMPARED_SECONDS:
+                continue
+            if result.mb_per_second < expected["mb_per_second"] * (1 - max_regression):
+                regressions.append(
+                    Regression(scenario, stage, expected["mb_per_second"], result.mb_per_second)
+                )
+    return regressions
+
+
+def read_results(path: pathlib.Path) -> dict[str, dict[str, dict[str, float]]]:
+    with path.open() as fp:
+        data = json.load(fp)
+    if data.get("format") != RESULTS_FORMAT:
+        raise click.ClickException(f"{path} has an unsupported format, update the baseline")
+    results: dict[str, dict[str, dict[str, float]]] = data["results"]
+    return results
+
+
+def write_results(path: pathlib.Path, results: Mapping[str, Mapping[str, StageResult]]) -> None:
+    data = {
+        "format": RESULTS_FORMAT,
+        "python": ".".join(map(str, sys.version_info[:3])),
+        "results": {
+            scenario: {stage: result.to_json() for stage, result in stages.items()}
+            for scenario, stages in results.items()
+        },
+    }
+    path.write_text(json.dumps(data, indent=2) + "\n")
+
+
+def _best_time(function: Callable[[], object], repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def _print_results(scenario: str, results: Mapping[str, StageResult]) -> None:
+    click.echo(scenario)
+    for stage, result in results.items():
+        click.echo(
+            f"  {stage:<28}{result.seconds * 1000:>10.1f} ms{result.mb_per_second:>10.2f} MB/s"
+        )
+
+
+@click.command()
+@click.option(
+    "--scenario",
+    "-s",
+    "scenarios",
+    multiple=True,
+    type=click.Choice(list(generate.SCENARIOS)),
+    help="The scenarios to run. Defaults to all of them.",
+)
+@click.option("--repeat", "-r", default=3, show_default=True, help="Runs per stage.")
+@click.option(
+    "--output",
+    "-o",
+    type=click.Path(dir_okay=False, path_type=pathlib.Path),
+    help="Write the results to this file.",
+)
+@click.option(
+    "--baseline",
+    type=click.Path(exists=True, dir_okay=False, path_type=pathlib.Path),
+    help="The results file to compare against, written with `--output` in the same job.",
+)
+@click.option(
+    "--compare", "compare_", is_flag=True, help="Fail if any stage regressed from the baseline."
+)
+@click.option(
+    "--max-regression",
+    type=click.FloatRange(0, 1),
+    default=DEFAULT_MAX_REGRESSION,
+    show_default=True,
+    help="The fraction of the baseline throughput a stage may lose before it fails.",
+)
+def main(
+    scenarios: Sequence[str],
+    repeat: int,
+    output: pathlib.Path | None,
+    baseline: pathlib.Path | None,
+    compare_: bool,
+    max_regression: float,
+) -> None:
+    if compare_ and baseline is None:
+        raise click.UsageError("--compare needs a --baseline to compare against")
+
+    results: dict[str, dict[str, StageResult]] = {}
+    for scenario in scenarios or generate.SCENARIOS:
+        with tempfile.TemporaryDirectory(prefix=f"ratchet-{scenario}-") as tmp:
+            results[scenario] = run_scenario(
+                pathlib.Path(tmp), generate.SCENARIOS[scenario], repeat
+            )
+        _print_results(scenario, results[scenario])
+
+    if output is not None:
+        write_results(output, results)
+
+    if compare_:
+        assert baseline is not None
+        regressions = compare(read_results(baseline), results, max_regression)
+        for regression in regressions:
+            click.secho(f"regressed: {regression}", fg="red")
+        if regressions:
+            raise click.ClickException(f"{len(regressions)} stages regressed")
+        click.secho("No stages regressed", fg="green", err=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,6 @@
+import argparse
 import os
+import pathlib
 
 import nox
 
@@ -24,3 +26,45 @@ def tests(session: nox.Session) -> None:
         commands.append(f"--junitxml=test-results/junit.{session.python}.xml")
 
     session.run(*commands, *session.posargs)
+
+
+@nox.session(python="3.11")
+def benchmarks(session: nox.Session) -> None:
+    """
+    Run the benchmarks on the base branch and then on this checkout, failing if any stage
+    of this checkout is slower than the base branch allows.
+
+    Both are run in this session, so they're timed on the same machine under the same load.
+    If the base branch has no benchmarks yet, this checkout is run without comparing it.
+    Pass `--base REV` to compare against another git revision than `origin/main`. Other
+    arguments, such as `--max-regression` or `--scenario`, are passed to `benchmarks.run`.
+    """
+    parser = argparse.ArgumentParser(prog="nox -s benchmarks --")
+    parser.add_argument("--base", default="origin/main")
+    options, args = parser.parse_known_args(session.posargs)
+
+    tmp = pathlib.Path(session.create_tmp()).resolve()
+    worktree = tmp / "base"
+    baseline = tmp / "baseline.json"
+    session.install("-r", "requirements/development.txt")
+
+    # The base branch is benchmarked with its own copy of the benchmarks, so that both
+    # match the code they time.
+    session.run(
+        "git", "worktree", "add", "--force", "--detach", str(worktree), options.base, external=True
+    )
+    has_baseline = (worktree / "benchmarks" / "run.py").exists()
+    try:
+        if has_baseline:
+            session.install("--force-reinstall", "--no-deps", str(worktree))
+            with session.chdir(worktree):
+                session.run("python", "-m", "benchmarks.run", "--output", str(baseline), *args)
+        else:
+            session.log(f"{options.base} has no benchmarks, so there's no baseline to compare")
+    finally:
+        session.run("git", "worktree", "remove", "--force", str(worktree), external=True)
+
+    session.install("--force-reinstall", "--no-deps", ".")
+    if has_baseline:
+        args = ["--compare", "--baseline", str(baseline), *args]
+    session.run("python", "-m", "benchmarks.run", *args)
@@ -11,13 +11,34 @@ The mapping of lint codes to violation counts are stored in the .ratchet.toml fi
 
 Usage:
 
+    ratchet init            # Write a ratchet file with every lint code in use and its count
     ratchet add noqa F401   # Add a new lint code to the ratchet file
     ratchet crank           # Periodically recompute the violation counts, writing the results back if lower
     ratchet check           # Check for new violations and enforce the ratchet
+    ratchet daemon          # Keep the violation counts up to date in the background
+    ratchet check --daemon  # Check using the counts kept by the daemon
+    ratchet check --roots-from roots.txt  # Check many projects in one shared worker pool
 
+Many projects can also be checked from asyncio code with `await check_async(root)`.
 """
 
-import importlib.metadata
+from typing import TYPE_CHECKING
 
 
-__version__ = importlib.metadata.version("lint_ratchet")
+if TYPE_CHECKING:
+    from .batch import check_async as check_async
+
+
+def __getattr__(name: str) -> object:
+    # The version is only looked up when it's used, as importlib.metadata is slow to import
+    # and most runs never need it.
+    if name == "__version__":
+        import importlib.metadata
+
+        return importlib.metadata.version("lint_ratchet")
+    # Likewise asyncio, which only the async API needs.
+    if name == "check_async":
+        from .batch import check_async
+
+        return check_async
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
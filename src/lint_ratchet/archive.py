@@ -0,0 +1,113 @@
+"""
+Reads the python files of source archives, such as sdists, wheels and release tarballs,
+without extracting them.
+"""
+
+import pathlib
+import posixpath
+import tarfile
+import zipfile
+from collections.abc import Iterable, Iterator
+
+from .check import tree_path_filter
+from .configuration import Config
+
+
+class ArchiveError(Exception):
+    pass
+
+
+def read_sources(archive: pathlib.Path, config: Config) -> Iterator[tuple[str, bytes]]:
+    """
+    Yield the path and contents of each python file in a tar or zip archive that's checked
+    by `config`, in the order they're stored.
+
+    `config.path` is the checked directory relative to the project, and the paths yielded
+    are relative to it, separated by `/`. Archives such as sdists keep the project in a
+    single top-level directory, like `pkg-1.0/`, which is left out of member names unless
+    `config.path` starts with it. Raises ArchiveError if no file is in `config.path`.
+
+    Tar archives, compressed or not, are read as a single stream, and only one file is held
+    in memory at a time, however large the archive is. As the names of later members aren't
+    known yet, the top-level directory is taken from the first file. Once a file outside of
+    it is found, the archive has no common top-level directory, and the names of the files
+    that follow are used as they are.
+    """
+    is_checked = tree_path_filter(config)
+    prefix = posixpath.normpath(config.path.as_posix())
+    prefix = "" if prefix == "." else f"{prefix}/"
+    matched = False
+
+    def checked_path(name: str, top: str) -> str | None:
+        nonlocal matched
+        safe_name = _safe_name(name)
+        if safe_name is None or not safe_name.startswith(top):
+            return None
+        name = safe_name[len(top) :]
+        if not name.startswith(prefix):
+            return None
+        matched = True
+        path = name[len(prefix) :]
+        return path if is_checked(path) else None
+
+    try:
+        if zipfile.is_zipfile(archive):
+            with zipfile.ZipFile(archive) as zip_file:
+                infos = [info for info in zip_file.infolist() if not info.is_dir()]
+                top = _top_directory((info.filename for info in infos), prefix)
+                for info in infos:
+                    if path := checked_path(info.filename, top):
+                        yield path, zip_file.read(info)
+        else:
+            # The `|` mode reads the members in order without seeking, so the archive is
+            # decompressed once, as it's read, and needn't be seekable.
+            with tarfile.open(archive, "r|*") as tar_file:
+                streamed_top: str | None = None
+                for member in tar_file:
+                    if not member.isfile():
+                        continue
+                    streamed_top = _streamed_top(member.name, streamed_top, prefix)
+                    if path := checked_path(member.name, streamed_top or ""):
+                        file_like = tar_file.extractfile(member)
+                        assert file_like is not None
+                        yield path, file_like.read()
+    except (tarfile.TarError, zipfile.BadZipFile, EOFError, OSError) as e:
+        raise ArchiveError(f"Could not read {archive} as a tar or zip archive: {e}") from e
+    if not matched:
+        raise ArchiveError(f"{archive} has no files in {config.path}")
+
+
+def _safe_name(name: str) -> str | None:
+    # Members that would be extracted outside of the archive's directory are never checked.
+    name = posixpath.normpath(name)
+    return None if name.startswith(("/", "../")) or name == ".." else name
+
+
+def _streamed_top(name: str, top: str | None, prefix: str) -> str | None:
+    """
+    Return the top-level directory to leave out of the file `name`, given `top`, the one
+    of the files before it, or None if it's the first.
+    """
+    if (safe_name := _safe_name(name)) is None:
+        return top
+    if top is None:
+        return _top_directory([safe_name], prefix)
+    return top if safe_name.startswith(top) else ""
+
+
+def _top_directory(names: Iterable[str], prefix: str) -> str:
+    """
+    Return the directory that every file in the archive is in, with a trailing `/`, or ""
+    if there isn't one or `prefix` already starts with it.
+    """
+    top = None
+    for name in names:
+        if (safe_name := _safe_name(name)) is None:
+            continue
+        directory, separator, _ = safe_name.partition("/")
+        if not separator or top not in (None, directory):
+            return ""
+        top = directory
+    if top is None or prefix.startswith(f"{top}/"):
+        return ""
+    return f"{top}/"
@@ -0,0 +1,158 @@
+"""
+Checks the projects of many repositories in one process, with the files of every project
+checked by a single shared pool of worker processes, so the cost of starting ratchet and
+its workers is only paid once.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import itertools
+import os
+import pathlib
+from collections.abc import AsyncIterator, Iterable, Iterator, Sequence
+from typing import TYPE_CHECKING, Any, Literal
+
+from . import check as check_module
+from . import configuration
+from .usecases import CheckResult
+
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
+    from .checkers import Violation
+
+
+# The number of files sent to a worker process in a single task. This is smaller than the
+# chunks of a single check, so that the projects sharing the pool take turns more often.
+BATCH_CHUNK_SIZE = 64
+
+# How many chunks of one project may be queued or running in the shared pool at once, so a
+# large project can't keep the others waiting.
+DEFAULT_PROJECT_LIMIT = 4
+
+# How many projects `check_many` checks at once. Each holds the paths of its files and its
+# counts in memory until it's finished.
+DEFAULT_MAX_PROJECTS = 16
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class ProjectResult:
+    """
+    The results of one of the projects checked by `check_many`, or why it couldn't be
+    checked.
+    """
+
+    root: pathlib.Path
+    results: Sequence[CheckResult] = ()
+    error: str | None = None
+
+    @property
+    def failure(self) -> bool:
+        return self.error is not None or any(result.failure for result in self.results)
+
+    def to_json(self) -> dict[str, Any]:
+        data: dict[str, Any] = {"root": str(self.root), "failure": self.failure}
+        if self.error is not None:
+            data["error"] = self.error
+            return data
+        data["results"] = [
+            {
+                "tool": result.rule.tool.value,
+                "code": result.rule.code,
+                "violation_count": result.rule.violation_count,
+                "path": result.rule.path,
+                "new_count": result.new_count,
+                "failure": result.failure,
+            }
+            for result in self.results
+        ]
+        return data
+
+
+async def check_async(
+    root: pathlib.Path,
+    executor: Executor | None = None,
+    limit: int = DEFAULT_PROJECT_LIMIT,
+) -> list[CheckResult]:
+    """
+    Check the project whose .ratchet.toml is in `root`, returning the result of each rule.
+
+    The files are checked in `executor`, at most `limit` chunks of them at a time, so that
+    several projects can be checked at once in a pool such as `check.process_pool`.
+    Without an executor, they're checked in the event loop's default executor, which is a
+    pool of threads.
+    """
+    loop = asyncio.get_running_loop()
+    config = await asyncio.to_thread(configuration.open_configuration, root)
+    check_dir = root / config.path
+    paths = await asyncio.to_thread(_find_paths, check_dir, config)
+    counts = configuration.ProjectCounts(config, os.path.join(check_dir, ""))
+    slots = asyncio.Semaphore(limit)
+
+    async def check_chunk(chunk: list[str]) -> None:
+        async with slots:
+            violations: list[list[Violation]] = await loop.run_in_executor(
+                executor, check_module.check_paths, chunk, config.rules, config.engine
+            )
+        # Chunks finish on the event loop's thread, so they can't add to the counts at once.
+        for path, file_violations in zip(chunk, violations):
+            counts.add(path, file_violations)
+
+    tasks = [asyncio.ensure_future(check_chunk(chunk)) for chunk in _chunks(paths)]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        # Don't leave the rest of the project's chunks waiting for the pool.
+        for task in tasks:
+            task.cancel()
+        raise
+    return [CheckResult(rule, counts[rule]) for rule in config.rules]
+
+
+async def check_many(
+    roots: Iterable[pathlib.Path],
+    jobs: int | Literal["auto"] = "auto",
+    limit: int = DEFAULT_PROJECT_LIMIT,
+    max_projects: int = DEFAULT_MAX_PROJECTS,
+) -> AsyncIterator[ProjectResult]:
+    """
+    Check the project in each root with one shared pool of `jobs` worker processes,
+    yielding the results of each project as soon as it's finished.
+
+    At most `max_projects` are checked at once, with at most `limit` chunks of each in
+    the pool. A project that can't be checked, such as one without a configuration, is
+    yielded with its error rather than stopping the others.
+    """
+    executor = check_module.process_pool(check_module.resolve_jobs(jobs))
+    projects = asyncio.Semaphore(max_projects)
+
+    async def check_project(root: pathlib.Path) -> ProjectResult:
+        async with projects:
+            try:
+                return ProjectResult(root, await check_async(root, executor, limit))
+            except Exception as e:
+                return ProjectResult(root, error=str(e) or repr(e))
+
+    tasks = [asyncio.ensure_future(check_project(root)) for root in roots]
+    try:
+        for task in asyncio.as_completed(tasks):
+            yield await task
+    finally:
+        for task in tasks:
+            task.cancel()
+        executor.shutdown(cancel_futures=True)
+
+
+def _find_paths(check_dir: pathlib.Path, config: configuration.Config) -> list[str]:
+    if not check_dir.exists():
+        raise configuration.ProjectFileNotFoundError(f"Path {check_dir} does not exist")
+    return [entry.path for entry in check_module.find_files(check_dir, config)]
+
+
+def _chunks(paths: list[str]) -> Iterator[list[str]]:
+    iterator = iter(paths)
+    while chunk := list(itertools.islice(iterator, BATCH_CHUNK_SIZE)):
+        yield chunk
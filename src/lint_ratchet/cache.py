@@ -0,0 +1,213 @@
+import hashlib
+import itertools
+import json
+import os
+import pathlib
+from collections.abc import Iterator, Sequence
+from typing import Any
+
+from .checkers import Violation
+from .configuration import Rule, Tool
+from .plugins import plugin_version
+
+
+CACHE_FILE_NAME = "results.json"
+
+# Bump when the layout of the cache file changes.
+CACHE_FORMAT = 3
+
+# The maximum number of files remembered between runs.
+MAX_ENTRIES = 500_000
+
+Fingerprint = tuple[int, int, int]
+
+
+def fingerprint(stat: os.stat_result) -> Fingerprint:
+    """
+    Return the parts of a stat result that change whenever a file's contents change.
+    """
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+
+def ruleset_digest(rules: Sequence[Rule]) -> str:
+    """
+    Return a digest of everything that affects the violations produced for a file.
+
+    Only the tools and codes of the rules, and the versions of the plugins of their tools,
+    matter. Violation counts can change freely without invalidating the cache.
+    """
+    from . import __version__
+
+    digest = hashlib.sha256()
+    digest.update(f"{CACHE_FORMAT}:{__version__}".encode())
+    for tool, code in sorted({(rule.tool.value, rule.code) for rule in rules}):
+        digest.update(f"\0{tool}\0{code}".encode())
+    for tool in sorted({rule.tool for rule in rules if not rule.tool.builtin}):
+        digest.update(f"\0{tool.value}@{plugin_version(tool.value)}".encode())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    Per-file violations from a previous run, loaded from and saved to `cache_dir`.
+
+    Files are keyed by their path and a fingerprint of their stat result. Files whose
+    fingerprint is unchanged reuse their cached violations rather than being read and
+    tokenized again.
+
+    Only files that were looked up or stored during this run are written back by `save`,
+    so files that have since been deleted are pruned automatically.
+
+    A cache is `complete` when it was saved after a scan of the whole project, and so
+    can serve as the baseline for checking only the files that have changed since.
+    `revision` is the git commit that the project was at when the baseline was saved, if
+    it's in a repository, so that files committed since can be found.
+    """
+
+    def __init__(
+        self, cache_dir: pathlib.Path, rules: Sequence[Rule], max_entries: int = MAX_ENTRIES
+    ) -> None:
+        self.cache_dir = cache_dir
+        self.digest = ruleset_digest(rules)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.complete = False
+        self.revision: str | None = None
+        self._previous: dict[str, list[Any]] = {}
+        self._current: dict[str, list[Any]] = {}
+        self._load()
+
+    def __len__(self) -> int:
+        """
+        Return the number of files that will be written back by `save`.
+        """
+        return len(self._current)
+
+    @property
+    def cache_file(self) -> pathlib.Path:
+        return self.cache_dir / CACHE_FILE_NAME
+
+    def get(self, path: str, stat: os.stat_result, lines: bool = False) -> list[Violation] | None:
+        """
+        Return the cached violations for `path`, or None if it has changed or is unknown.
+
+        With `lines`, entries that were cached without the lines of their violations are
+        treated as unknown too.
+        """
+        entry = self._previous.get(path)
+        if (
+            entry is None
+            or tuple(entry[:3]) != fingerprint(stat)
+            or (lines and not all(len(violation) > 3 for violation in entry[3]))
+        ):
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._current[path] = entry
+        return [load_violation(violation) for violation in entry[3]]
+
+    def put(self, path: str, stat: os.stat_result, violations: Sequence[Violation]) -> None:
+        """
+        Remember the violations found in `path`.
+        """
+        self._current[path] = [
+            *fingerprint(stat),
+            [dump_violation(violation) for violation in violations],
+        ]
+
+    def discard(self, path: str) -> None:
+        """
+        Forget everything known about `path`, such as when it has been deleted.
+        """
+        self._previous.pop(path, None)
+        self._current.pop(path, None)
+
+    def keep_unseen(self) -> None:
+        """
+        Keep the files that weren't looked up during this run when the cache is saved.
+        """
+        for path, entry in self._previous.items():
+            self._current.setdefault(path, entry)
+
+    def unseen(self) -> list[str]:
+        """
+        Return the files from the previous run that haven't been looked up or stored yet.
+        """
+        return [path for path in self._previous if path not in self._current]
+
+    def violations(self) -> Iterator[Violation]:
+        """
+        Yield the violations for every file that will be written back by `save`.
+        """
+        for entry in self._current.values():
+            for violation in entry[3]:
+                yield load_violation(violation)
+
+    def files(self) -> Iterator[tuple[str, list[Violation]]]:
+        """
+        Yield the violations of each file that will be written back by `save`.
+        """
+        for path, entry in self._current.items():
+            yield path, [load_violation(violation) for violation in entry[3]]
+
+    def save(self) -> None:
+        """
+        Atomically write the files seen during this run back to the cache directory.
+        """
+        files = dict(itertools.islice(self._current.items(), self.max_entries))
+        complete = self.complete and len(files) == len(self._current)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        gitignore = self.cache_dir / ".gitignore"
+        if not gitignore.exists():
+            gitignore.write_text("# Created by lint_ratchet automatically.\n*\n")
+
+        # Imported here as tempfile is slow to import, and only needed when saving.
+        import tempfile
+
+        fd, tmp_name = tempfile.mkstemp(dir=self.cache_dir, prefix=CACHE_FILE_NAME, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as fp:
+                json.dump(
+                    {
+                        "digest": self.digest,
+                        "complete": complete,
+                        "revision": self.revision if complete else None,
+                        "files": files,
+                    },
+                    fp,
+                    separators=(",", ":"),
+                )
+            os.replace(tmp_name, self.cache_file)
+        except BaseException:
+            os.unlink(tmp_name)
+            raise
+
+    def _load(self) -> None:
+        try:
+            with self.cache_file.open("rb") as fp:
+                data = json.load(fp)
+        except (OSError, ValueError):
+            return
+        if isinstance(data, dict) and data.get("digest") == self.digest:
+            self._previous = data.get("files", {})
+            self.complete = data.get("complete", False)
+            self.revision = data.get("revision")
+
+
+def dump_violation(violation: Violation) -> list[Any]:
+    """
+    Return a violation as JSON, with its lines if it has them.
+    """
+    dumped: list[Any] = [violation.tool.value, violation.rule, violation.count]
+    if violation.lines:
+        dumped.append(violation.lines)
+    return dumped
+
+
+def load_violation(violation: list[Any]) -> Violation:
+    """
+    Return the violation from its JSON, written by `dump_violation`.
+    """
+    tool, rule, count, *lines = violation
+    return Violation(tool=Tool(tool), rule=rule, count=count, lines=tuple(*lines))
@@ -1,14 +1,62 @@
+from __future__ import annotations
+
+import collections
 import io
+import itertools
 import os
 import pathlib
-from collections.abc import Collection, Iterable, Iterator, Set
+import queue
+import threading
+import time
+from collections.abc import Callable, Generator, Iterable, Iterator, Sequence, Set
+from typing import TYPE_CHECKING, Generic, Literal, TypeVar
+
+from .checkers import Checker, Checkers, Violation, get_checkers
+from .configuration import Config, Rule
+from .exclude import GITIGNORE, Excluder
+from .parsing import Engine, get_extractor, get_line_extractor
+from .stats import FileStats, Stats, phase
+
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+
+    from .cache import ResultCache
+    from .content_cache import ContentCache
+
+
+# Below this many files the cost of starting worker processes outweighs the time saved by
+# checking files in parallel, so the serial path is used regardless of the requested jobs.
+PARALLEL_MIN_FILES = 500
+
+# The upper bound on the number of paths sent to a worker process in a single task.
+MAX_CHUNK_SIZE = 256
+
+# The number of threads that read files ahead of them being checked, and how many files
+# they may read ahead.
+READAHEAD_THREADS = 4
+READAHEAD_DEPTH = 64
+
+# How many batches of paths the directory walker may find ahead of them being checked.
+WALK_QUEUE_SIZE = 64
+WALK_BATCH_SIZE = 128
+
+_T = TypeVar("_T")
+
+# A file found by the walk, with its cached violations if it is unchanged.
+_Lookup = tuple[os.DirEntry[str], list[Violation] | None]
 
-from .checkers import Checker, Violation, get_checkers
-from .configuration import Config
-from .parsing import extract_comments
+# The violations found in a file checked by a worker process, and how long it took.
+_ChunkResult = tuple[list[Violation], FileStats | None]
+_ChunkResults = tuple[list[_ChunkResult], int, int]
 
 
-def check_recursive(check_dir: pathlib.Path, config: Config) -> Iterable[Violation]:
+def check_recursive(
+    check_dir: pathlib.Path,
+    config: Config,
+    jobs: int | Literal["auto"] | None = None,
+    cache: ResultCache | None = None,
+) -> Iterable[Violation]:
     """
     Check all python files in the given project directory for matching violation counts.
 
@@ -16,37 +64,862 @@ def check_recursive(check_dir: pathlib.Path, config: Config) -> Iterable[Violati
     It then extracts the comments from each file, and checks them against all rules
     in the configuration. If a rule is matched, it is returned as a violation with the
     number of matches.
+
+    See `check_files` for the meaning of `jobs` and `cache`.
     """
-    checkers = get_checkers(config.rules)
-    violations: list[Violation] = []
-    for path in _recurse_paths(os.scandir(check_dir), config.excluded_folders):
+    for _, violations in check_files(check_dir, config, jobs, cache):
+        yield from violations
+
+
+def check_files(
+    check_dir: pathlib.Path,
+    config: Config,
+    jobs: int | Literal["auto"] | None = None,
+    cache: ResultCache | None = None,
+    stats: Stats | None = None,
+    content_cache: ContentCache | None = None,
+    select: Callable[[str], bool] | None = None,
+    lines: bool = False,
+) -> Generator[tuple[str, Sequence[Violation]], None, None]:
+    """
+    Check all python files in the given project directory, yielding the violations per file.
+
+    Results are yielded as soon as each file has been checked, so the caller can stop
+    early. Closing the iterator cancels any outstanding work.
+
+    When `jobs` (or `config.jobs` if not given) resolves to more than one process and
+    there are enough files to make it worthwhile, files are checked in a process pool.
+
+    When a `cache` is given, files that are unchanged since it was saved reuse their
+    cached violations, and the results for all other files are stored in it. The cache
+    is marked as complete once every file has been yielded, but saving it is left to the
+    caller.
+
+    When `stats` are given, the time spent walking, reading, extracting comments and
+    checking is recorded in them.
+
+    When a `content_cache` is given, files that `cache` doesn't know of are still read,
+    but only checked if no file with the same contents was checked before.
+
+    When `select` is given, only the files whose paths it returns true for are checked,
+    and the cache is never marked as complete.
+
+    With `lines`, each violation has the lines it's on, found in the same pass over each
+    file. Cached results without lines are checked again.
+    """
+    num_jobs = resolve_jobs(config.jobs if jobs is None else jobs)
+    if cache is not None:
+        cache.complete = False
+
+    paths = find_files(check_dir, config, stats)
+    try:
+        selected: Iterable[os.DirEntry[str]] = paths
+        if select is not None:
+            selected = (path for path in paths if select(path.path))
+        lookups: Iterator[_Lookup] = (
+            (path, None if cache is None else cache.get(path.path, path.stat(), lines))
+            for path in selected
+        )
+        results = None
+        if num_jobs > 1:
+            # Hold back the files that need checking until there are enough of them to be
+            # worth starting worker processes for.
+            misses = []
+            for path, cached in lookups:
+                if cached is None:
+                    misses.append(path)
+                    if len(misses) >= PARALLEL_MIN_FILES:
+                        break
+                else:
+                    if stats is not None:
+                        stats.files += 1
+                    yield path.path, cached
+            lookups = itertools.chain(((path, None) for path in misses), lookups)
+            if len(misses) >= PARALLEL_MIN_FILES:
+                chunk_size = max(1, min(MAX_CHUNK_SIZE, len(misses) // (num_jobs * 4)))
+                results = _check_parallel(
+                    lookups, config, num_jobs, chunk_size, stats, content_cache, lines
+                )
+        if results is None:
+            results = _check_serial(lookups, config, stats, content_cache, lines)
+
+        try:
+            for path, violations in results:
+                if cache is not None:
+                    cache.put(path.path, path.stat(), violations)
+                if stats is not None:
+                    stats.files += 1
+                yield path.path, violations
+        finally:
+            results.close()
+    finally:
+        paths.close()
+
+    if cache is not None:
+        cache.complete = select is None
+
+
+def find_files(
+    check_dir: pathlib.Path, config: Config, stats: Stats | None = None
+) -> Generator[os.DirEntry[str], None, None]:
+    """
+    Yield the python files within the project directory that aren't excluded, as they're
+    found by a walk in a background thread. Closing the iterator stops the walk.
+    """
+    return _walk_in_background(check_dir, config.excluder.for_directory(check_dir), stats)
+
+
+def check_paths(
+    paths: Sequence[str], rules: Sequence[Rule], engine: Engine
+) -> list[list[Violation]]:
+    """
+    Check a chunk of files, returning the violations of each in order.
+
+    This is what's run in the worker processes of a pool shared by several projects, each
+    with their own rules, such as the one given to `batch.check_async`.
+    """
+    results, _, _ = _check_chunk(paths, rules, engine, False)
+    return [violations for violations, _ in results]
+
+
+def walk(
+    directory: pathlib.Path, excluder: Excluder, prefix: str = ""
+) -> Iterator[os.DirEntry[str]]:
+    """
+    Yield the python files within `directory`, whose path relative to the checked directory
+    is `prefix`, that aren't excluded.
+
+    `excluder` must already apply to the contents of `directory`.
+    """
+    with os.scandir(directory) as children:
+        entries = list(children)
+    yield from _recurse_paths(entries, excluder, prefix)
+
+
+def is_checked_path(path: pathlib.Path, check_dir: pathlib.Path, excluder: Excluder) -> bool:
+    """
+    Return whether `path` is a python file within `check_dir` that `excluder` doesn't
+    exclude, where `excluder` applies to the contents of `check_dir`.
+    """
+    if path.suffix != ".py" or not path.is_relative_to(check_dir):
+        return False
+    return not excluder.excludes_path(check_dir, path.relative_to(check_dir))
+
+
+def check_path(
+    path: pathlib.Path,
+    checkers: Set[Checker],
+    engine: Engine,
+    stats: Stats | None,
+    content_cache: ContentCache | None = None,
+    lines: bool = False,
+) -> list[Violation]:
+    """
+    Check the file at `path`, recording its timings in `stats`. See `check_files` for the
+    meaning of `content_cache` and `lines`.
+    """
+    if stats is None and content_cache is None and not lines:
         with open(path, "rb") as file_like:
-            violations.extend(list(check_file(file_like, checkers)))
+            return list(check_file(file_like, checkers, engine))
+
+    start = time.perf_counter()
+    source = _read(path)
+    if stats is None:
+        return _check_source(source, Checkers(checkers), engine, None, content_cache, lines)
+    file_stats = FileStats(str(path), len(source), read=time.perf_counter() - start)
+    violations = _check_source(
+        source, Checkers(checkers), engine, file_stats, content_cache, lines
+    )
+    stats.add_file(file_stats)
     return violations
 
 
-def check_file(file_like: io.BufferedIOBase, checkers: Set[Checker]) -> Iterable[Violation]:
+def check_changed(
+    check_dir: pathlib.Path,
+    config: Config,
+    changed_paths: Iterable[pathlib.Path],
+    cache: ResultCache,
+    stats: Stats | None = None,
+    content_cache: ContentCache | None = None,
+    lines: bool = False,
+) -> Iterable[Violation]:
+    """
+    Check only the given changed files, without walking the project, taking the results
+    for all other files from the cache. See `check_files` for the meaning of `lines`.
+
+    `cache` must be complete, holding the results of a previous scan of the whole project.
+    Changed files that are outside of `check_dir`, aren't python files, or are
+    excluded are ignored. Files that no longer exist are removed from the cache.
+
+    The files in the cache that weren't listed are still compared with their fingerprints,
+    and checked again if they've changed, so that a file that changed since the cache was
+    saved, such as one edited and then committed, is never counted from a stale entry.
+    The violations for the whole project are returned, and the cache is updated so it can
+    be saved as the baseline for the next run.
+    """
+    if not cache.complete:
+        raise ValueError("Checking changed files requires a complete cache")
+
+    checkers = get_checkers(config.rules)
+    excluder = config.excluder.for_directory(check_dir)
+    for path in changed_paths:
+        if is_checked_path(path, check_dir, excluder):
+            _refresh(path, cache, checkers, config.engine, stats, content_cache, lines)
+    for key in cache.unseen():
+        _refresh(pathlib.Path(key), cache, checkers, config.engine, stats, content_cache, lines)
+
+    if stats is not None:
+        stats.files = len(cache)
+    return list(cache.violations())
+
+
+def _refresh(
+    path: pathlib.Path,
+    cache: ResultCache,
+    checkers: Set[Checker],
+    engine: Engine,
+    stats: Stats | None,
+    content_cache: ContentCache | None,
+    lines: bool,
+) -> None:
+    """
+    Bring the cache's entry for `path` up to date, checking the file if it has changed.
+    """
+    key = str(path)
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        cache.discard(key)
+        return
+    if cache.get(key, stat, lines) is None:
+        violations = check_path(path, checkers, engine, stats, content_cache, lines)
+        cache.put(key, stat, violations)
+
+
+def check_revision(
+    check_dir: pathlib.Path,
+    config: Config,
+    rev: str,
+    jobs: int | Literal["auto"] | None = None,
+    stats: Stats | None = None,
+) -> Generator[tuple[str, Sequence[Violation]], None, None]:
+    """
+    Check the python files under `check_dir` as they are in the git revision `rev`,
+    yielding the violations per file.
+
+    Files are listed with `git ls-tree` and their contents streamed from a single
+    `git cat-file` process, so nothing is checked out or written to the working tree.
+    Only the `exclude` patterns apply, as git doesn't ignore files that are committed.
+    See `check_files` for the meaning of `jobs`.
+    """
+    from . import git
+
+    with phase(stats, "walk"):
+        is_checked = tree_path_filter(config)
+        files = [file for file in git.tree_files(check_dir, rev) if is_checked(file.path)]
+    with git.BlobReader(check_dir) as reader:
+        paths = (os.path.join(check_dir, file.path) for file in files)
+        sources = zip(paths, reader.read(file.blob for file in files))
+        yield from check_sources(sources, config, jobs, stats)
+
+
+def check_archive(
+    archive: pathlib.Path,
+    config: Config,
+    jobs: int | Literal["auto"] | None = None,
+    stats: Stats | None = None,
+) -> Generator[tuple[str, Sequence[Violation]], None, None]:
+    """
+    Check the python files in a tar or zip archive, such as an sdist or a wheel, yielding
+    the violations per file by its path relative to the checked directory.
+
+    Members are read one at a time and checked from memory, so nothing is extracted. See
+    `archive.read_sources` for how `config` applies to them, and `check_files` for the
+    meaning of `jobs`.
+    """
+    from . import archive as archive_module
+
+    yield from check_sources(archive_module.read_sources(archive, config), config, jobs, stats)
+
+
+def check_blobs(
+    check_dir: pathlib.Path,
+    config: Config,
+    blobs: Iterable[str],
+    jobs: int | Literal["auto"] | None = None,
+) -> Generator[tuple[str, list[Violation]], None, None]:
+    """
+    Check the contents of git blobs, yielding the violations of each blob by its id.
+    """
+    from . import git
+
+    blobs = list(blobs)
+    with git.BlobReader(check_dir) as reader:
+        yield from check_sources(zip(blobs, reader.read(blobs)), config, jobs)
+
+
+def check_sources(
+    sources: Iterable[tuple[str, bytes]],
+    config: Config,
+    jobs: int | Literal["auto"] | None = None,
+    stats: Stats | None = None,
+) -> Generator[tuple[str, list[Violation]], None, None]:
+    """
+    Check sources that are already in memory, such as blobs read from git, yielding the
+    violations of each in order, by the name it was given with.
+
+    Sources are taken from `sources` as they're needed, and the time spent waiting for
+    each is recorded as reading it. Sources without any of the checkers' markers are
+    never sent to a worker process. See `check_files` for the meaning of `jobs`.
+    """
+    num_jobs = resolve_jobs(config.jobs if jobs is None else jobs)
+    checkers = Checkers(get_checkers(config.rules))
+    reads = _timed_sources(sources, stats is not None)
+    if num_jobs > 1:
+        # As with files, only start worker processes once there are enough sources.
+        held = list(itertools.islice(reads, PARALLEL_MIN_FILES))
+        reads = itertools.chain(held, reads)
+        if len(held) >= PARALLEL_MIN_FILES:
+            yield from _check_sources_parallel(reads, checkers, config, num_jobs, stats)
+            return
+    for name, source, seconds in reads:
+        file_stats = None if stats is None else FileStats(name, len(source), read=seconds)
+        violations = _check_source(source, checkers, config.engine, file_stats)
+        _record_file(stats, file_stats)
+        yield name, violations
+
+
+def tree_path_filter(config: Config) -> Callable[[str], bool]:
+    """
+    Return a function that decides whether a path from a git tree, relative to the checked
+    directory, is a python file that isn't excluded by the `exclude` patterns.
+
+    Each directory is only matched once, however many files it holds.
+    """
+    excluder = Excluder(config.excluded_folders)
+    excluded_directories: dict[str, bool] = {"": False}
+
+    def is_excluded(directory: str) -> bool:
+        if directory not in excluded_directories:
+            # Find the nearest directory that's already known, then match downwards from it.
+            unknown = [directory]
+            while (parent := unknown[-1].rpartition("/")[0]) not in excluded_directories:
+                unknown.append(parent)
+            excluded = excluded_directories[parent]
+            for path in reversed(unknown):
+                excluded = excluded or excluder.excludes(path, is_dir=True)
+                excluded_directories[path] = excluded
+        return excluded_directories[directory]
+
+    def is_checked(path: str) -> bool:
+        return (
+            path.endswith(".py")
+            and not is_excluded(path.rpartition("/")[0])
+            and not excluder.excludes(path, is_dir=False)
+        )
+
+    return is_checked
+
+
+def config_path_filter(check_dir: pathlib.Path, config: Config) -> Callable[[str], bool]:
+    """
+    Return a function that decides whether a python file found by a walk is checked by
+    `config`, whose checked directory is `check_dir`, including its `.gitignore` files.
+
+    Each directory is only matched once, however many files it holds.
+    """
+    prefix = os.path.join(check_dir, "")
+    excluders: dict[str, Excluder | None] = {"": config.excluder.for_directory(check_dir)}
+
+    def directory_excluder(directory: str) -> Excluder | None:
+        if directory not in excluders:
+            # Find the nearest directory that's already known, then descend from it.
+            unknown = [directory]
+            while (parent := unknown[-1].rpartition("/")[0]) not in excluders:
+                unknown.append(parent)
+            excluder = excluders[parent]
+            for path in reversed(unknown):
+                if excluder is not None:
+                    if excluder.excludes(path, is_dir=True):
+                        excluder = None
+                    else:
+                        excluder = excluder.with_gitignore(check_dir / path, f"{path}/")
+                excluders[path] = excluder
+        return excluders[directory]
+
+    def is_checked(path: str) -> bool:
+        if not path.startswith(prefix):
+            return False
+        relative = path[len(prefix) :].replace(os.sep, "/")
+        excluder = directory_excluder(relative.rpartition("/")[0])
+        return excluder is not None and not excluder.excludes(relative, is_dir=False)
+
+    return is_checked
+
+
+def check_file(
+    file_like: io.BufferedIOBase, checkers: Set[Checker], engine: Engine = "tokenize"
+) -> Iterable[Violation]:
     """
     Check a given file like object for matching violation counts.
 
     `file_like` is expected to be a binary file-like object such as io.BytesIO or
     the result of `open(fp, "rb")`.
 
-    Comments are extracted from the file like object and scanned for matching
-    violations.
+    Comments are extracted from the file like object using the given `engine`, and
+    scanned for matching violations. Files that don't contain any of the checkers'
+    markers can't contain a violation, so they are skipped without being tokenized.
     """
-    comments = list(extract_comments(file_like))
-    if not comments:
+    if not isinstance(checkers, Checkers):
+        checkers = Checkers(checkers)
+    source = file_like.read()
+    if not _has_markers(source, checkers):
         return
-    for checker in checkers:
-        yield from checker.check(comments)
+    yield from checkers.check(get_extractor(engine)(io.BytesIO(source)))
+
+
+def resolve_jobs(jobs: int | Literal["auto"]) -> int:
+    """
+    Return the number of worker processes to use for the requested jobs setting.
+
+    "auto" uses every CPU available to this process.
+    """
+    if jobs == "auto":
+        try:
+            return len(os.sched_getaffinity(0))
+        except AttributeError:
+            return os.cpu_count() or 1
+    return max(jobs, 1)
+
+
+def _has_markers(source: bytes, checkers: Checkers) -> bool:
+    return any(marker in source for marker in checkers.markers)
+
+
+def _check_source(
+    source: bytes,
+    checkers: Checkers,
+    engine: Engine,
+    file_stats: FileStats | None = None,
+    content_cache: ContentCache | None = None,
+    lines: bool = False,
+) -> list[Violation]:
+    """
+    Check the source of a file, recording the time spent on each phase in `file_stats`,
+    and the lines of each violation with `lines`.
+
+    With a `content_cache`, the source is only checked if the cache doesn't know its
+    violations already, and they're stored in the cache if it didn't. Sources without any
+    of the checkers' markers are never looked up, as hashing them costs more than finding
+    that they have no violations.
+    """
+    if content_cache is not None and _has_markers(source, checkers):
+        key = content_cache.key(source)
+        violations = content_cache.get(key, lines)
+        if violations is None:
+            violations = _check_source(source, checkers, engine, file_stats, lines=lines)
+            content_cache.put(key, violations)
+        return violations
+
+    if file_stats is None and not lines:
+        return list(check_file(io.BytesIO(source), checkers, engine))
+
+    start = time.perf_counter()
+    if lines:
+        comment_lines = []
+        if _has_markers(source, checkers):
+            comment_lines = list(get_line_extractor(engine)(io.BytesIO(source)))
+        extracted = time.perf_counter()
+        violations = checkers.check_lines(comment_lines)
+    else:
+        comments = []
+        if _has_markers(source, checkers):
+            comments = list(get_extractor(engine)(io.BytesIO(source)))
+        extracted = time.perf_counter()
+        violations = checkers.check(comments)
+    if file_stats is not None:
+        file_stats.extract = extracted - start
+        file_stats.check = time.perf_counter() - extracted
+    return violations
+
+
+def _check_serial(
+    lookups: Iterable[_Lookup],
+    config: Config,
+    stats: Stats | None,
+    content_cache: ContentCache | None = None,
+    lines: bool = False,
+) -> Generator[tuple[os.DirEntry[str], list[Violation]], None, None]:
+    checkers = Checkers(get_checkers(config.rules))
+    with _ReadAhead(
+        lookups, lambda lookup: lookup[0] if lookup[1] is None else None, stats is not None
+    ) as reads:
+        for (path, cached), source, seconds in reads:
+            if cached is None:
+                assert source is not None
+                file_stats = None
+                if stats is not None:
+                    file_stats = FileStats(path.path, len(source), read=seconds)
+                cached = _check_source(
+                    source, checkers, config.engine, file_stats, content_cache, lines
+                )
+                if stats is not None and file_stats is not None:
+                    stats.add_file(file_stats)
+            yield path, cached
+
+
+def _check_parallel(
+    lookups: Iterator[_Lookup],
+    config: Config,
+    jobs: int,
+    chunk_size: int,
+    stats: Stats | None,
+    content_cache: ContentCache | None = None,
+    lines: bool = False,
+) -> Generator[tuple[os.DirEntry[str], list[Violation]], None, None]:
+    """
+    Check the files that aren't cached in a process pool, yielding results in order.
+
+    Chunks start at `chunk_size` files and double in size up to MAX_CHUNK_SIZE. Only a
+    couple of chunks per worker are submitted ahead of the results being consumed, so
+    memory use doesn't depend on the number of files.
+    """
+    executor = process_pool(jobs)
+    window: collections.deque[tuple[list[_Lookup], Future[_ChunkResults] | None]]
+    window = collections.deque()
+    try:
+        while chunk := list(itertools.islice(lookups, chunk_size)):
+            misses = [path.path for path, cached in chunk if cached is None]
+            future = None
+            if misses:
+                future = executor.submit(
+                    _check_chunk,
+                    misses,
+                    config.rules,
+                    config.engine,
+                    stats is not None,
+                    content_cache,
+                    lines,
+                )
+            window.append((chunk, future))
+            chunk_size = min(chunk_size * 2, MAX_CHUNK_SIZE)
+            if len(window) > jobs * 2:
+                yield from _chunk_results(*window.popleft(), stats, content_cache)
+        while window:
+            yield from _chunk_results(*window.popleft(), stats, content_cache)
+    finally:
+        # If the caller stopped early, don't wait for the chunks that haven't started yet.
+        executor.shutdown(cancel_futures=True)
+
+
+def _chunk_results(
+    chunk: list[_Lookup],
+    future: Future[_ChunkResults] | None,
+    stats: Stats | None,
+    content_cache: ContentCache | None,
+) -> Iterator[tuple[os.DirEntry[str], list[Violation]]]:
+    results: Iterator[_ChunkResult] = iter(())
+    if future is not None:
+        chunk_results, hits, misses = future.result()
+        results = iter(chunk_results)
+        # The workers' copies of the content cache counted their own lookups.
+        if content_cache is not None:
+            content_cache.hits += hits
+            content_cache.misses += misses
+    for path, cached in chunk:
+        if cached is None:
+            cached, file_stats = next(results)
+            if stats is not None and file_stats is not None:
+                stats.add_file(file_stats)
+        yield path, cached
+
+
+def _timed_sources(
+    sources: Iterable[tuple[str, bytes]], timed: bool
+) -> Iterator[tuple[str, bytes, float]]:
+    if not timed:
+        yield from ((name, source, 0.0) for name, source in sources)
+        return
+    iterator = iter(sources)
+    while True:
+        start = time.perf_counter()
+        try:
+            name, source = next(iterator)
+        except StopIteration:
+            return
+        yield name, source, time.perf_counter() - start
+
+
+def _check_sources_parallel(
+    reads: Iterator[tuple[str, bytes, float]],
+    checkers: Checkers,
+    config: Config,
+    jobs: int,
+    stats: Stats | None,
+) -> Generator[tuple[str, list[Violation]], None, None]:
+    """
+    Check in-memory sources in a process pool, yielding results in order.
+
+    Like `_check_parallel`, only a couple of chunks per worker are in flight at once.
+    """
+    executor = process_pool(jobs)
+    window: collections.deque[
+        tuple[list[tuple[str, bytes, float]], list[bool], Future[list[_ChunkResult]] | None]
+    ]
+    window = collections.deque()
+    try:
+        while chunk := list(itertools.islice(reads, MAX_CHUNK_SIZE)):
+            marked = [_has_markers(source, checkers) for _, source, _ in chunk]
+            sources = [source for (_, source, _), has in zip(chunk, marked) if has]
+            future = None
+            if sources:
+                future = executor.submit(
+                    _check_source_chunk, sources, config.rules, config.engine, stats is not None
+                )
+            window.append((chunk, marked, future))
+            if len(window) > jobs * 2:
+                yield from _source_chunk_results(*window.popleft(), stats)
+        while window:
+            yield from _source_chunk_results(*window.popleft(), stats)
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+def _source_chunk_results(
+    chunk: list[tuple[str, bytes, float]],
+    marked: list[bool],
+    future: Future[list[_ChunkResult]] | None,
+    stats: Stats | None,
+) -> Iterator[tuple[str, list[Violation]]]:
+    results = iter(() if future is None else future.result())
+    for (name, source, seconds), has_markers in zip(chunk, marked):
+        violations: list[Violation] = []
+        file_stats = None if stats is None else FileStats(name, len(source))
+        if has_markers:
+            violations, file_stats = next(results)
+        if file_stats is not None:
+            file_stats.path = name
+            file_stats.read = seconds
+        _record_file(stats, file_stats)
+        yield name, violations
+
+
+def _record_file(stats: Stats | None, file_stats: FileStats | None) -> None:
+    if stats is not None:
+        stats.files += 1
+        if file_stats is not None:
+            stats.add_file(file_stats)
+
+
+def _check_source_chunk(
+    sources: Sequence[bytes], rules: Sequence[Rule], engine: Engine, timed: bool
+) -> list[_ChunkResult]:
+    """
+    Check a chunk of sources in a worker process.
+    """
+    checkers = Checkers(get_checkers(rules))
+    results: list[_ChunkResult] = []
+    for source in sources:
+        file_stats = FileStats("", len(source)) if timed else None
+        results.append((_check_source(source, checkers, engine, file_stats), file_stats))
+    return results
+
+
+def _check_chunk(
+    paths: Sequence[str],
+    rules: Sequence[Rule],
+    engine: Engine,
+    timed: bool,
+    content_cache: ContentCache | None = None,
+    lines: bool = False,
+) -> _ChunkResults:
+    """
+    Check a chunk of files in a worker process, returning the results along with the
+    number of hits and misses of the content cache.
+    """
+    checkers = Checkers(get_checkers(rules))
+    results = []
+    with _ReadAhead(paths, lambda path: path, timed) as reads:
+        for path, source, seconds in reads:
+            assert source is not None
+            file_stats = FileStats(path, len(source), read=seconds) if timed else None
+            violations = _check_source(source, checkers, engine, file_stats, content_cache, lines)
+            results.append((violations, file_stats))
+    if content_cache is None:
+        return results, 0, 0
+    content_cache.close()
+    return results, content_cache.hits, content_cache.misses
+
+
+def process_pool(jobs: int) -> ProcessPoolExecutor:
+    """
+    Return a pool of `jobs` worker processes for checking files.
+    """
+    # Imported here as multiprocessing is slow to import, and most runs are serial.
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    # Spawn rather than fork so that workers start from a clean interpreter regardless of
+    # the threads that the parent process may be running.
+    context = multiprocessing.get_context("spawn")
+    return ProcessPoolExecutor(max_workers=jobs, mp_context=context)
+
+
+class _ReadAhead(Generic[_T]):
+    """
+    Read the files for `items` in a small thread pool, ahead of them being consumed.
+
+    Iterating yields each item with the contents of its file, in order, or None when
+    `path_of` returns None for the item, and the seconds spent reading it if `timed`.
+    At most READAHEAD_DEPTH files are held in memory at once. Leaving the context cancels
+    any reads that haven't started.
+    """
+
+    def __init__(
+        self,
+        items: Iterable[_T],
+        path_of: Callable[[_T], str | os.PathLike[str] | None],
+        timed: bool = False,
+    ) -> None:
+        self.items = iter(items)
+        self.path_of = path_of
+        self.timed = timed
+        # Started by the first read, so that nothing is paid for when there are no files.
+        self.executor: ThreadPoolExecutor | None = None
+
+    def __enter__(self) -> Iterator[tuple[_T, bytes | None, float]]:
+        return self._reads()
+
+    def __exit__(self, *exc_info: object) -> None:
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+
+    def _reads(self) -> Iterator[tuple[_T, bytes | None, float]]:
+        window: collections.deque[tuple[_T, Future[tuple[bytes, float]] | None]]
+        window = collections.deque()
+        for item in self.items:
+            path = self.path_of(item)
+            window.append((item, None if path is None else self._submit(path)))
+            if len(window) >= READAHEAD_DEPTH:
+                yield self._next(window)
+        while window:
+            yield self._next(window)
+
+    def _submit(self, path: str | os.PathLike[str]) -> Future[tuple[bytes, float]]:
+        if self.executor is None:
+            # Imported here as concurrent.futures is slow to import.
+            from concurrent.futures import ThreadPoolExecutor
+
+            self.executor = ThreadPoolExecutor(
+                READAHEAD_THREADS, thread_name_prefix="ratchet-read"
+            )
+        return self.executor.submit(self._read, path)
+
+    def _read(self, path: str | os.PathLike[str]) -> tuple[bytes, float]:
+        if not self.timed:
+            return _read(path), 0.0
+        start = time.perf_counter()
+        source = _read(path)
+        return source, time.perf_counter() - start
+
+    @staticmethod
+    def _next(
+        window: collections.deque[tuple[_T, Future[tuple[bytes, float]] | None]],
+    ) -> tuple[_T, bytes | None, float]:
+        item, future = window.popleft()
+        if future is None:
+            return item, None, 0.0
+        return item, *future.result()
+
+
+def _read(path: str | os.PathLike[str]) -> bytes:
+    with open(path, "rb") as file_like:
+        return file_like.read()
+
+
+def _walk_in_background(
+    check_dir: pathlib.Path, excluder: Excluder, stats: Stats | None = None
+) -> Generator[os.DirEntry[str], None, None]:
+    """
+    Walk the directory in a background thread, so that listing directories overlaps with
+    reading and checking the files already found.
+
+    Closing the generator stops the walk.
+    """
+    batches: queue.Queue[list[os.DirEntry[str]] | BaseException | None] = queue.Queue(
+        maxsize=WALK_QUEUE_SIZE
+    )
+    stopped = threading.Event()
+
+    def put(item: list[os.DirEntry[str]] | BaseException | None) -> bool:
+        while not stopped.is_set():
+            try:
+                batches.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def walk_batches() -> None:
+        try:
+            paths = walk(check_dir, excluder)
+            while True:
+                with phase(stats, "walk"):
+                    batch = list(itertools.islice(paths, WALK_BATCH_SIZE))
+                if not batch:
+                    break
+                if not put(batch):
+                    return
+        except BaseException as e:
+            put(e)
+        else:
+            put(None)
+
+    thread = threading.Thread(target=walk_batches, name="ratchet-walk", daemon=True)
+    thread.start()
+    try:
+        while (batch := batches.get()) is not None:
+            if isinstance(batch, BaseException):
+                raise batch
+            yield from batch
+    finally:
+        stopped.set()
+        thread.join()
 
 
 def _recurse_paths(
-    children: Iterator[os.DirEntry[str]], excluded_folders: Collection[str]
+    children: Iterable[os.DirEntry[str]], excluder: Excluder, prefix: str = ""
 ) -> Iterator[os.DirEntry[str]]:
-    for child in children:
-        if child.is_file() and child.name.endswith(".py"):
-            yield child
-        elif child.is_dir() and child.name not in excluded_folders:
-            yield from _recurse_paths(os.scandir(child), excluded_folders)
+    """
+    Yield the python files among `children` and, recursively, within their subdirectories.
+
+    Excluded directories are pruned before they're listed, and when `.gitignore` files are
+    used each one is read as its directory is listed.
+
+    Walks with an explicit stack rather than recursion so that deeply nested trees can't
+    exceed the recursion limit. Each directory is listed in full and closed before any of
+    its files are yielded, so no directory handles are left open if the caller stops early.
+    Symlinked directories are only visited once, so symlink loops can't be followed forever.
+    """
+    directories: list[tuple[os.DirEntry[str], str, Excluder]] = []
+    visited_links: set[tuple[int, int]] = set()
+    while True:
+        for child in children:
+            path = prefix + child.name
+            if child.is_file() and child.name.endswith(".py"):
+                if not excluder.excludes(path, is_dir=False):
+                    yield child
+            elif child.is_dir() and not excluder.excludes(path, is_dir=True):
+                if child.is_symlink():
+                    stat = child.stat()
+                    if (stat.st_dev, stat.st_ino) in visited_links:
+                        continue
+                    visited_links.add((stat.st_dev, stat.st_ino))
+                directories.append((child, f"{path}/", excluder))
+        if not directories:
+            return
+        directory, prefix, excluder = directories.pop()
+        with os.scandir(directory) as grandchildren:
+            children = list(grandchildren)
+        if excluder.gitignore and any(child.name == GITIGNORE for child in children):
+            excluder = excluder.with_gitignore(directory, prefix)
@@ -1,9 +1,12 @@
+import abc
 import dataclasses
+import re
 from collections import Counter
-from collections.abc import Sequence, Set
-from typing import Protocol, TypeAlias
+from collections.abc import Callable, Collection, Container, Iterable, Mapping, Sequence, Set
+from typing import ClassVar, Protocol, TypeAlias
 
-from lint_ratchet.configuration import Rule, Tool
+from lint_ratchet.configuration import WILDCARD, Rule, Tool
+from lint_ratchet.plugins import CODE_LIST, Plugin, load_plugin
 
 
 Comment: TypeAlias = str
@@ -11,44 +14,231 @@ Comment: TypeAlias = str
 
 @dataclasses.dataclass(frozen=True, slots=True)
 class Violation:
+    tool: Tool
     rule: str
     count: int
+    # The lines the violations are on, when the file was checked for them with lines.
+    lines: tuple[int, ...] = dataclasses.field(default=(), compare=False)
 
 
 class Checker(Protocol):
+    # Comment prefixes that introduce the suppressions this checker counts.
+    prefixes: Collection[str]
+    # Byte strings that must appear in a file's source for the checker to find anything in it.
+    markers: Collection[bytes]
+
     def __init__(self, rules: Sequence[Rule]) -> None: ...
 
+    def parse(self, prefix: str, comment: Comment) -> Iterable[tuple[Tool, str]]: ...
+
     def check(self, comments: Sequence[Comment]) -> Sequence[Violation]: ...
 
 
-def get_checkers(rules: Sequence[Rule]) -> Set[Checker]:
-    tools = {rule.tool for rule in rules}
-    checkers = set()
-    if Tool.NOQA in tools:
-        checkers.add(NoQAChecker(rules))
-    return checkers
+class Checkers(frozenset[Checker]):
+    """
+    A set of checkers that classifies each comment once and routes it to the right checker.
 
+    The prefixes of all of the checkers are compiled into a single pattern, so each
+    comment is inspected once no matter how many checkers or tools are active.
+    """
 
-class NoQAChecker:
-    def __init__(self, rules: Sequence[Rule]) -> None:
-        self.rules = [rule for rule in rules if rule.tool == Tool.NOQA]
-        self.codes = {rule.code for rule in self.rules}
-        self.violations: Counter[str] = Counter()
+    def __init__(self, checkers: Iterable[Checker] = ()) -> None:
+        self.routes: dict[str, list[Checker]] = {}
+        for checker in self:
+            for prefix in checker.prefixes:
+                self.routes.setdefault(prefix, []).append(checker)
+        self.markers = frozenset(marker for checker in self for marker in checker.markers)
+        # Longest first, so that a prefix is never shadowed by a shorter prefix of itself.
+        prefixes = sorted(self.routes, key=len, reverse=True)
+        self._pattern = re.compile("|".join(map(re.escape, prefixes))) if prefixes else None
 
-    def check(self, comments: Sequence[Comment]) -> Sequence[Violation]:
-        if not self.rules:
+    def check(self, comments: Iterable[Comment]) -> list[Violation]:
+        if self._pattern is None:
             return []
 
-        self.violations.clear()
+        match = self._pattern.match
+        counts: Counter[tuple[Tool, str]] = Counter()
         for comment in comments:
-            if not comment.startswith("# noqa:"):
+            if (prefix := match(comment)) is None:
                 continue
+            for checker in self.routes[prefix.group()]:
+                counts.update(checker.parse(prefix.group(), comment))
+        return [
+            Violation(tool=tool, rule=rule, count=count) for (tool, rule), count in counts.items()
+        ]
 
-            for violation in comment.removeprefix("# noqa: ").split(","):
-                self.violations[violation.strip()] += 1
+    def check_lines(self, comments: Iterable[tuple[int, Comment]]) -> list[Violation]:
+        """
+        Like `check`, for comments with the line each is on, recording the lines of each
+        violation.
+        """
+        if self._pattern is None:
+            return []
 
+        match = self._pattern.match
+        lines: dict[tuple[Tool, str], list[int]] = {}
+        counts: Counter[tuple[Tool, str]] = Counter()
+        for line, comment in comments:
+            if (prefix := match(comment)) is None:
+                continue
+            for checker in self.routes[prefix.group()]:
+                for key in checker.parse(prefix.group(), comment):
+                    counts[key] += 1
+                    key_lines = lines.setdefault(key, [])
+                    if not key_lines or key_lines[-1] != line:
+                        key_lines.append(line)
         return [
-            Violation(rule=violation, count=count)
-            for violation, count in self.violations.items()
-            if violation in self.codes
+            Violation(tool=tool, rule=rule, count=count, lines=tuple(lines[tool, rule]))
+            for (tool, rule), count in counts.items()
         ]
+
+
+def get_checkers(rules: Sequence[Rule]) -> Set[Checker]:
+    """
+    Return the checkers for the tools of the rules, importing the plugins of any tools that
+    aren't built in.
+    """
+    checkers: dict[object, Checker] = {}
+    for tool in dict.fromkeys(rule.tool for rule in rules):
+        factory = BUILTIN_CHECKERS.get(tool)
+        if factory is None:
+            checkers[tool] = PluginChecker(tool, load_plugin(tool.value), rules)
+        elif factory not in checkers:
+            # Tools that share a checker class are counted by a single checker.
+            checkers[factory] = factory(rules)
+    return Checkers(checkers.values())
+
+
+class _EveryCode:
+    """
+    Contains every code, for the rules that count all of a tool's codes.
+    """
+
+    def __contains__(self, code: object) -> bool:
+        return True
+
+
+def _codes(rules: Iterable[Rule]) -> Container[str]:
+    codes = {rule.code for rule in rules}
+    return _EveryCode() if WILDCARD in codes else codes
+
+
+class _PrefixChecker(abc.ABC):
+    """
+    The base of the checkers, which only differ in their prefixes and how they parse the
+    comments that start with them.
+    """
+
+    prefixes: Collection[str] = ()
+    markers: Collection[bytes] = ()
+
+    @abc.abstractmethod
+    def parse(self, prefix: str, comment: Comment) -> Iterable[tuple[Tool, str]]: ...
+
+    def check(self, comments: Sequence[Comment]) -> Sequence[Violation]:
+        return Checkers([self]).check(comments)
+
+
+class NoQAChecker(_PrefixChecker):
+    prefixes: Collection[str] = ("# noqa:",)
+    markers: Collection[bytes] = (b"# noqa:",)
+
+    def __init__(self, rules: Sequence[Rule]) -> None:
+        self.rules = [rule for rule in rules if rule.tool == Tool.NOQA]
+        self.codes = _codes(self.rules)
+
+    def parse(self, prefix: str, comment: Comment) -> Iterable[tuple[Tool, str]]:
+        codes = self.codes
+        return [
+            (Tool.NOQA, code) for code in CODE_LIST.findall(comment, len(prefix)) if code in codes
+        ]
+
+
+class FixitChecker(_PrefixChecker):
+    """
+    Counts `# lint-fixme:` and `# lint-ignore:` suppressions.
+
+    Rules for the `fixit` tool count both kinds of suppression.
+    """
+
+    prefixes_by_tool: ClassVar[Mapping[Tool, Sequence[str]]] = {
+        Tool.FIXIT_FIXME: ("# lint-fixme:",),
+        Tool.FIXIT_IGNORE: ("# lint-ignore:",),
+        Tool.FIXIT_ANY: ("# lint-fixme:", "# lint-ignore:"),
+    }
+    tools = frozenset(prefixes_by_tool)
+
+    def __init__(self, rules: Sequence[Rule]) -> None:
+        self.rules = [rule for rule in rules if rule.tool in self.tools]
+        # The tools to count each code for, by the prefix of the comment it appears in.
+        self._codes: dict[str, dict[str, list[Tool]]] = {}
+        for rule in self.rules:
+            for prefix in self.prefixes_by_tool[rule.tool]:
+                self._codes.setdefault(prefix, {}).setdefault(rule.code, []).append(rule.tool)
+        # Tools with a wildcard rule count every code, including those named by other rules.
+        for codes in self._codes.values():
+            for tools in codes.values():
+                tools.extend(tool for tool in codes.get(WILDCARD, ()) if tool not in tools)
+        self.prefixes = list(self._codes)
+        self.markers = [prefix.encode() for prefix in self.prefixes]
+
+    def parse(self, prefix: str, comment: Comment) -> Iterable[tuple[Tool, str]]:
+        codes = self._codes[prefix]
+        every = codes.get(WILDCARD, ())
+        return [
+            (tool, code)
+            for code in CODE_LIST.findall(comment, len(prefix))
+            for tool in codes.get(code, every)
+        ]
+
+
+class MypyChecker(_PrefixChecker):
+    """
+    Counts the error codes in `# type: ignore[code, ...]` suppressions.
+    """
+
+    prefixes: Collection[str] = ("# type: ignore[",)
+    markers: Collection[bytes] = (b"# type: ignore[",)
+
+    def __init__(self, rules: Sequence[Rule]) -> None:
+        self.rules = [rule for rule in rules if rule.tool == Tool.MYPY]
+        self.codes = _codes(self.rules)
+
+    def parse(self, prefix: str, comment: Comment) -> Iterable[tuple[Tool, str]]:
+        end = comment.find("]", len(prefix))
+        if end == -1:
+            return []
+        codes = self.codes
+        return [
+            (Tool.MYPY, code)
+            for code in CODE_LIST.findall(comment, len(prefix), end)
+            if code in codes
+        ]
+
+
+class PluginChecker(_PrefixChecker):
+    """
+    Counts the suppressions of a tool provided by a plugin.
+    """
+
+    def __init__(self, tool: Tool, plugin: Plugin, rules: Sequence[Rule]) -> None:
+        self.tool = tool
+        self.plugin = plugin
+        self.rules = [rule for rule in rules if rule.tool == tool]
+        self.codes = _codes(self.rules)
+        self.prefixes = plugin.prefixes
+        self.markers = plugin.markers
+
+    def parse(self, prefix: str, comment: Comment) -> Iterable[tuple[Tool, str]]:
+        tool, codes = self.tool, self.codes
+        return [(tool, code) for code in self.plugin.parse(prefix, comment) if code in codes]
+
+
+# The checker of each built-in tool. Tools of other names are provided by plugins.
+BUILTIN_CHECKERS: Mapping[Tool, Callable[[Sequence[Rule]], Checker]] = {
+    Tool.NOQA: NoQAChecker,
+    Tool.FIXIT_FIXME: FixitChecker,
+    Tool.FIXIT_IGNORE: FixitChecker,
+    Tool.FIXIT_ANY: FixitChecker,
+    Tool.MYPY: MypyChecker,
+}
@@ -1,22 +1,63 @@
+# Commands import what they need when they run, so that hooks and editors which start a
+# process per run don't pay for the modules of every other command.
+from __future__ import annotations
+
 import dataclasses
+import functools
 import pathlib
-from typing import cast
+from collections.abc import Callable, Iterable
+from typing import IO, TYPE_CHECKING, Any, Literal, TypeVar, cast
 
 import click
 
-from . import __version__, configuration, usecases
+from . import configuration
+from .configuration import CACHE_DIR_NAME
+
+
+if TYPE_CHECKING:
+    from . import snapshot as snapshot_module
+    from . import stats as stats_module
+    from . import usecases
+
+
+_F = TypeVar("_F", bound=Callable[..., Any])
 
 
 @dataclasses.dataclass
 class MainOptions:
-    config: configuration.Config
+    """
+    The options shared by every command.
+
+    The configuration is read when a command first uses it, so that commands which find
+    their own configurations don't need one in the root.
+    """
+
     root: pathlib.Path
-    check_dir: pathlib.Path
+
+    @functools.cached_property
+    def config(self) -> configuration.Config:
+        try:
+            return configuration.open_configuration(self.root)
+        except (
+            configuration.ProjectFileNotFoundError,
+            configuration.RatchetMisconfiguredError,
+        ) as e:
+            raise click.ClickException(str(e)) from e
+
+    @functools.cached_property
+    def check_dir(self) -> pathlib.Path:
+        check_dir = self.root / self.config.path
+        if not check_dir.exists():
+            raise click.ClickException(f"Path {check_dir} does not exist")
+        return check_dir
+
+    def cache_dir(self, enabled: bool) -> pathlib.Path | None:
+        return self.root / CACHE_DIR_NAME if enabled else None
 
 
 @click.group()
 @click.pass_context
-@click.version_option(__version__, "--version", "-v", prog_name="ratchet")
+@click.version_option(None, "--version", "-v", package_name="lint_ratchet", prog_name="ratchet")
 @click.option(
     "--root",
     type=click.Path(
@@ -30,52 +71,918 @@ class MainOptions:
     help="The path to the root of the project to check, where the .ratchet.toml file is located. Defaults to the current directory.",
 )
 def main(ctx: click.Context, root: pathlib.Path) -> None:
+    ctx.obj = MainOptions(root)
+
+
+class JobsParamType(click.ParamType):
+    """
+    A positive number of worker processes, or "auto" to use every available CPU.
+    """
+
+    name = "jobs"
+
+    def convert(
+        self, value: Any, param: click.Parameter | None, ctx: click.Context | None
+    ) -> int | Literal["auto"]:
+        if value == "auto" or (isinstance(value, int) and value > 0):
+            return cast(int | Literal["auto"], value)
+        try:
+            jobs = int(value)
+        except ValueError:
+            self.fail(f"{value!r} is not a number or 'auto'", param, ctx)
+        if jobs < 1:
+            self.fail(f"{value!r} must be at least 1", param, ctx)
+        return jobs
+
+
+class ShardParamType(click.ParamType):
+    """
+    One of a number of shards, as "i/n" for the i-th of n shards, counting from 1.
+    """
+
+    name = "shard"
+
+    def convert(
+        self, value: Any, param: click.Parameter | None, ctx: click.Context | None
+    ) -> tuple[int, int]:
+        if isinstance(value, tuple):
+            return cast(tuple[int, int], value)
+        shard, _, shard_count = str(value).partition("/")
+        try:
+            parsed = int(shard), int(shard_count)
+        except ValueError:
+            self.fail(f"{value!r} is not of the form i/n, such as 1/4", param, ctx)
+        if not 1 <= parsed[0] <= parsed[1]:
+            self.fail(f"{value!r} must be a shard from 1 to the number of shards", param, ctx)
+        return parsed
+
+
+jobs_option = click.option(
+    "--jobs",
+    "-j",
+    type=JobsParamType(),
+    default=None,
+    help='The number of processes to check files with, or "auto" for one per CPU. Defaults to the `jobs` setting in .ratchet.toml, or 1.',
+)
+
+rev_option = click.option(
+    "--rev",
+    metavar="REF",
+    help="Check the files as they are in the git REF, read from the object database without checking them out. The configuration is read from the working tree.",
+)
+
+cache_option = click.option(
+    "--cache/--no-cache",
+    default=False,
+    help=f"Reuse the results for files that have not changed since the last cached run, stored in {CACHE_DIR_NAME}/ under the root.",
+)
+
+from_snapshot_option = click.option(
+    "--from-snapshot",
+    type=click.File("r"),
+    help="Take the counts from this snapshot, written by `ratchet scan` or `ratchet merge` with the same rules and covering every shard, instead of scanning.",
+)
+
+index_option = click.option(
+    "--index",
+    "update_index",
+    is_flag=True,
+    help=f"Record the violations of each file, with their lines, in an SQLite index in {CACHE_DIR_NAME}/ under the root, for `ratchet query` and `ratchet top`. Only the files that changed since the last update are rewritten.",
+)
+
+content_cache_option = click.option(
+    "--content-cache",
+    metavar="LOCATION",
+    envvar="RATCHET_CONTENT_CACHE",
+    help="Reuse the results for files whose contents were checked before with the same rules, stored in this directory or at this http(s) URL, which can be shared between checkouts and machines.",
+)
+
+
+def stats_options(function: _F) -> _F:
+    function = click.option(
+        "--stats-json",
+        type=click.Path(dir_okay=False, writable=True, path_type=pathlib.Path),
+        help="Write the timings and counters of the scan to this file as JSON.",
+    )(function)
+    return click.option(
+        "--stats",
+        "show_stats",
+        is_flag=True,
+        help="Report the time spent on each phase of the scan, the files and bytes read, cache hits, peak memory and the slowest files.",
+    )(function)
+
+
+# The options used by `--changed-since` and `--files-from`, which check the files they list
+# and take the results of the rest from the cache.
+_CHANGED_FILES_OPTIONS = frozenset(
+    {"--jobs", "--cache", "--content-cache", "--fail-fast", "--stats", "--stats-json", "--index"}
+)
+
+# The ways `ratchet check` can find its counts, other than scanning the checked directory,
+# with the other options that each of them uses. Only one can be used at once, and any
+# other option would have no effect, so it's rejected.
+CHECK_MODES: dict[str, frozenset[str]] = {
+    "--daemon": frozenset(),
+    "--from-snapshot": frozenset(),
+    "--roots-from": frozenset({"--jobs"}),
+    "--recursive-configs": frozenset({"--jobs", "--content-cache", "--stats", "--stats-json"}),
+    "--archive": frozenset({"--jobs", "--fail-fast", "--stats", "--stats-json"}),
+    "--rev": frozenset({"--jobs", "--fail-fast", "--stats", "--stats-json"}),
+    "--changed-since": _CHANGED_FILES_OPTIONS,
+    "--files-from": _CHANGED_FILES_OPTIONS,
+}
+
+# The same for `ratchet crank`, which can take its counts from a revision or a snapshot.
+CRANK_MODES: dict[str, frozenset[str]] = {
+    "--from-snapshot": frozenset(),
+    "--rev": frozenset({"--jobs", "--stats", "--stats-json"}),
+}
+
+
+def _reject_unused_options(ctx: click.Context, modes: dict[str, frozenset[str]]) -> None:
+    """
+    Raise a usage error if more than one of `modes` is given on the command line, or if
+    one is given with an option it doesn't use. Options set by environment variables are
+    ignored, as they apply to every command.
+    """
+    given = [
+        param.opts[0]
+        for param in ctx.command.params
+        if param.name is not None
+        and ctx.params.get(param.name) not in (None, False)
+        and ctx.get_parameter_source(param.name) == click.core.ParameterSource.COMMANDLINE
+    ]
+    given_modes = [option for option in given if option in modes]
+    if len(given_modes) > 1:
+        raise click.UsageError(f"{' and '.join(given_modes)} can't be used together")
+    if given_modes:
+        mode = given_modes[0]
+        if unused := [option for option in given if option != mode and option not in modes[mode]]:
+            if not modes[mode]:
+                raise click.UsageError(f"{mode} can't be used with any other option")
+            raise click.UsageError(
+                f"{mode} can only be used with {', '.join(sorted(modes[mode]))},"
+                f" not {', '.join(unused)}"
+            )
+
+
+def _start_stats(
+    command: str, show_stats: bool, stats_json: pathlib.Path | None
+) -> stats_module.Stats | None:
+    if not show_stats and stats_json is None:
+        return None
+    from . import stats as stats_module
+
+    return stats_module.Stats(command)
+
+
+def _index_path(main_options: MainOptions) -> pathlib.Path:
+    from .index import INDEX_FILE_NAME
+
+    return main_options.root / CACHE_DIR_NAME / INDEX_FILE_NAME
+
+
+def _read_snapshot(
+    fp: IO[str], config: configuration.Config | None = None
+) -> snapshot_module.Snapshot:
+    """
+    Read a snapshot, checking that its counts can be used for `config` if it's given.
+    """
+    from . import snapshot as snapshot_module
+
+    try:
+        snapshot = snapshot_module.read_snapshot(fp)
+        if config is not None:
+            snapshot.validate(config)
+        return snapshot
+    except snapshot_module.SnapshotError as e:
+        raise click.ClickException(f"{fp.name}: {e}") from e
+
+
+def _report_stats(
+    stats: stats_module.Stats | None, show_stats: bool, stats_json: pathlib.Path | None
+) -> None:
+    if stats is None:
+        return
+    if show_stats:
+        for line in stats.summary():
+            click.echo(line, err=True)
+    if stats_json is not None:
+        import json
+
+        stats_json.write_text(json.dumps(stats.to_json(), indent=2) + "\n")
+
+
+@main.command()
+@jobs_option
+@cache_option
+@content_cache_option
+@stats_options
+@rev_option
+@click.option(
+    "--changed-since",
+    metavar="REF",
+    help="Only check the files that differ from the git REF, taking the results for all other files from the cache. Implies --cache.",
+)
+@click.option(
+    "--files-from",
+    type=click.File("r"),
+    help="Only check the files listed in this file, one per line and relative to the root, or - for stdin, taking the results for all other files from the cache. Implies --cache.",
+)
+@click.option(
+    "--fail-fast",
+    is_flag=True,
+    help="Stop checking as soon as any rule exceeds its violation count.",
+)
+@click.option(
+    "--daemon",
+    "use_daemon",
+    is_flag=True,
+    help="Take the results from the daemon running for the root, started with `ratchet daemon` or `ratchet watch`.",
+)
+@click.option(
+    "--recursive-configs",
+    is_flag=True,
+    help="Check the project of every .ratchet.toml within the root, scanning each file once, and report the results of each.",
+)
+@click.option(
+    "--roots-from",
+    type=click.File("r"),
+    help="Check the project of each root listed in this file, one per line, or - for stdin, instead of the root. Every project's files are checked in one shared pool of processes, and the results of each project are printed as a line of JSON as soon as it's finished. --jobs defaults to auto.",
+)
+@click.option(
+    "--archive",
+    type=click.Path(exists=True, dir_okay=False, path_type=pathlib.Path),
+    help="Check the python files in this tar or zip archive, such as an sdist or a wheel, without extracting it. `path` and `exclude` in .ratchet.toml apply to the names of its members.",
+)
+@from_snapshot_option
+@index_option
+@click.pass_context
+def check(
+    ctx: click.Context,
+    jobs: int | Literal["auto"] | None,
+    cache: bool,
+    changed_since: str | None,
+    files_from: IO[str] | None,
+    fail_fast: bool,
+    use_daemon: bool,
+    show_stats: bool,
+    stats_json: pathlib.Path | None,
+    rev: str | None,
+    content_cache: str | None,
+    recursive_configs: bool,
+    roots_from: IO[str] | None,
+    archive: pathlib.Path | None,
+    from_snapshot: IO[str] | None,
+    update_index: bool,
+) -> None:
+    main_options = cast(MainOptions, ctx.obj)
+    _reject_unused_options(ctx, CHECK_MODES)
+
+    if recursive_configs:
+        _check_configs(main_options.root, jobs, content_cache, show_stats, stats_json)
+        return
+
+    if roots_from is not None:
+        _check_roots(roots_from, jobs)
+        return
+
+    if use_daemon:
+        from . import daemon as daemon_module
+
+        try:
+            daemon_results = daemon_module.query(main_options.root)
+        except daemon_module.DaemonError as e:
+            raise click.ClickException(str(e)) from e
+        _echo_results(daemon_results)
+        return
+
+    from . import git, usecases
+
+    snapshot = None
+    if from_snapshot is not None:
+        snapshot = _read_snapshot(from_snapshot, main_options.config)
+    changed_paths = None
+    if changed_since is not None:
+        try:
+            changed_paths = git.changed_files(main_options.check_dir, changed_since)
+        except git.GitError as e:
+            raise click.ClickException(str(e)) from e
+    elif files_from is not None:
+        changed_paths = [
+            (main_options.root / line.strip()).resolve() for line in files_from if line.strip()
+        ]
+
+    errors: tuple[type[Exception], ...] = (git.GitError,)
+    if archive is None:
+        check_dir = main_options.check_dir
+    else:
+        from . import archive as archive_module
+
+        errors = (archive_module.ArchiveError,)
+        # The checked directory is within the archive, so it needn't exist on disk.
+        check_dir = main_options.root / main_options.config.path
+    stats = _start_stats("check", show_stats, stats_json)
+    results = usecases.check(
+        check_dir,
+        main_options.config,
+        jobs,
+        main_options.cache_dir(cache or changed_paths is not None),
+        changed_paths,
+        fail_fast,
+        stats,
+        rev,
+        content_cache,
+        snapshot,
+        _index_path(main_options) if update_index else None,
+        archive,
+    )
+    try:
+        _echo_results(results, len(main_options.config.rules))
+    except errors as e:
+        raise click.ClickException(str(e)) from e
+    finally:
+        _report_stats(stats, show_stats, stats_json)
+
+
+def _check_configs(
+    root: pathlib.Path,
+    jobs: int | Literal["auto"] | None,
+    content_cache: str | None,
+    show_stats: bool,
+    stats_json: pathlib.Path | None,
+) -> None:
     try:
-        config = configuration.open_configuration(root)
+        configs = configuration.find_configurations(root)
     except (
         configuration.ProjectFileNotFoundError,
         configuration.RatchetMisconfiguredError,
     ) as e:
         raise click.ClickException(str(e)) from e
+    for config_root, config in configs:
+        if not (check_dir := config_root / config.path).exists():
+            raise click.ClickException(f"Path {check_dir} does not exist")
 
-    check_dir = root / config.path
-    if not check_dir.exists():
-        raise click.ClickException(f"Path {check_dir} does not exist")
+    from . import usecases
 
-    ctx.obj = MainOptions(config, root, check_dir)
+    stats = _start_stats("check", show_stats, stats_json)
+    try:
+        config_results = usecases.check_configs(configs, jobs, stats, content_cache)
+    finally:
+        _report_stats(stats, show_stats, stats_json)
+    failures = 0
+    for result in config_results:
+        config_path = configuration.get_configuration_path(result.root).relative_to(root)
+        click.secho(f"{config_path}:", bold=True)
+        _echo_results(result.results, len(result.config.rules), fail=False)
+        failures += any(check_result.failure for check_result in result.results)
+    if failures:
+        raise click.ClickException(
+            click.style(f"❌ {failures}/{len(config_results)} configurations failed", fg="red")
+        )
 
 
-@main.command()
-@click.pass_context
-def check(ctx: click.Context) -> None:
-    main_options = cast(MainOptions, ctx.obj)
+def _check_roots(roots_from: IO[str], jobs: int | Literal["auto"] | None) -> None:
+    import asyncio
+    import json
+
+    from . import batch
+
+    roots = [pathlib.Path(line.strip()).resolve() for line in roots_from if line.strip()]
+
+    async def stream() -> int:
+        failures = 0
+        async for result in batch.check_many(roots, "auto" if jobs is None else jobs):
+            click.echo(json.dumps(result.to_json()))
+            failures += result.failure
+        return failures
+
+    if failures := asyncio.run(stream()):
+        raise click.ClickException(
+            click.style(f"❌ {failures}/{len(roots)} projects failed", fg="red")
+        )
+
+
+def _echo_results(
+    results: Iterable[usecases.CheckResult], rule_num: int | None = None, fail: bool = True
+) -> None:
+    """
+    Print the rules that failed and a summary, raising a ClickException if any failed.
+
+    Without `fail`, a failing summary is printed instead of being raised.
+    """
+    from . import usecases
+
     failures = 0
-    rule_num = len(main_options.config.rules)
-    for result in usecases.check(main_options.check_dir, main_options.config):
-        if result.failure:
+    checked = 0
+    for result in results:
+        checked += 1
+        if isinstance(result, usecases.FailFastResult):
             failures += 1
             click.secho(
-                f"{result.rule.tool.value}.{result.rule.code} failed: {result.new_count} > {result.rule.violation_count}",
+                f"{result.rule.name} failed: at least {result.new_count} > {result.rule.violation_count} (stopped after {result.files_checked} files)",
+                fg="red",
+            )
+        elif result.failure:
+            failures += 1
+            click.secho(
+                f"{result.rule.name} failed: {result.new_count} > {result.rule.violation_count}",
                 fg="red",
             )
     if failures:
-        raise click.ClickException(click.style(f"❌ {failures}/{rule_num} failed", fg="red"))
+        summary = click.style(
+            f"❌ {failures}/{checked if rule_num is None else rule_num} failed", fg="red"
+        )
+        if fail:
+            raise click.ClickException(summary)
+        click.echo(summary, err=True)
+        return
     click.secho("✅ All rules passed", fg="green", err=True)
 
 
 @main.command()
+@jobs_option
+@cache_option
+@content_cache_option
+@stats_options
+@rev_option
+@from_snapshot_option
+@index_option
 @click.pass_context
-def crank(ctx: click.Context) -> None:
+def crank(
+    ctx: click.Context,
+    jobs: int | Literal["auto"] | None,
+    cache: bool,
+    show_stats: bool,
+    stats_json: pathlib.Path | None,
+    rev: str | None,
+    content_cache: str | None,
+    from_snapshot: IO[str] | None,
+    update_index: bool,
+) -> None:
     main_options = cast(MainOptions, ctx.obj)
+    _reject_unused_options(ctx, CRANK_MODES)
+
+    from . import git, usecases
+
+    snapshot = None
+    if from_snapshot is not None:
+        snapshot = _read_snapshot(from_snapshot, main_options.config)
     num = 0
-    for result in usecases.crank(main_options.check_dir, main_options.config, main_options.root):
+    stats = _start_stats("crank", show_stats, stats_json)
+    try:
+        cranked = usecases.crank(
+            main_options.check_dir,
+            main_options.config,
+            main_options.root,
+            jobs,
+            main_options.cache_dir(cache),
+            stats,
+            rev,
+            content_cache,
+            snapshot,
+            _index_path(main_options) if update_index else None,
+        )
+    except git.GitError as e:
+        raise click.ClickException(str(e)) from e
+    for result in cranked:
         click.secho(
-            f"{result.rule.tool.value}.{result.rule.code} cranked: {result.rule.violation_count} -> {result.new_count}",
+            f"{result.rule.name} cranked: {result.rule.violation_count} -> {result.new_count}",
             fg="green",
         )
         num += 1
 
+    _report_stats(stats, show_stats, stats_json)
     if num > 0:
         click.secho(f"✅ {num} rules cranked", fg="green", err=True)
     else:
         click.secho("No rules were cranked", fg="yellow", err=True)
+
+
+@main.command()
+@jobs_option
+@cache_option
+@content_cache_option
+@stats_options
+@click.option(
+    "--shard",
+    type=ShardParamType(),
+    help="Only scan the files in the i-th of n shards, as i/n, so that the shards of a large project can be scanned on different machines and merged with `ratchet merge`.",
+)
+@click.option(
+    "--output",
+    "-o",
+    type=click.File("w"),
+    default="-",
+    help="The file to write the snapshot to. Defaults to stdout.",
+)
+@click.pass_context
+def scan(
+    ctx: click.Context,
+    jobs: int | Literal["auto"] | None,
+    cache: bool,
+    content_cache: str | None,
+    show_stats: bool,
+    stats_json: pathlib.Path | None,
+    shard: tuple[int, int] | None,
+    output: IO[str],
+) -> None:
+    """
+    Write a snapshot of the violations in the project, or in one shard of it, for
+    `ratchet check --from-snapshot` and `ratchet crank --from-snapshot`.
+    """
+    from . import snapshot as snapshot_module
+    from . import usecases
+
+    main_options = cast(MainOptions, ctx.obj)
+    stats = _start_stats("scan", show_stats, stats_json)
+    try:
+        snapshot = usecases.scan(
+            main_options.check_dir,
+            main_options.config,
+            jobs,
+            main_options.cache_dir(cache),
+            shard,
+            stats,
+            content_cache,
+        )
+    finally:
+        _report_stats(stats, show_stats, stats_json)
+    snapshot_module.write_snapshot(snapshot, output)
+
+
+@main.command()
+@click.argument("snapshots", type=click.File("r"), nargs=-1, required=True)
+@click.option(
+    "--output",
+    "-o",
+    type=click.File("w"),
+    default="-",
+    help="The file to write the merged snapshot to. Defaults to stdout.",
+)
+def merge(snapshots: tuple[IO[str], ...], output: IO[str]) -> None:
+    """
+    Merge the snapshots of the shards of a project, written by `ratchet scan --shard`.
+    """
+    from . import snapshot as snapshot_module
+
+    try:
+        merged = snapshot_module.merge(_read_snapshot(fp) for fp in snapshots)
+    except snapshot_module.SnapshotError as e:
+        raise click.ClickException(str(e)) from e
+    snapshot_module.write_snapshot(merged, output)
+
+
+class ToolParamType(click.ParamType):
+    """
+    The name of a built-in tool, or of the tool of an installed checker plugin.
+    """
+
+    name = "tool"
+
+    def convert(
+        self, value: Any, param: click.Parameter | None, ctx: click.Context | None
+    ) -> configuration.Tool:
+        tool = configuration.Tool(value)
+        if not tool.builtin:
+            from . import plugins
+
+            try:
+                plugins.load_plugin(tool.value)
+            except plugins.PluginError as e:
+                self.fail(str(e), param, ctx)
+        return tool
+
+
+@main.command()
+@jobs_option
+@stats_options
+@click.option(
+    "--path",
+    default=".",
+    show_default=True,
+    help="The directory to check, relative to the root.",
+)
+@click.option(
+    "--tool",
+    "tools",
+    type=ToolParamType(),
+    multiple=True,
+    help="A tool to write the rules of, which can be given more than once. Defaults to noqa, fixit and mypy.",
+)
+@click.option("--force", is_flag=True, help="Replace an existing .ratchet.toml.")
+@click.pass_context
+def init(
+    ctx: click.Context,
+    jobs: int | Literal["auto"] | None,
+    show_stats: bool,
+    stats_json: pathlib.Path | None,
+    path: str,
+    tools: tuple[configuration.Tool, ...],
+    force: bool,
+) -> None:
+    """
+    Write a .ratchet.toml with a rule for every code that's suppressed in the project, each
+    at its current violation count, found in a single scan.
+    """
+    from . import usecases
+
+    main_options = cast(MainOptions, ctx.obj)
+    config_path = configuration.get_configuration_path(main_options.root)
+    if config_path.exists() and not force:
+        raise click.ClickException(f"{config_path} already exists, use --force to replace it")
+    if not (main_options.root / path).is_dir():
+        raise click.ClickException(f"Path {main_options.root / path} does not exist")
+
+    stats = _start_stats("init", show_stats, stats_json)
+    try:
+        config = usecases.init(main_options.root, path, tools or usecases.INIT_TOOLS, jobs, stats)
+    finally:
+        _report_stats(stats, show_stats, stats_json)
+    for rule in config.rules:
+        click.echo(f"{rule.name} = {rule.violation_count}")
+    click.secho(f"✅ Wrote {len(config.rules)} rules to {config_path.name}", fg="green", err=True)
+
+
+@main.command()
+@jobs_option
+@stats_options
+@click.argument("tool")
+@click.argument("code")
+@click.option(
+    "--directory",
+    metavar="DIR",
+    default="",
+    help="Budget the violations within this directory, relative to the checked path, instead of the whole project.",
+)
+@click.pass_context
+def add(
+    ctx: click.Context,
+    jobs: int | Literal["auto"] | None,
+    show_stats: bool,
+    stats_json: pathlib.Path | None,
+    tool: str,
+    code: str,
+    directory: str,
+) -> None:
+    """
+    Add a rule for CODE of TOOL to .ratchet.toml, starting at its current violation count.
+    """
+    from . import usecases
+
+    main_options = cast(MainOptions, ctx.obj)
+    if directory:
+        check_dir = main_options.check_dir.resolve()
+        path = (check_dir / directory).resolve()
+        if not path.is_dir() or not path.is_relative_to(check_dir):
+            raise click.BadParameter(
+                f"{directory} is not a directory within {main_options.config.path}",
+                param_hint="'--directory'",
+            )
+    stats = _start_stats("add", show_stats, stats_json)
+    try:
+        rule = usecases.add(
+            main_options.check_dir,
+            main_options.config,
+            main_options.root,
+            tool,
+            code,
+            directory,
+            jobs,
+            stats,
+        )
+    except configuration.RatchetMisconfiguredError as e:
+        raise click.ClickException(str(e)) from e
+    finally:
+        _report_stats(stats, show_stats, stats_json)
+    click.secho(f"✅ Added {rule.name} = {rule.violation_count}", fg="green", err=True)
+
+
+@main.command()
+@jobs_option
+@click.option(
+    "--since", metavar="REF", required=True, help="The first commit to report the counts of."
+)
+@click.option(
+    "--until",
+    metavar="REF",
+    default="HEAD",
+    show_default=True,
+    help="The last commit to report the counts of.",
+)
+@click.option(
+    "--format",
+    "output_format",
+    type=click.Choice(["csv", "json"]),
+    default="csv",
+    show_default=True,
+    help="The format to write the counts in.",
+)
+@click.option(
+    "--output",
+    "-o",
+    type=click.File("w"),
+    default="-",
+    help="The file to write the counts to. Defaults to stdout.",
+)
+@click.pass_context
+def history(
+    ctx: click.Context,
+    jobs: int | Literal["auto"] | None,
+    since: str,
+    until: str,
+    output_format: str,
+    output: IO[str],
+) -> None:
+    """
+    Report the violation counts of every commit from --since to --until, following first
+    parents, using the rules in the working tree's configuration.
+    """
+    import csv
+    import json
+
+    from . import git, usecases
+
+    main_options = cast(MainOptions, ctx.obj)
+    rules = main_options.config.rules
+    names = [rule.name for rule in rules]
+    entries = usecases.history(main_options.check_dir, main_options.config, since, until, jobs)
+    try:
+        if output_format == "csv":
+            writer = csv.writer(output, lineterminator="\n")
+            writer.writerow(["commit", "date", *names])
+            for entry in entries:
+                writer.writerow(
+                    [
+                        entry.commit.sha,
+                        entry.commit.date,
+                        *(result.new_count for result in entry.results),
+                    ]
+                )
+        else:
+            rows = [
+                {
+                    "commit": entry.commit.sha,
+                    "date": entry.commit.date,
+                    "counts": {
+                        name: result.new_count for name, result in zip(names, entry.results)
+                    },
+                }
+                for entry in entries
+            ]
+            output.write(json.dumps(rows, indent=2) + "\n")
+    except git.GitError as e:
+        raise click.ClickException(str(e)) from e
+
+
+def _split_rule(rule: str | None) -> tuple[str | None, str | None]:
+    """
+    Split a rule given as `CODE` or `TOOL.CODE` into its tool, if any, and code.
+    """
+    if rule is None:
+        return None, None
+    tool, _, code = rule.rpartition(".")
+    return tool or None, code
+
+
+rule_option = click.option(
+    "--rule",
+    metavar="[TOOL.]CODE",
+    help="Only include the violations of this rule, such as F401 or noqa.F401.",
+)
+
+
+@main.command()
+@rule_option
+@click.option(
+    "--path",
+    metavar="PATH",
+    help="Only include the violations in this file, or the files within this directory, relative to the checked directory.",
+)
+@click.pass_context
+def query(ctx: click.Context, rule: str | None, path: str | None) -> None:
+    """
+    List the violations of each file with the lines they're on, from the index written by
+    `ratchet check --index`.
+    """
+    from . import index as index_module
+
+    main_options = cast(MainOptions, ctx.obj)
+    tool, code = _split_rule(rule)
+    try:
+        with index_module.ViolationIndex(_index_path(main_options), create=False) as index:
+            entries = index.entries(tool, code, path)
+    except index_module.ViolationIndexError as e:
+        raise click.ClickException(str(e)) from e
+    for entry in entries:
+        lines = ",".join(map(str, entry.lines))
+        click.echo(f"{entry.path}:{lines} {entry.tool}.{entry.rule} {entry.count}")
+
+
+@main.command()
+@rule_option
+@click.option(
+    "--by",
+    type=click.Choice(["file", "dir"]),
+    default="file",
+    show_default=True,
+    help="Whether to total the violations of each file, or of every file within each directory and its subdirectories.",
+)
+@click.option(
+    "--limit",
+    "-n",
+    type=click.IntRange(min=1),
+    default=10,
+    show_default=True,
+    help="The number of files or directories to list.",
+)
+@click.pass_context
+def top(ctx: click.Context, rule: str | None, by: Literal["file", "dir"], limit: int) -> None:
+    """
+    List the files or directories with the most violations, from the index written by
+    `ratchet check --index`.
+    """
+    from . import index as index_module
+
+    main_options = cast(MainOptions, ctx.obj)
+    tool, code = _split_rule(rule)
+    try:
+        with index_module.ViolationIndex(_index_path(main_options), create=False) as index:
+            rows = index.top(tool, code, by, limit)
+    except index_module.ViolationIndexError as e:
+        raise click.ClickException(str(e)) from e
+    width = max((len(str(total)) for _, total in rows), default=0)
+    for key, total in rows:
+        click.echo(f"{total:>{width}} {key}")
+
+
+poll_option = click.option(
+    "--poll",
+    is_flag=True,
+    help="Poll for changes instead of using inotify. Polling is used regardless where inotify isn't available.",
+)
+
+interval_option = click.option(
+    "--interval",
+    type=click.FloatRange(min=0, min_open=True),
+    help="How often to poll for changes, in seconds. Defaults to once a second.",
+)
+
+
+@main.command()
+@poll_option
+@interval_option
+@click.pass_context
+def daemon(ctx: click.Context, poll: bool, interval: float | None) -> None:
+    """
+    Keep the violation counts up to date in the background, for `ratchet check --daemon`.
+    """
+    _serve(cast(MainOptions, ctx.obj), poll, interval, on_change=None)
+
+
+@main.command()
+@poll_option
+@interval_option
+@click.pass_context
+def watch(ctx: click.Context, poll: bool, interval: float | None) -> None:
+    """
+    Like `ratchet daemon`, but also print the results whenever they change.
+    """
+    _serve(
+        cast(MainOptions, ctx.obj),
+        poll,
+        interval,
+        on_change=lambda results: _echo_results(results, fail=False),
+    )
+
+
+def _serve(
+    main_options: MainOptions,
+    poll: bool,
+    interval: float | None,
+    on_change: Callable[[Iterable[usecases.CheckResult]], None] | None,
+) -> None:
+    import signal
+    import sys
+
+    from . import daemon as daemon_module
+
+    # The configuration has to be valid to start, though the daemon reports later errors.
+    check_dir = main_options.check_dir
+    if interval is None:
+        interval = daemon_module.POLL_INTERVAL
+    # Exit cleanly when terminated, so that the socket is removed.
+    signal.signal(signal.SIGTERM, lambda *args: sys.exit(0))
+    warm = daemon_module.Daemon(main_options.root, poll, interval, on_change)
+    try:
+        click.secho(
+            f"Watching {check_dir} {'by polling' if warm.polling else 'with inotify'}",
+            err=True,
+        )
+        warm.serve()
+    except daemon_module.DaemonError as e:
+        raise click.ClickException(str(e)) from e
+    except KeyboardInterrupt:
+        pass
+    finally:
+        warm.close()
@@ -1,13 +1,23 @@
 from __future__ import annotations
 
+import array
 import dataclasses
 import enum
+import os
 import pathlib
-from collections.abc import Collection
-from typing import IO, NotRequired, Sequence, TypedDict
+import posixpath
+from collections.abc import Collection, Iterable
+from typing import IO, TYPE_CHECKING, Literal, NotRequired, Sequence, TypedDict, get_args
 
-import toml as tomllib
+import tomllib
 
+from . import plugins
+from .exclude import Excluder
+from .parsing import Engine
+
+
+if TYPE_CHECKING:
+    from .checkers import Violation
 
 TOML_EXAMPLE = """
 path = "src"
@@ -27,18 +37,36 @@ FixitRuleFixmeOnly = 43
 
 [mypy]
 assignment = 2
+
+[mypy."billing"]
+assignment = 1
 """
 
+CONFIG_FILE_NAME = ".ratchet.toml"
+# Where `--cache` keeps the results of the last run, beneath the root.
+CACHE_DIR_NAME = ".ratchet_cache"
+
+# The code of the rules that count every code of a tool, which `ratchet init` scans with to
+# find the codes in use. It can't be used in a configuration file.
+WILDCARD = "*"
+
+# The folders that aren't checked when a configuration doesn't set `exclude`, which are also
+# skipped when searching for configuration files.
+DEFAULT_EXCLUDE = ["__pycache__", ".git", ".venv", "node_modules", ".mypy_cache"]
+
 RatchetConfig = TypedDict(
     "RatchetConfig",
     {
         "path": str,
         "exclude": NotRequired[Sequence[str]],
-        "noqa": NotRequired[dict[str, int]],
-        "fixit": NotRequired[dict[str, int]],
-        "fixit-ignore": NotRequired[dict[str, int]],
-        "fixit-fixme": NotRequired[dict[str, int]],
-        "mypy": NotRequired[dict[str, int]],
+        "gitignore": NotRequired[bool],
+        "jobs": NotRequired[int | Literal["auto"]],
+        "engine": NotRequired[Engine],
+        "noqa": NotRequired[dict[str, int | dict[str, int]]],
+        "fixit": NotRequired[dict[str, int | dict[str, int]]],
+        "fixit-ignore": NotRequired[dict[str, int | dict[str, int]]],
+        "fixit-fixme": NotRequired[dict[str, int | dict[str, int]]],
+        "mypy": NotRequired[dict[str, int | dict[str, int]]],
     },
 )
 
@@ -53,18 +81,166 @@ class ProjectFileNotFoundError(FileNotFoundError):
 
 @enum.unique
 class Tool(str, enum.Enum):
+    """
+    A tool whose suppressions are counted, named by its section of the configuration.
+
+    Iterating over the class gives the built-in tools. The tools of checker plugins are
+    created on demand when they're looked up by name.
+    """
+
     NOQA = "noqa"
     FIXIT_FIXME = "fixit-fixme"
     FIXIT_IGNORE = "fixit-ignore"
     FIXIT_ANY = "fixit"
     MYPY = "mypy"
 
+    @property
+    def builtin(self) -> bool:
+        return type(self).__members__.get(self._name_) is self
+
+    @classmethod
+    def _missing_(cls, value: object) -> Tool | None:
+        if not isinstance(value, str):
+            return None
+        # Created the same way as the pseudo-members of flags, so that each name has a single
+        # member, which pickles by value like the others.
+        member = str.__new__(cls, value)
+        member._name_ = value
+        member._value_ = value
+        return cls._value2member_map_.setdefault(value, member)  # type: ignore[return-value]
+
 
 @dataclasses.dataclass(frozen=True, slots=True)
 class Rule:
     tool: Tool
     code: str
     violation_count: int
+    # The directory that the budget is for, relative to the checked directory and separated
+    # by `/`, or an empty string for the whole project.
+    path: str = ""
+
+    @property
+    def name(self) -> str:
+        """
+        The name of the rule as it's written in the configuration, such as `noqa.F401`.
+        """
+        if self.path:
+            return f'{self.tool.value}."{self.path}".{self.code}'
+        return f"{self.tool.value}.{self.code}"
+
+
+class RuleIndex:
+    """
+    Interns the tool and code of each rule to a small integer id.
+
+    Ids are assigned in the order the rules are configured, starting from 0, so they can
+    index arrays of per-rule values.
+    """
+
+    def __init__(self, rules: Iterable[Rule]) -> None:
+        self.ids: dict[tuple[Tool, str], int] = {}
+        for rule in rules:
+            self.ids.setdefault((rule.tool, rule.code), len(self.ids))
+        self.keys = list(self.ids)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def counts(self) -> RuleCounts:
+        return RuleCounts(self)
+
+
+class RuleCounts:
+    """
+    Violation counts per rule, in an array indexed by the ids of a RuleIndex.
+
+    Counts for tools and codes that aren't in the index are dropped, so the memory used
+    only depends on the number of rules.
+    """
+
+    def __init__(self, index: RuleIndex) -> None:
+        self.index = index
+        self.array = array.array("q", bytes(8 * len(index)))
+
+    def add(self, tool: Tool, code: str, count: int) -> int | None:
+        """
+        Add to the count for a tool and code, returning its rule id if it was counted.
+        """
+        rule_id = self.index.ids.get((tool, code))
+        if rule_id is not None:
+            self.array[rule_id] += count
+        return rule_id
+
+    def __getitem__(self, key: tuple[Tool, str]) -> int:
+        rule_id = self.index.ids.get(key)
+        return 0 if rule_id is None else self.array[rule_id]
+
+
+class ProjectCounts:
+    """
+    The violation counts of the rules of a configuration, in the whole project and within
+    each directory that has budgets of its own.
+
+    The budgeted directories are kept in a prefix tree. Each file's violations are added
+    to the totals and to the counts of every budgeted directory above it, which are found
+    by walking down the tree once per directory that holds files, so every budget is
+    counted in the same pass over the files.
+
+    Paths are relative to the checked directory once `prefix` is removed from them.
+    """
+
+    def __init__(self, config: Config, prefix: str = "") -> None:
+        self.totals = config.rule_index.counts()
+        self.prefix = prefix
+        self._tree = _DirectoryNode()
+        self._directories: dict[str, RuleCounts] = {}
+        for rule in config.rules:
+            if rule.path and rule.path not in self._directories:
+                node = self._tree
+                for part in rule.path.split("/"):
+                    node = node.children.setdefault(part, _DirectoryNode())
+                node.counts = self._directories[rule.path] = config.rule_index.counts()
+        # The counts of the budgeted directories above each directory that holds files.
+        self._within: dict[str, list[RuleCounts]] = {}
+
+    def add(self, path: str, violations: Iterable[Violation], sign: int = 1) -> None:
+        """
+        Add the violations of the file at `path`, or remove them with a `sign` of -1.
+        """
+        totals = self.totals
+        for violation in violations:
+            totals.add(violation.tool, violation.rule, sign * violation.count)
+        if not self._directories:
+            return
+        relative = path.removeprefix(self.prefix).replace(os.sep, "/")
+        for counts in self._directory_counts(relative.rpartition("/")[0]):
+            for violation in violations:
+                counts.add(violation.tool, violation.rule, sign * violation.count)
+
+    def __getitem__(self, rule: Rule) -> int:
+        counts = self._directories[rule.path] if rule.path else self.totals
+        return counts[(rule.tool, rule.code)]
+
+    def _directory_counts(self, directory: str) -> list[RuleCounts]:
+        within = self._within.get(directory)
+        if within is None:
+            within = []
+            node = self._tree
+            for part in directory.split("/") if directory else ():
+                child = node.children.get(part)
+                if child is None:
+                    break
+                node = child
+                if node.counts is not None:
+                    within.append(node.counts)
+            self._within[directory] = within
+        return within
+
+
+@dataclasses.dataclass(slots=True)
+class _DirectoryNode:
+    children: dict[str, _DirectoryNode] = dataclasses.field(default_factory=dict)
+    counts: RuleCounts | None = None
 
 
 @dataclasses.dataclass(frozen=True, slots=True)
@@ -72,13 +248,31 @@ class Config:
     path: pathlib.Path
     rules: Sequence[Rule]
     excluded_folders: Collection[str] = dataclasses.field(default_factory=list)
+    jobs: int | Literal["auto"] = 1
+    engine: Engine = "tokenize"
+    gitignore: bool = False
+    rule_index: RuleIndex = dataclasses.field(init=False, repr=False, compare=False)
+    excluder: Excluder = dataclasses.field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "rule_index", RuleIndex(self.rules))
+        object.__setattr__(self, "excluder", Excluder(self.excluded_folders, self.gitignore))
 
     def to_toml_dict(self) -> RatchetConfig:
         config = RatchetConfig(path=str(self.path))
         if self.excluded_folders:
             config["exclude"] = list(self.excluded_folders)
+        if self.jobs != 1:
+            config["jobs"] = self.jobs
+        if self.engine != "tokenize":
+            config["engine"] = self.engine
+        if self.gitignore:
+            config["gitignore"] = True
         for rule in self.rules:
-            config.setdefault(rule.tool.value, {})[rule.code] = rule.violation_count  # type: ignore[misc]
+            section = config.setdefault(rule.tool.value, {})  # type: ignore[misc]
+            if rule.path:
+                section = section.setdefault(rule.path, {})
+            section[rule.code] = rule.violation_count
         return config
 
 
@@ -92,23 +286,76 @@ def read_configuration(toml_config: RatchetConfig) -> Config:
         raise RatchetMisconfiguredError("Key `path` not found")
 
     path = toml_config["path"]
-    exclude = toml_config.get(
-        "exclude", ["__pycache__", ".git", ".venv", "node_modules", ".mypy_cache"]
-    )
-
-    for tool in Tool:
+    exclude = toml_config.get("exclude", DEFAULT_EXCLUDE)
+
+    jobs = toml_config.get("jobs", 1)
+    if jobs != "auto" and (not isinstance(jobs, int) or isinstance(jobs, bool) or jobs < 1):
+        raise RatchetMisconfiguredError('`jobs` must be a positive number or "auto"')
+
+    engine = toml_config.get("engine", "tokenize")
+    if engine not in get_args(Engine):
+        raise RatchetMisconfiguredError(f"`engine` must be one of {', '.join(get_args(Engine))}")
+
+    gitignore = toml_config.get("gitignore", False)
+    if not isinstance(gitignore, bool):
+        raise RatchetMisconfiguredError("`gitignore` must be true or false")
+
+    # Other sections hold the rules of plugins, which are loaded now so that a missing or
+    # broken plugin is reported as a problem with the configuration.
+    builtin_tools = {tool.value for tool in Tool}
+    plugin_tools = [
+        Tool(name)
+        for name, section in toml_config.items()
+        if isinstance(section, dict) and name not in builtin_tools
+    ]
+    for tool in plugin_tools:
+        try:
+            plugins.load_plugin(tool.value)
+        except plugins.PluginError as e:
+            raise RatchetMisconfiguredError(f"Section `[{tool.value}]`: {e}") from e
+
+    for tool in [*Tool, *plugin_tools]:
         tool_section = toml_config.get(tool.value)
         if isinstance(tool_section, dict):
-            for code, violation_count in tool_section.items():
-                if not isinstance(violation_count, int):
-                    raise RatchetMisconfiguredError(
-                        f"Violation count for `{tool.value}.{code}` must be a number"
-                    )
-                rules.append(Rule(tool, code, int(violation_count)))
-    return Config(pathlib.Path(path), rules=rules, excluded_folders=exclude)
+            for code, value in tool_section.items():
+                # Tables within a tool's section hold the budgets of a directory.
+                if isinstance(value, dict):
+                    directory = _budget_path(tool, code)
+                    for directory_code, violation_count in value.items():
+                        rule = Rule(tool, directory_code, 0, directory)
+                        rules.append(_with_count(rule, violation_count))
+                else:
+                    rules.append(_with_count(Rule(tool, code, 0), value))
+    return Config(
+        pathlib.Path(path),
+        rules=rules,
+        excluded_folders=exclude,
+        jobs=jobs,
+        engine=engine,
+        gitignore=gitignore,
+    )
 
 
-def open_configuration(root_path: pathlib.Path, config_file_name: str = ".ratchet.toml") -> Config:
+def _with_count(rule: Rule, violation_count: object) -> Rule:
+    if rule.code == WILDCARD:
+        raise RatchetMisconfiguredError(f"`{rule.name}` isn't a code, each code needs a rule")
+    if not isinstance(violation_count, int):
+        raise RatchetMisconfiguredError(f"Violation count for `{rule.name}` must be a number")
+    return dataclasses.replace(rule, violation_count=int(violation_count))
+
+
+def _budget_path(tool: Tool, path: str) -> str:
+    normalized = posixpath.normpath(path.replace("\\", "/"))
+    if normalized == "." or normalized.startswith(("/", "../")) or normalized == "..":
+        raise RatchetMisconfiguredError(
+            f'`[{tool.value}."{path}"]` must be a directory within the checked directory'
+        )
+    return normalized
+
+
+def open_configuration(
+    root_path: pathlib.Path, config_file_name: str = CONFIG_FILE_NAME
+) -> Config:
     """
     Open and parse the configuration file.
     """
@@ -117,20 +364,83 @@ def open_configuration(root_path: pathlib.Path, config_file_name: str = ".ratche
     if not config_file.exists():
         raise ProjectFileNotFoundError(f"Configuration file {config_file} not found")
 
-    with config_file.open("r") as fp:
+    with config_file.open("rb") as fp:
         toml = tomllib.load(fp)
     return read_configuration(toml)  # type: ignore [arg-type]
 
 
+def find_configurations(
+    root_path: pathlib.Path, config_file_name: str = CONFIG_FILE_NAME
+) -> list[tuple[pathlib.Path, Config]]:
+    """
+    Find and parse every configuration file within the root directory, returning each with
+    the directory that it's in, sorted by directory.
+
+    The folders in `DEFAULT_EXCLUDE` aren't searched.
+    """
+    excluder = Excluder(DEFAULT_EXCLUDE)
+    configs = []
+    for directory, dirnames, filenames in os.walk(root_path):
+        relative = pathlib.Path(directory).relative_to(root_path).as_posix()
+        prefix = "" if relative == "." else f"{relative}/"
+        dirnames[:] = [name for name in dirnames if not excluder.excludes(prefix + name, True)]
+        if config_file_name in filenames:
+            try:
+                config = open_configuration(pathlib.Path(directory), config_file_name)
+            except RatchetMisconfiguredError as e:
+                raise RatchetMisconfiguredError(
+                    f"{pathlib.Path(directory, config_file_name)}: {e}"
+                ) from e
+            configs.append((pathlib.Path(directory), config))
+    if not configs:
+        raise ProjectFileNotFoundError(f"No {config_file_name} files found in {root_path}")
+    return sorted(configs, key=lambda item: item[0])
+
+
+def merge_configurations(configs: Sequence[Config]) -> Config:
+    """
+    Return a configuration that checks every rule of the given configurations, for scanning
+    their files once.
+
+    The merged rules are for the whole project, and their violation counts are
+    meaningless. Only the `exclude` patterns
+    that every configuration shares and that match at any depth are kept, and `.gitignore`
+    files are only read if every configuration reads them, so no file that any of them
+    checks is excluded.
+    """
+    rules = {(rule.tool, rule.code): rule for config in configs for rule in config.rules}
+    shared = set.intersection(*(set(config.excluded_folders) for config in configs))
+    excluded_folders = [
+        pattern
+        for pattern in configs[0].excluded_folders
+        if pattern in shared and "/" not in pattern.rstrip("/")
+    ]
+    engines = {config.engine for config in configs}
+    jobs: int | Literal["auto"] = "auto"
+    if all(config.jobs != "auto" for config in configs):
+        jobs = max(int(config.jobs) for config in configs)
+    return Config(
+        pathlib.Path("."),
+        rules=[dataclasses.replace(rule, violation_count=0, path="") for rule in rules.values()],
+        excluded_folders=excluded_folders,
+        jobs=jobs,
+        engine=engines.pop() if len(engines) == 1 else "tokenize",
+        gitignore=all(config.gitignore for config in configs),
+    )
+
+
 def write_configuration(config: Config, destination: IO[str]) -> str:
     """
     Write the configuration to the file.
     """
-    return tomllib.dump(config.to_toml_dict(), destination)
+    # The standard library can only read TOML. Writing is rare, so its import is deferred.
+    import toml
+
+    return toml.dump(config.to_toml_dict(), destination)
 
 
 def get_configuration_path(
-    root_path: pathlib.Path, config_file_name: str = ".ratchet.toml"
+    root_path: pathlib.Path, config_file_name: str = CONFIG_FILE_NAME
 ) -> pathlib.Path:
     """
     Return the path to the configuration file.
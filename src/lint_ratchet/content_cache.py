@@ -0,0 +1,298 @@
+import contextlib
+import hashlib
+import json
+import os
+import pathlib
+import tempfile
+import urllib.parse
+from collections.abc import Sequence
+from typing import TYPE_CHECKING, Any, Protocol
+
+from .cache import dump_violation, load_violation, ruleset_digest
+from .checkers import Violation
+from .configuration import Rule
+from .parsing import Engine
+
+
+if TYPE_CHECKING:
+    import http.client
+
+
+# The default limit on the disk space used by a cache directory, beyond which the least
+# recently used entries are evicted.
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# When a put takes a cache directory over its limit, entries are evicted until it uses this
+# fraction of the limit, so the puts that follow don't each scan the directory again.
+EVICTION_TARGET = 0.9
+
+# How long to wait for an HTTP store before treating a request as a miss.
+HTTP_TIMEOUT = 5.0
+
+# After this many requests in a row fail, the HTTP store is no longer used for the run, so
+# an unavailable server only slows the first few files down.
+HTTP_MAX_FAILURES = 3
+
+
+class Backend(Protocol):
+    """
+    Where a content cache stores its entries. Backends may be shared by several processes
+    and machines at once, so `put` must be atomic.
+    """
+
+    def get(self, key: str) -> bytes | None: ...
+
+    def put(self, key: str, value: bytes) -> None: ...
+
+    def close(self) -> None: ...
+
+
+class ContentCache:
+    """
+    Per-file violations keyed by a hash of the file's contents and the ruleset.
+
+    Unlike `ResultCache`, entries don't depend on where a file is or when it was written,
+    so they carry across fresh checkouts and can be shared by every runner of a project.
+
+    A content cache is pickled to the worker processes that check files, so `hits` and
+    `misses` only count the lookups made in this process.
+    """
+
+    def __init__(self, backend: Backend, rules: Sequence[Rule], engine: Engine) -> None:
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        # Keying the hash with the ruleset means a changed ruleset never sees old entries.
+        self._hash_key = hashlib.sha256(f"{ruleset_digest(rules)}:{engine}".encode()).digest()
+
+    def key(self, source: bytes) -> str:
+        return hashlib.blake2b(source, digest_size=20, key=self._hash_key).hexdigest()
+
+    def get(self, key: str, lines: bool = False) -> list[Violation] | None:
+        """
+        Return the cached violations for the contents hashed to `key`, or None if unknown.
+
+        With `lines`, violations that were cached without their lines are unknown too.
+        """
+        value = self.backend.get(key)
+        try:
+            violations = None if value is None else _load_violations(value)
+        except (ValueError, TypeError):
+            violations = None
+        if (
+            lines
+            and violations is not None
+            and not all(violation.lines for violation in violations)
+        ):
+            violations = None
+        if violations is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return violations
+
+    def put(self, key: str, violations: Sequence[Violation]) -> None:
+        value = [dump_violation(violation) for violation in violations]
+        self.backend.put(key, json.dumps(value, separators=(",", ":")).encode())
+
+    def close(self) -> None:
+        self.backend.close()
+
+
+class DirectoryBackend:
+    """
+    Stores entries as files in a directory, which may be on a shared filesystem.
+
+    Entries are written to a temporary file and renamed into place, so concurrent readers
+    never see a partial entry. Reading an entry updates its modification time, and when a
+    put takes the disk space used by the directory over `max_bytes`, the least recently
+    used entries are removed.
+
+    The space used is measured once, by the first put of each process, and then counted as
+    entries are written, so runs that only read the cache never scan it. Other processes'
+    puts aren't counted until the next scan, so the limit may be exceeded for a while.
+    """
+
+    def __init__(self, directory: pathlib.Path, max_bytes: int | None = DEFAULT_MAX_BYTES) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._usage: int | None = None
+
+    def __getstate__(self) -> dict[str, Any]:
+        # Each process measures the space used when it first writes an entry.
+        state = self.__dict__.copy()
+        state["_usage"] = None
+        return state
+
+    def get(self, key: str) -> bytes | None:
+        path = self._path(key)
+        try:
+            value = path.read_bytes()
+        except OSError:
+            return None
+        with contextlib.suppress(OSError):
+            os.utime(path)
+        return value
+
+    def put(self, key: str, value: bytes) -> None:
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=key, suffix=".tmp")
+        except OSError:
+            # A read-only or full cache only means the result isn't shared.
+            return
+        try:
+            with os.fdopen(fd, "wb") as fp:
+                fp.write(value)
+                fp.flush()
+                size = _disk_usage(os.fstat(fp.fileno()))
+            os.replace(tmp_name, path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.unlink(tmp_name)
+            raise
+        if self.max_bytes is None:
+            return
+        if self._usage is None:
+            # The scan already includes the new entry.
+            self._usage = self._scan()[1]
+        else:
+            self._usage += size
+        if self._usage > self.max_bytes:
+            self.evict(int(self.max_bytes * EVICTION_TARGET))
+
+    def close(self) -> None:
+        pass
+
+    def evict(self, max_bytes: int) -> int:
+        """
+        Remove the least recently used entries until at most `max_bytes` of disk space are
+        used, returning the number of entries removed.
+        """
+        entries, total = self._scan()
+        removed = 0
+        entries.sort()
+        for _, size, path in entries:
+            if total <= max_bytes:
+                break
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(path)
+                removed += 1
+            total -= size
+        self._usage = total
+        return removed
+
+    def _scan(self) -> tuple[list[tuple[int, int, str]], int]:
+        entries = []
+        total = 0
+        for shard in _scandir(self.directory):
+            if not shard.is_dir(follow_symlinks=False):
+                continue
+            for entry in _scandir(shard.path):
+                with contextlib.suppress(FileNotFoundError):
+                    stat = entry.stat(follow_symlinks=False)
+                    size = _disk_usage(stat)
+                    entries.append((stat.st_mtime_ns, size, entry.path))
+                    total += size
+        return entries, total
+
+    def _path(self, key: str) -> pathlib.Path:
+        # Entries are spread over subdirectories so that no directory grows too large.
+        return self.directory / key[:2] / key
+
+
+class HTTPBackend:
+    """
+    Stores entries on an HTTP server, reading `<url>/<key>` with GET and writing it with PUT.
+
+    Any server that stores the bodies of PUT requests and serves them back will do. Failed
+    requests are treated as misses, so an unavailable server never fails a check.
+    """
+
+    def __init__(self, url: str, timeout: float = HTTP_TIMEOUT) -> None:
+        parts = urllib.parse.urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.netloc:
+            raise ValueError(f"{url} is not an http or https URL")
+        self.url = url
+        self.timeout = timeout
+        self.failures = 0
+        self._https = parts.scheme == "https"
+        self._netloc = parts.netloc
+        self._path = parts.path.rstrip("/")
+        self._connection: http.client.HTTPConnection | None = None
+
+    def __getstate__(self) -> dict[str, Any]:
+        # Each process opens its own connection.
+        state = self.__dict__.copy()
+        state["_connection"] = None
+        return state
+
+    def get(self, key: str) -> bytes | None:
+        response = self._request("GET", key)
+        return response[1] if response is not None and response[0] == 200 else None
+
+    def put(self, key: str, value: bytes) -> None:
+        self._request("PUT", key, value)
+
+    def close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def _request(
+        self, method: str, key: str, body: bytes | None = None
+    ) -> tuple[int, bytes] | None:
+        if self.failures >= HTTP_MAX_FAILURES:
+            return None
+        # Imported here as it's slow to import, due to ssl, and only needed for HTTP stores.
+        import http.client
+
+        # A kept alive connection may have been closed by the server, so retry once.
+        for _ in range(2):
+            if self._connection is None:
+                connection_class = (
+                    http.client.HTTPSConnection if self._https else http.client.HTTPConnection
+                )
+                self._connection = connection_class(self._netloc, timeout=self.timeout)
+            try:
+                self._connection.request(method, f"{self._path}/{key}", body=body)
+                response = self._connection.getresponse()
+                value = response.read()
+            except (OSError, http.client.HTTPException):
+                self.close()
+                continue
+            if response.status >= 500:
+                break
+            self.failures = 0
+            return response.status, value
+        self.failures += 1
+        return None
+
+
+def open_backend(location: str, max_bytes: int | None = DEFAULT_MAX_BYTES) -> Backend:
+    """
+    Return the backend for `location`, either an http(s) URL or a directory.
+    """
+    if location.startswith(("http://", "https://")):
+        return HTTPBackend(location)
+    return DirectoryBackend(pathlib.Path(location), max_bytes)
+
+
+def _scandir(path: str | os.PathLike[str]) -> list[os.DirEntry[str]]:
+    try:
+        with os.scandir(path) as entries:
+            return list(entries)
+    except (FileNotFoundError, NotADirectoryError):
+        return []
+
+
+def _disk_usage(stat: os.stat_result) -> int:
+    # Small entries take a whole block, so their size alone would underestimate the space
+    # used many times over. Windows doesn't report blocks.
+    blocks = getattr(stat, "st_blocks", None)
+    return stat.st_size if blocks is None else blocks * 512
+
+
+def _load_violations(value: bytes) -> list[Violation]:
+    return [load_violation(violation) for violation in json.loads(value)]
@@ -0,0 +1,527 @@
+"""
+A long running process that keeps the violation counts of a project up to date.
+
+The daemon scans the project once, then watches it for changes and rechecks only the
+files that changed. `query` asks a running daemon for its counts over a Unix socket,
+which is much faster than scanning the project again.
+"""
+
+import contextlib
+import ctypes
+import ctypes.util
+import errno
+import hashlib
+import json
+import os
+import pathlib
+import selectors
+import socket
+import struct
+import sys
+import tempfile
+import threading
+import time
+from collections.abc import Callable, Iterator, Sequence
+
+from . import check as check_module
+from . import configuration
+from .cache import Fingerprint, fingerprint
+from .checkers import Checkers, Violation, get_checkers
+from .exclude import GITIGNORE
+from .usecases import CheckResult
+
+
+# How often the project is polled for changes when inotify isn't available, in seconds.
+POLL_INTERVAL = 1.0
+
+# How long a client waits for the daemon to answer, in seconds.
+QUERY_TIMEOUT = 10.0
+
+# Bump when the messages exchanged over the socket change.
+PROTOCOL_VERSION = 1
+
+# inotify constants, from <sys/inotify.h>.
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ONLYDIR = 0x01000000
+_IN_ISDIR = 0x40000000
+_IN_WATCH_MASK = (
+    _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE | _IN_ONLYDIR
+)
+_IN_EVENT = struct.Struct("iIII")
+
+
+class DaemonError(Exception):
+    pass
+
+
+def socket_path(root: pathlib.Path) -> pathlib.Path:
+    """
+    Return the path of the socket that the daemon for `root` listens on.
+
+    Sockets live in the user's runtime directory, as their paths are limited to around
+    100 characters, and are named after a digest of the root so each project has its own.
+    """
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    digest = hashlib.sha256(str(root.resolve()).encode()).hexdigest()[:16]
+    return pathlib.Path(runtime_dir) / f"ratchet-{os.getuid()}-{digest}.sock"
+
+
+def query(root: pathlib.Path, path: pathlib.Path | None = None) -> list[CheckResult]:
+    """
+    Ask the daemon running for `root` for the current result of each rule.
+    """
+    path = socket_path(root) if path is None else path
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.settimeout(QUERY_TIMEOUT)
+        try:
+            client.connect(str(path))
+        except (FileNotFoundError, ConnectionRefusedError) as e:
+            raise DaemonError(
+                f"No daemon is running for {root}, start one with `ratchet daemon`"
+            ) from e
+        client.sendall(json.dumps({"version": PROTOCOL_VERSION, "command": "check"}).encode())
+        client.shutdown(socket.SHUT_WR)
+        response = json.loads(_receive(client))
+
+    if response.get("error"):
+        raise DaemonError(response["error"])
+    return [
+        CheckResult(
+            configuration.Rule(
+                configuration.Tool(result["tool"]),
+                result["code"],
+                result["violation_count"],
+                result.get("path", ""),
+            ),
+            result["new_count"],
+        )
+        for result in response["results"]
+    ]
+
+
+class Daemon:
+    """
+    The violations of every file in a project, kept up to date as files change.
+
+    Changes are picked up through inotify where it is available, and by comparing the
+    stat results of every file every `poll_interval` seconds otherwise. Either way, only
+    files whose modification time, size or inode changed are checked again. The
+    configuration is reloaded when `.ratchet.toml` changes, and when `.gitignore` files
+    are used, the project is rescanned with them when any of them changes.
+
+    With inotify, every change made before a query is included in its answer. When
+    polling, answers can be up to `poll_interval` seconds out of date.
+    """
+
+    def __init__(
+        self,
+        root: pathlib.Path,
+        poll: bool = False,
+        poll_interval: float = POLL_INTERVAL,
+        on_change: Callable[[Sequence[CheckResult]], None] | None = None,
+    ) -> None:
+        self.root = root
+        self.config_path = configuration.get_configuration_path(root)
+        self.poll_interval = poll_interval
+        self.on_change = on_change
+        self.force_poll = poll
+        self.error: str | None = None
+        self.counts = configuration.ProjectCounts(configuration.Config(pathlib.Path("."), []))
+        self._files: dict[str, tuple[Fingerprint, list[Violation]]] = {}
+        # The known files in each directory, so that forgetting a directory only looks at
+        # the files within it.
+        self._directories: dict[str, set[str]] = {}
+        self._config_fingerprint: Fingerprint | None = None
+        self._inotify: _Inotify | None = None
+        self._polled = 0.0
+        self.load()
+
+    @property
+    def polling(self) -> bool:
+        return self._inotify is None
+
+    def load(self) -> None:
+        """
+        Read the configuration and scan the whole project.
+
+        If the configuration is invalid, the error is reported to clients until it is
+        fixed, and the project is not scanned.
+        """
+        self.close()
+        self._files.clear()
+        self._directories.clear()
+        self._config_fingerprint = _stat_fingerprint(self.config_path)
+        try:
+            self.config = configuration.open_configuration(self.root)
+        except (
+            configuration.ProjectFileNotFoundError,
+            configuration.RatchetMisconfiguredError,
+        ) as e:
+            self.error = str(e)
+            return
+        self.error = None
+        self.check_dir = self.root / self.config.path
+        self.counts = configuration.ProjectCounts(self.config, os.path.join(self.check_dir, ""))
+        self._excluder = self.config.excluder.for_directory(self.check_dir)
+        self.checkers = Checkers(get_checkers(self.config.rules))
+        if not self.force_poll:
+            self._inotify = _Inotify.create()
+        if self._inotify is not None:
+            # Watch before scanning, so that nothing that changes during the scan is missed.
+            self._inotify.watch(str(self.root), recursive=False)
+            if self.config.gitignore:
+                # The `.gitignore` files between the root and the checked directory apply
+                # to it too.
+                for parent in self.config.path.parents:
+                    self._inotify.watch(str(self.root / parent), recursive=False)
+            if not self._inotify.watch(str(self.check_dir), self._is_checked_dir):
+                self.close()
+        self._rescan(str(self.check_dir))
+
+    def results(self) -> list[CheckResult]:
+        return [CheckResult(rule, self.counts[rule]) for rule in self.config.rules]
+
+    def poll(self) -> None:
+        """
+        Pick up any changes since the last call.
+        """
+        self._polled = time.monotonic()
+        if _stat_fingerprint(self.config_path) != self._config_fingerprint:
+            self.load()
+        elif self.error is not None:
+            return
+        elif self._inotify is None:
+            # Rescanning reads the `.gitignore` files beneath the checked directory afresh,
+            # but not those of the checked directory and its parents.
+            self._excluder = self.config.excluder.for_directory(self.check_dir)
+            self._rescan(str(self.check_dir))
+        else:
+            self._apply(self._inotify.read())
+
+    def serve(self, path: pathlib.Path | None = None, stop: threading.Event | None = None) -> None:
+        """
+        Answer queries on the socket for the root until `stop` is set or the process is
+        interrupted.
+        """
+        path = socket_path(self.root) if path is None else path
+        with _listen(path) as server, selectors.DefaultSelector() as selector:
+            selector.register(server, selectors.EVENT_READ)
+            last_results = None
+            while stop is None or not stop.is_set():
+                # Registered afresh each time, as reloading the configuration replaces it.
+                inotify = self._inotify
+                if inotify is not None:
+                    selector.register(inotify.fd, selectors.EVENT_READ)
+                for key, _ in selector.select(self.poll_interval):
+                    if key.fileobj is server:
+                        self._answer(server)
+                if inotify is not None:
+                    selector.unregister(inotify.fd)
+                if not self.polling or time.monotonic() - self._polled >= self.poll_interval:
+                    self.poll()
+
+                if self.on_change is not None and self.error is None:
+                    results = self.results()
+                    if results != last_results:
+                        self.on_change(results)
+                        last_results = results
+
+    def close(self) -> None:
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+    def _answer(self, server: socket.socket) -> None:
+        connection, _ = server.accept()
+        with connection:
+            connection.settimeout(QUERY_TIMEOUT)
+            try:
+                request = json.loads(_receive(connection))
+            except (OSError, ValueError):
+                return
+            if not self.polling:
+                # Include every change made before the query was sent.
+                self.poll()
+            response: dict[str, object]
+            if request.get("version") != PROTOCOL_VERSION:
+                response = {"error": "The daemon is running a different version of ratchet"}
+            elif self.error is not None:
+                response = {"error": self.error}
+            else:
+                response = {
+                    "results": [
+                        {
+                            "tool": result.rule.tool.value,
+                            "code": result.rule.code,
+                            "violation_count": result.rule.violation_count,
+                            "path": result.rule.path,
+                            "new_count": result.new_count,
+                        }
+                        for result in self.results()
+                    ]
+                }
+            with contextlib.suppress(OSError):
+                connection.sendall(json.dumps(response).encode())
+
+    def _apply(self, events: list[tuple[str, int]] | None) -> None:
+        if events is None:
+            # The kernel dropped events, so anything might have changed.
+            self._rescan(str(self.check_dir))
+            return
+        ignores_changed = False
+        for path, mask in events:
+            if path == str(self.config_path):
+                self.load()
+                return
+            if self.config.gitignore and os.path.basename(path) == GITIGNORE:
+                ignores_changed = True
+                continue
+            if not path.startswith(str(self.check_dir) + os.sep):
+                continue
+            if not mask & _IN_ISDIR:
+                self._refresh(path)
+            elif mask & (_IN_DELETE | _IN_MOVED_FROM):
+                assert self._inotify is not None
+                self._inotify.unwatch(path)
+                self._forget_directory(path)
+            elif self._is_checked_dir(path):
+                assert self._inotify is not None
+                self._inotify.watch(path, self._is_checked_dir)
+                self._rescan(path)
+        if ignores_changed:
+            self._reload_ignores()
+
+    def _reload_ignores(self) -> None:
+        """
+        Rebuild the excluder after a `.gitignore` file changed, and rescan the checked
+        directory so that newly ignored files are forgotten and the others are checked.
+        """
+        assert self._inotify is not None
+        self._excluder = self.config.excluder.for_directory(self.check_dir)
+        # Directories that were ignored until now aren't watched yet.
+        if not self._inotify.watch(str(self.check_dir), self._is_checked_dir):
+            self.close()
+        self._rescan(str(self.check_dir))
+
+    def _rescan(self, directory: str) -> None:
+        """
+        Check every file under `directory` that changed, and forget any that were deleted.
+        """
+        seen = set()
+        changed: dict[str, Fingerprint] = {}
+        relative = pathlib.Path(directory).relative_to(self.check_dir)
+        excluder = self._excluder.descend(self.check_dir, relative)
+        prefix = f"{relative.as_posix()}/" if relative.parts else ""
+        entries = (
+            ()
+            if excluder is None
+            else check_module.walk(pathlib.Path(directory), excluder, prefix)
+        )
+        for entry in entries:
+            seen.add(entry.path)
+            known = self._files.get(entry.path)
+            entry_fingerprint = fingerprint(entry.stat())
+            if known is None or known[0] != entry_fingerprint:
+                changed[entry.path] = entry_fingerprint
+        paths = list(changed)
+        violations = check_module.check_paths(paths, self.config.rules, self.config.engine)
+        for path, file_violations in zip(paths, violations):
+            self._set(path, changed[path], file_violations)
+        self._forget_directory(directory, keep=seen)
+
+    def _refresh(self, path: str) -> None:
+        if not check_module.is_checked_path(pathlib.Path(path), self.check_dir, self._excluder):
+            return
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            self._forget_file(path)
+            return
+        known = self._files.get(path)
+        if known is None or known[0] != fingerprint(stat):
+            violations = check_module.check_path(
+                pathlib.Path(path), self.checkers, self.config.engine, None
+            )
+            self._set(path, fingerprint(stat), violations)
+
+    def _set(self, path: str, file_fingerprint: Fingerprint, violations: list[Violation]) -> None:
+        self._forget_file(path)
+        self._files[path] = (file_fingerprint, violations)
+        self._directories.setdefault(os.path.dirname(path), set()).add(path)
+        self.counts.add(path, violations)
+
+    def _forget_file(self, path: str) -> None:
+        known = self._files.pop(path, None)
+        if known is None:
+            return
+        directory = os.path.dirname(path)
+        files = self._directories[directory]
+        files.discard(path)
+        if not files:
+            del self._directories[directory]
+        self.counts.add(path, known[1], -1)
+
+    def _forget_directory(
+        self, directory: str, keep: set[str] | frozenset[str] = frozenset()
+    ) -> None:
+        """
+        Forget every file under `directory`, except those in `keep`.
+        """
+        prefix = directory + os.sep
+        for subdirectory in [
+            d for d in self._directories if d == directory or d.startswith(prefix)
+        ]:
+            for path in [p for p in self._directories[subdirectory] if p not in keep]:
+                self._forget_file(path)
+
+    def _is_checked_dir(self, path: str) -> bool:
+        relative = pathlib.Path(path).relative_to(self.check_dir)
+        return not self._excluder.excludes_path(self.check_dir, relative, is_dir=True)
+
+
+class _Inotify:
+    """
+    A minimal binding to the Linux inotify API, for watching a tree of directories.
+    """
+
+    def __init__(self, libc: ctypes.CDLL, fd: int) -> None:
+        self.libc = libc
+        self.fd = fd
+        self.paths: dict[int, str] = {}
+
+    @classmethod
+    def create(cls) -> "_Inotify | None":
+        """
+        Return an inotify instance, or None if inotify isn't available on this platform.
+        """
+        if not sys.platform.startswith("linux"):
+            return None
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+            init = libc.inotify_init1
+        except (OSError, AttributeError):
+            return None
+        fd = init(os.O_NONBLOCK | os.O_CLOEXEC)
+        return None if fd < 0 else cls(libc, fd)
+
+    def watch(
+        self,
+        directory: str,
+        is_watched: Callable[[str], bool] | None = None,
+        recursive: bool = True,
+    ) -> bool:
+        """
+        Watch `directory` and, if `recursive`, every directory beneath it that `is_watched`.
+
+        Returns False if the system limit on the number of watches was reached.
+        """
+        stack = [directory]
+        while stack:
+            path = stack.pop()
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), _IN_WATCH_MASK)
+            if wd < 0:
+                if ctypes.get_errno() == errno.ENOSPC:
+                    return False
+                # The directory was removed before it could be watched.
+                continue
+            self.paths[wd] = path
+            if recursive:
+                stack.extend(_subdirectories(path, is_watched))
+        return True
+
+    def unwatch(self, directory: str) -> None:
+        """
+        Stop watching `directory` and every directory beneath it.
+        """
+        prefix = directory + os.sep
+        for wd, path in list(self.paths.items()):
+            if path == directory or path.startswith(prefix):
+                self.libc.inotify_rm_watch(self.fd, wd)
+                del self.paths[wd]
+
+    def read(self) -> list[tuple[str, int]] | None:
+        """
+        Return the path and mask of each pending event, or None if events were dropped.
+        """
+        events: list[tuple[str, int]] = []
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return events
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _IN_EVENT.unpack_from(data, offset)
+                offset += _IN_EVENT.size
+                name = data[offset : offset + length].rstrip(b"\0")
+                offset += length
+                if mask & _IN_Q_OVERFLOW:
+                    return None
+                if mask & _IN_IGNORED:
+                    self.paths.pop(wd, None)
+                elif name and wd in self.paths:
+                    events.append((os.path.join(self.paths[wd], os.fsdecode(name)), mask))
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+def _subdirectories(directory: str, is_watched: Callable[[str], bool] | None) -> Iterator[str]:
+    try:
+        with os.scandir(directory) as children:
+            entries = list(children)
+    except (FileNotFoundError, NotADirectoryError):
+        return
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False) and (is_watched is None or is_watched(entry.path)):
+            yield entry.path
+
+
+def _stat_fingerprint(path: pathlib.Path) -> Fingerprint | None:
+    try:
+        return fingerprint(path.stat())
+    except FileNotFoundError:
+        return None
+
+
+def _receive(connection: socket.socket) -> bytes:
+    chunks = []
+    while chunk := connection.recv(64 * 1024):
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+@contextlib.contextmanager
+def _listen(path: pathlib.Path) -> Iterator[socket.socket]:
+    """
+    Listen on the Unix socket at `path`, accessible only to the current user.
+    """
+    if path.exists():
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+                client.connect(str(path))
+        except ConnectionRefusedError:
+            # Left behind by a daemon that didn't exit cleanly.
+            path.unlink()
+        else:
+            raise DaemonError(f"A daemon is already listening on {path}")
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    umask = os.umask(0o077)
+    try:
+        server.bind(str(path))
+    finally:
+        os.umask(umask)
+    try:
+        server.listen()
+        yield server
+    finally:
+        server.close()
+        with contextlib.suppress(FileNotFoundError):
+            path.unlink()
@@ -0,0 +1,231 @@
+import copy
+import dataclasses
+import os
+import pathlib
+import re
+from collections.abc import Iterable, Sequence
+
+
+GITIGNORE = ".gitignore"
+
+
+class Excluder:
+    """
+    Decides which files and directories aren't checked, from gitignore-style patterns.
+
+    Paths are relative to the checked directory and separated by `/`. The `exclude`
+    patterns take precedence over any read from `.gitignore` files, and the patterns of
+    deeper `.gitignore` files take precedence over shallower ones. Excluders are never
+    modified, so one can be shared by every directory beneath the one it was read for.
+    """
+
+    def __init__(self, patterns: Iterable[str] = (), gitignore: bool = False) -> None:
+        self.gitignore = gitignore
+        self._exclude = _PatternList(patterns)
+        # The patterns of each `.gitignore` file, deepest first.
+        self._ignored: tuple[_PatternList, ...] = ()
+
+    def excludes(self, path: str, is_dir: bool) -> bool:
+        name = path.rpartition("/")[2]
+        excluded = self._exclude.match(path, name, is_dir)
+        if excluded is None:
+            for ignored in self._ignored:
+                if path.startswith(ignored.base):
+                    excluded = ignored.match(path, name, is_dir)
+                    if excluded is not None:
+                        break
+        return bool(excluded)
+
+    def excludes_path(
+        self, root: pathlib.Path, relative: pathlib.PurePath, is_dir: bool = False
+    ) -> bool:
+        """
+        Return whether `relative`, or any directory above it, is excluded beneath `root`.
+        """
+        excluder = self.descend(root, relative.parent)
+        return excluder is None or excluder.excludes(relative.as_posix(), is_dir)
+
+    def descend(self, root: pathlib.Path, relative: pathlib.PurePath) -> "Excluder | None":
+        """
+        Return the excluder for the contents of the directory `relative` beneath `root`,
+        or None if it or a directory above it is excluded.
+        """
+        excluder = self
+        path = ""
+        for part in relative.parts:
+            path += part
+            if excluder.excludes(path, is_dir=True):
+                return None
+            path += "/"
+            excluder = excluder.with_gitignore(root / path, path)
+        return excluder
+
+    def for_directory(self, directory: pathlib.Path) -> "Excluder":
+        """
+        Return the excluder for the contents of `directory`, the root of the paths that
+        are checked.
+
+        This reads the `.gitignore` files of `directory` and of its parents, up to the root
+        of the git repository that it's in.
+        """
+        if not self.gitignore:
+            return self
+        directory = directory.absolute()
+        parents = [directory, *directory.parents]
+        repository = next((i for i, parent in enumerate(parents) if (parent / ".git").exists()), 0)
+        excluder = self
+        for parent in reversed(parents[: repository + 1]):
+            # The patterns of a parent's `.gitignore` are relative to the parent.
+            prefix = "" if parent == directory else f"{directory.relative_to(parent).as_posix()}/"
+            excluder = excluder.with_gitignore(parent, "", prefix)
+        return excluder
+
+    def with_gitignore(
+        self, directory: str | os.PathLike[str], base: str, prefix: str = ""
+    ) -> "Excluder":
+        """
+        Return an excluder that also applies the `.gitignore` file in `directory`, if it has
+        one, to the paths that start with `base`.
+        """
+        if not self.gitignore:
+            return self
+        try:
+            with open(os.path.join(directory, GITIGNORE), encoding="utf-8") as fp:
+                lines = fp.read().splitlines()
+        except (FileNotFoundError, NotADirectoryError, IsADirectoryError):
+            return self
+        excluder = copy.copy(self)
+        excluder._ignored = (_PatternList(lines, base, prefix), *self._ignored)
+        return excluder
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class _Pattern:
+    regex: re.Pattern[str]
+    negated: bool
+    directory_only: bool
+    # Patterns without a slash match the name of a file or directory at any depth, the
+    # others match its path relative to the directory the patterns were read from.
+    anchored: bool
+
+
+class _PatternList:
+    """
+    The patterns from one source, which apply to the paths that start with `base`.
+
+    Paths have `base` replaced by `prefix` before they're matched, so that patterns read
+    from a parent of the checked directory are matched relative to that parent.
+    """
+
+    def __init__(self, lines: Iterable[str], base: str = "", prefix: str = "") -> None:
+        self.base = base
+        self.prefix = prefix
+        patterns = [pattern for line in lines if (pattern := _parse(line)) is not None]
+        self._directories = _Patterns(patterns)
+        self._files = _Patterns([pattern for pattern in patterns if not pattern.directory_only])
+
+    def match(self, path: str, name: str, is_dir: bool) -> bool | None:
+        """
+        Return whether the last pattern matching the path excludes it, or None if none do.
+        """
+        patterns = self._directories if is_dir else self._files
+        return patterns.match(self.prefix + path[len(self.base) :], name)
+
+
+class _Patterns:
+    def __init__(self, patterns: Sequence[_Pattern]) -> None:
+        self.patterns = patterns
+        self.negated = any(pattern.negated for pattern in patterns)
+        # Every pattern combined into one regex per target, so that paths no pattern
+        # matches, which are most of them, are rejected with at most two matches.
+        self.names = _union(pattern for pattern in patterns if not pattern.anchored)
+        self.paths = _union(pattern for pattern in patterns if pattern.anchored)
+
+    def match(self, path: str, name: str) -> bool | None:
+        if not (
+            (self.names is not None and self.names.fullmatch(name))
+            or (self.paths is not None and self.paths.fullmatch(path))
+        ):
+            return None
+        if not self.negated:
+            return True
+        for pattern in reversed(self.patterns):
+            if pattern.regex.fullmatch(path if pattern.anchored else name):
+                return not pattern.negated
+        return None
+
+
+def _union(patterns: Iterable[_Pattern]) -> re.Pattern[str] | None:
+    regexes = [pattern.regex.pattern for pattern in patterns]
+    return re.compile("|".join(f"(?:{regex})" for regex in regexes)) if regexes else None
+
+
+def _parse(line: str) -> _Pattern | None:
+    if line.startswith("#"):
+        return None
+    # Trailing spaces are ignored unless they're escaped with a backslash.
+    stripped = line.rstrip(" ")
+    if stripped.endswith("\\") and len(stripped) < len(line):
+        stripped += " "
+    negated = stripped.startswith("!")
+    if negated:
+        stripped = stripped[1:]
+    directory_only = stripped.endswith("/")
+    stripped = stripped.rstrip("/")
+    if not stripped:
+        return None
+    anchored = "/" in stripped
+    regex = re.compile(_translate(stripped.removeprefix("/")))
+    return _Pattern(regex, negated, directory_only, anchored)
+
+
+def _translate(pattern: str) -> str:
+    """
+    Translate a gitignore pattern into a regex, where wildcards don't match `/` except for
+    `**` between slashes, which matches any number of directories.
+    """
+    regex = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if (
+            pattern.startswith("**", i)
+            and (i == 0 or pattern[i - 1] == "/")
+            and pattern[i + 2 : i + 3] in ("", "/")
+        ):
+            regex.append(".*" if i + 2 == len(pattern) else "(?:.*/)?")
+            i += 3
+        elif char == "*":
+            regex.append("[^/]*")
+            i += 1
+        elif char == "?":
+            regex.append("[^/]")
+            i += 1
+        elif char == "[" and (end := _class_end(pattern, i)) != -1:
+            regex.append(_translate_class(pattern[i + 1 : end]))
+            i = end + 1
+        elif char == "\\" and i + 1 < len(pattern):
+            regex.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            regex.append(re.escape(char))
+            i += 1
+    return "".join(regex)
+
+
+def _class_end(pattern: str, start: int) -> int:
+    i = start + 1
+    if pattern[i : i + 1] in ("!", "^"):
+        i += 1
+    # A `]` straight after the opening bracket is part of the class.
+    if pattern[i : i + 1] == "]":
+        i += 1
+    return pattern.find("]", i)
+
+
+def _translate_class(chars: str) -> str:
+    negated = chars[:1] in ("!", "^")
+    if negated:
+        chars = chars[1:]
+    escaped = "".join(char if char == "-" else re.escape(char) for char in chars)
+    return f"[^/{escaped}]" if negated else f"[{escaped}]"
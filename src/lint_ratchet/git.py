@@ -0,0 +1,230 @@
+import contextlib
+import dataclasses
+import pathlib
+import threading
+from collections.abc import Iterable, Iterator, Sequence
+from types import TracebackType
+
+
+# The modes of tree entries that aren't regular files: symlinks, whose blob holds the
+# target instead of contents, submodules, and entries that don't exist.
+_SYMLINK_MODE = "120000"
+_NOT_FILE_MODES = frozenset({_SYMLINK_MODE, "160000", "000000"})
+
+# Marks the start of each commit in the output of `git log`.
+_COMMIT_MARKER = "\x01"
+
+
+class GitError(Exception):
+    pass
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class TreeFile:
+    # The path of the file relative to the listed directory, separated by `/`.
+    path: str
+    # The id of the blob holding the file's contents.
+    blob: str
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class TreeChange:
+    path: str
+    # The blob the file had before the change, or None if it was added.
+    old_blob: str | None
+    # The blob the file has after the change, or None if it was deleted.
+    new_blob: str | None
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class Commit:
+    sha: str
+    # The committer date in ISO 8601 format.
+    date: str
+    # The files under the listed directory that changed from the commit's first parent.
+    changes: Sequence[TreeChange] = ()
+
+
+def changed_files(directory: pathlib.Path, ref: str) -> list[pathlib.Path]:
+    """
+    Return the files under `directory` that differ from `ref` in the working tree.
+
+    This includes files that were modified, added or deleted since `ref`, as well as
+    untracked files that aren't ignored. Renamed files are reported as a deletion of the
+    old path and an addition of the new one.
+    """
+    diff = _run(directory, "diff", "--name-only", "--no-renames", "--relative", "-z", ref, "--")
+    untracked = _run(directory, "ls-files", "--others", "--exclude-standard", "-z")
+    names = {name for name in (diff + untracked).split("\0") if name}
+    return [directory / name for name in sorted(names)]
+
+
+def tree_files(directory: pathlib.Path, rev: str) -> list[TreeFile]:
+    """
+    Return the files under `directory` in the tree of the revision `rev`.
+
+    Symlinks and submodules are skipped, as they don't hold any source of their own.
+    """
+    files = []
+    for record in _run(directory, "ls-tree", "-r", "-z", rev, "--").split("\0"):
+        if not record:
+            continue
+        info, path = record.split("\t", 1)
+        mode, kind, blob = info.split(" ")
+        if kind == "blob" and mode != _SYMLINK_MODE:
+            files.append(TreeFile(path, blob))
+    return files
+
+
+def commit(directory: pathlib.Path, rev: str) -> Commit:
+    """
+    Return the commit that `rev` refers to, without any changes.
+    """
+    sha, date = _run(directory, "show", "-s", "--format=%H %cI", rev, "--").split()
+    return Commit(sha, date)
+
+
+def first_parent_log(directory: pathlib.Path, since: str, until: str = "HEAD") -> list[Commit]:
+    """
+    Return the commits after `since` up to `until`, oldest first, following first parents.
+
+    Each commit holds the files under `directory` that changed from its first parent, with
+    paths relative to `directory`. Commits that didn't change anything under `directory`
+    are still included, without any changes.
+    """
+    output = _run(
+        directory,
+        "log",
+        # Before git 2.31, --first-parent alone prints no diff for merge commits; -m makes
+        # them show their diff against the first parent on every version.
+        "-m",
+        "--first-parent",
+        "--reverse",
+        "--raw",
+        "--no-renames",
+        "--no-abbrev",
+        "--relative",
+        "-z",
+        f"--format={_COMMIT_MARKER}%H %cI",
+        f"{since}..{until}",
+        "--",
+    )
+    commits: list[Commit] = []
+    changes: list[TreeChange] = []
+    fields = iter(output.split("\0"))
+    for field in fields:
+        field = field.lstrip("\n")
+        if field.startswith(_COMMIT_MARKER):
+            sha, date = field[1:].split()
+            changes = []
+            commits.append(Commit(sha, date, changes))
+        elif field.startswith(":"):
+            old_mode, new_mode, old_blob, new_blob, _ = field[1:].split(" ")
+            changes.append(
+                TreeChange(
+                    next(fields),
+                    None if old_mode in _NOT_FILE_MODES else old_blob,
+                    None if new_mode in _NOT_FILE_MODES else new_blob,
+                )
+            )
+    return commits
+
+
+class BlobReader:
+    """
+    Reads blobs from the object database through a single `git cat-file --batch` process.
+
+    Use it as a context manager, so that the process is stopped when done.
+    """
+
+    def __init__(self, directory: pathlib.Path) -> None:
+        import subprocess
+
+        try:
+            self._process = subprocess.Popen(
+                ["git", "cat-file", "--batch"],
+                cwd=directory,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+            )
+        except FileNotFoundError as e:
+            raise GitError("git is not installed") from e
+        self._writer: threading.Thread | None = None
+
+    def __enter__(self) -> "BlobReader":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def read(self, blobs: Iterable[str]) -> Iterator[bytes]:
+        """
+        Yield the contents of each of `blobs`, in order.
+
+        The ids are written to git by a background thread while the contents are read,
+        so git never waits for the next id, and neither side blocks on a full pipe.
+        """
+        blobs = list(blobs)
+        if self._writer is not None:
+            self._writer.join()
+        self._writer = threading.Thread(
+            target=self._request, args=(blobs,), name="ratchet-cat-file", daemon=True
+        )
+        self._writer.start()
+        for blob in blobs:
+            yield self._response(blob)
+
+    def close(self) -> None:
+        # Kill rather than wait, as git may be blocked writing contents that won't be read.
+        self._process.kill()
+        self._process.wait()
+        if self._writer is not None:
+            self._writer.join()
+        for pipe in (self._process.stdin, self._process.stdout):
+            if pipe is not None:
+                with contextlib.suppress(OSError):
+                    pipe.close()
+
+    def _request(self, blobs: Sequence[str]) -> None:
+        assert self._process.stdin is not None
+        try:
+            for blob in blobs:
+                self._process.stdin.write(f"{blob}\n".encode())
+            self._process.stdin.flush()
+        except (OSError, ValueError):
+            # The reader was closed before every blob was read.
+            pass
+
+    def _response(self, blob: str) -> bytes:
+        assert self._process.stdout is not None
+        header = self._process.stdout.readline().split()
+        if len(header) != 3:
+            raise GitError(f"git cat-file couldn't read {blob}")
+        size = int(header[2])
+        content = self._process.stdout.read(size)
+        # Each object's contents are followed by a newline.
+        self._process.stdout.read(1)
+        if len(content) != size:
+            raise GitError(f"git cat-file stopped while reading {blob}")
+        return content
+
+
+def _run(directory: pathlib.Path, *args: str) -> str:
+    # Imported here as subprocess is slow to import, and most commands never run git.
+    import subprocess
+
+    try:
+        process = subprocess.run(
+            ["git", *args], cwd=directory, capture_output=True, text=True, check=False
+        )
+    except FileNotFoundError as e:
+        raise GitError("git is not installed") from e
+    if process.returncode != 0:
+        raise GitError(f"git {args[0]} failed: {process.stderr.strip()}")
+    return process.stdout
@@ -0,0 +1,228 @@
+"""
+An SQLite index of where the violations of a project are, for finding the files and
+directories that hold them without scanning again.
+
+The index is updated by the scans of `ratchet check --index` and `ratchet crank --index`,
+which only rewrite the files whose contents changed since the last update. With
+`--changed-since` or `--files-from`, only the listed files are checked again. The lines of
+the violations are found while checking, so files aren't read a second time for them.
+"""
+
+import dataclasses
+import os
+import pathlib
+import sqlite3
+from collections.abc import Iterable, Iterator, Sequence
+from typing import Literal
+
+from .cache import Fingerprint, fingerprint, ruleset_digest
+from .checkers import Violation
+from .configuration import Config
+
+
+INDEX_FILE_NAME = "index.sqlite3"
+
+# Bump when the schema changes, to rebuild indexes written by older versions.
+INDEX_FORMAT = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    ino INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS violations (
+    path TEXT NOT NULL,
+    tool TEXT NOT NULL,
+    rule TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    lines TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS violations_by_path ON violations (path);
+CREATE INDEX IF NOT EXISTS violations_by_rule ON violations (rule, tool);
+"""
+
+# The directory of a path, with a trailing slash, or an empty string for the top level.
+_DIRECTORY = "rtrim(path, replace(path, '/', ''))"
+
+
+class ViolationIndexError(Exception):
+    pass
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class IndexEntry:
+    path: str
+    tool: str
+    rule: str
+    count: int
+    lines: Sequence[int]
+
+
+class ViolationIndex:
+    """
+    The violations of each rule in each file, with the lines they're on.
+
+    Files are keyed by their path relative to the checked directory, separated by `/`.
+    Every checked file is recorded with a fingerprint of its stat result, so that files
+    which haven't changed are skipped when the index is updated.
+    """
+
+    def __init__(self, path: pathlib.Path, create: bool = True) -> None:
+        self.path = path
+        if create:
+            path.parent.mkdir(parents=True, exist_ok=True)
+        elif not path.exists():
+            raise ViolationIndexError(
+                f"No index found at {path}, create one with `ratchet check --index`"
+            )
+        self._connection = sqlite3.connect(path)
+        self._connection.executescript(_SCHEMA)
+
+    def __enter__(self) -> "ViolationIndex":
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Commit the files recorded so far, and close the index.
+        """
+        self._connection.commit()
+        self._connection.close()
+
+    def record(
+        self,
+        check_dir: pathlib.Path,
+        config: Config,
+        files: Iterable[tuple[str, Sequence[Violation]]],
+    ) -> Iterator[tuple[str, Sequence[Violation]]]:
+        """
+        Record the violations of each file from a scan of `check_dir` as it's yielded.
+
+        The violations must have been checked with their lines, such as by `check_files`
+        with `lines`. Files that are unchanged since they were last recorded aren't
+        written again. Once every file has been yielded, the files that the scan didn't
+        find are removed, so this must only be given the files of the whole project.
+        """
+        connection = self._connection
+        self._reset_if_stale(config)
+        known: dict[str, Fingerprint] = {
+            path: (mtime_ns, size, ino)
+            for path, mtime_ns, size, ino in connection.execute("SELECT * FROM files")
+        }
+        prefix = os.path.join(check_dir, "")
+        for path, violations in files:
+            relative = path.removeprefix(prefix).replace(os.sep, "/")
+            try:
+                current = fingerprint(os.stat(path))
+            except OSError:
+                current = None
+            if current is not None and known.pop(relative, None) != current:
+                connection.execute("DELETE FROM violations WHERE path = ?", (relative,))
+                connection.execute(
+                    "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)", (relative, *current)
+                )
+                connection.executemany(
+                    "INSERT INTO violations VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (
+                            relative,
+                            violation.tool.value,
+                            violation.rule,
+                            violation.count,
+                            ",".join(map(str, violation.lines)),
+                        )
+                        for violation in violations
+                    ],
+                )
+            yield path, violations
+
+        # Whatever is left wasn't found by the scan, so has been deleted or excluded since.
+        removed = [(path,) for path in known]
+        connection.executemany("DELETE FROM files WHERE path = ?", removed)
+        connection.executemany("DELETE FROM violations WHERE path = ?", removed)
+
+    def entries(
+        self, tool: str | None = None, rule: str | None = None, path: str | None = None
+    ) -> list[IndexEntry]:
+        """
+        Return the violations of the rule, in the file or directory `path`, by path.
+        """
+        where, parameters = _filter(tool, rule, path)
+        rows = self._connection.execute(
+            f"SELECT path, tool, rule, count, lines FROM violations {where}"
+            " ORDER BY path, tool, rule",
+            parameters,
+        )
+        return [
+            IndexEntry(path, tool, rule, count, [int(line) for line in lines.split(",") if line])
+            for path, tool, rule, count, lines in rows
+        ]
+
+    def top(
+        self,
+        tool: str | None = None,
+        rule: str | None = None,
+        by: Literal["file", "dir"] = "file",
+        limit: int | None = None,
+    ) -> list[tuple[str, int]]:
+        """
+        Return the files or directories with the most violations of the rule, with their
+        counts. Directories count every file in their subtree, like the budgets of
+        directory rules, and the top level directory is `.`.
+        """
+        where, parameters = _filter(tool, rule, None)
+        if by == "file":
+            rows = self._connection.execute(
+                f"SELECT path, sum(count) AS total FROM violations {where}"
+                " GROUP BY path ORDER BY total DESC, path LIMIT ?",
+                [*parameters, -1 if limit is None else limit],
+            )
+            return list(rows)
+
+        totals: dict[str, int] = {}
+        for directory, total in self._connection.execute(
+            f"SELECT {_DIRECTORY} AS directory, sum(count) FROM violations {where}"
+            " GROUP BY directory",
+            parameters,
+        ):
+            # Each directory's files count towards every directory above it.
+            directory = directory.rstrip("/")
+            while True:
+                totals[directory or "."] = totals.get(directory or ".", 0) + total
+                if not directory:
+                    break
+                directory = directory.rpartition("/")[0]
+        ranked = sorted(totals.items(), key=lambda item: (-item[1], item[0]))
+        return ranked if limit is None else ranked[:limit]
+
+    def _reset_if_stale(self, config: Config) -> None:
+        """
+        Remove every file if the index was written for other rules or by another version.
+        """
+        digest = f"{INDEX_FORMAT}:{ruleset_digest(config.rules)}"
+        row = self._connection.execute("SELECT value FROM meta WHERE key = 'digest'").fetchone()
+        if row is None or row[0] != digest:
+            self._connection.execute("DELETE FROM files")
+            self._connection.execute("DELETE FROM violations")
+            self._connection.execute("INSERT OR REPLACE INTO meta VALUES ('digest', ?)", (digest,))
+
+
+def _filter(tool: str | None, rule: str | None, path: str | None) -> tuple[str, list[object]]:
+    clauses = []
+    parameters: list[object] = []
+    if tool is not None:
+        clauses.append("tool = ?")
+        parameters.append(tool)
+    if rule is not None:
+        clauses.append("rule = ?")
+        parameters.append(rule)
+    if path is not None and (path := path.strip("/")) not in ("", "."):
+        # Matches the path itself, or anything within it if it's a directory.
+        clauses.append("(path = ? OR substr(path, 1, ?) = ?)")
+        parameters.extend([path, len(path) + 1, f"{path}/"])
+    return (f"WHERE {' AND '.join(clauses)}" if clauses else ""), parameters
@@ -1,6 +1,13 @@
+import codecs
 import io
+import re
+import sys
 import tokenize
-from collections.abc import Iterable
+from collections.abc import Callable, Iterable
+from typing import Literal, TypeAlias
+
+
+Engine: TypeAlias = Literal["fast", "tokenize"]
 
 
 def extract_comments(reader: io.BufferedIOBase) -> Iterable[str]:
@@ -11,3 +18,216 @@ def extract_comments(reader: io.BufferedIOBase) -> Iterable[str]:
     for token in tokens:
         if token.type == tokenize.COMMENT:
             yield token.string
+
+
+def extract_comment_lines(reader: io.BufferedIOBase) -> Iterable[tuple[int, str]]:
+    """
+    Extracts the comments from a python file byte stream with the line that each is on.
+    """
+    tokens = tokenize.tokenize(reader.readline)
+    for token in tokens:
+        if token.type == tokenize.COMMENT:
+            yield token.start[0], token.string
+
+
+def extract_comments_fast(reader: io.BufferedIOBase) -> Iterable[str]:
+    """
+    Extracts the comments from a python file byte stream without tokenizing it.
+
+    Produces the same comments as `extract_comments` for any valid python source, but
+    only looks for comments and the string literals that could contain a `#`, rather
+    than building a token for everything in the file.
+    """
+    source, encoding = _scannable_source(reader.read())
+    for comment in _CommentScanner(source).scan():
+        yield comment.decode(encoding)
+
+
+def extract_comment_lines_fast(reader: io.BufferedIOBase) -> Iterable[tuple[int, str]]:
+    """
+    Extracts the comments from a python file byte stream with the line that each is on,
+    without tokenizing it.
+    """
+    source, encoding = _scannable_source(reader.read())
+    scanner = _CommentScanner(source)
+    line = 1
+    end = 0
+    for start, comment in zip(scanner.starts, scanner.scan()):
+        line += source.count(b"\n", end, start)
+        end = start
+        yield line, comment.decode(encoding)
+
+
+def get_extractor(engine: Engine) -> Callable[[io.BufferedIOBase], Iterable[str]]:
+    """
+    Return the function that extracts comments with the given engine.
+    """
+    return extract_comments_fast if engine == "fast" else extract_comments
+
+
+def get_line_extractor(
+    engine: Engine,
+) -> Callable[[io.BufferedIOBase], Iterable[tuple[int, str]]]:
+    """
+    Return the function that extracts comments with their lines with the given engine.
+    """
+    return extract_comment_lines_fast if engine == "fast" else extract_comment_lines
+
+
+def _scannable_source(source: bytes) -> tuple[bytes, str]:
+    """
+    Return the source in an encoding whose comments can be found by scanning for ASCII
+    bytes, with the name of that encoding.
+    """
+    encoding, _ = tokenize.detect_encoding(io.BytesIO(source).readline)
+    if encoding == "utf-8-sig":
+        return source.removeprefix(codecs.BOM_UTF8), "utf-8"
+    if codecs.lookup(encoding).name not in _ASCII_COMPATIBLE:
+        # Multi-byte encodings like shift_jis can use ASCII bytes such as `\` within a
+        # character, so they have to be transcoded before they can be scanned as bytes.
+        return source.decode(encoding).encode("utf-8"), "utf-8"
+    return source, encoding
+
+
+# Encodings in which every ASCII byte always represents its ASCII character.
+_ASCII_COMPATIBLE = frozenset({"utf-8", "ascii", "latin-1", "iso8859-1", "iso8859-15", "cp1252"})
+
+# From Python 3.12 expressions in f-strings are tokenized, so they can contain comments and
+# strings delimited by the same quote as the f-string itself.
+_TOKENIZED_FSTRINGS = sys.version_info >= (3, 12)
+
+_NEXT_TOKEN = re.compile(rb"[#'\"]")
+_COMMENT = re.compile(rb"#[^\r\n]*")
+_IDENTIFIER_BYTES = frozenset(b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz_0123456789")
+_VALID_PREFIXES = frozenset({b"", b"r", b"u", b"b", b"br", b"rb", b"f", b"fr", b"rf"})
+_STRING_END = {
+    b"'''": re.compile(rb"[^\\']*(?:(?:\\(?:\r\n|.)|'(?!''))[^\\']*)*'''", re.DOTALL),
+    b'"""': re.compile(rb'[^\\"]*(?:(?:\\(?:\r\n|.)|"(?!""))[^\\"]*)*"""', re.DOTALL),
+    b"'": re.compile(rb"[^\\'\r\n]*(?:\\(?:\r\n|.)[^\\'\r\n]*)*'", re.DOTALL),
+    b'"': re.compile(rb'[^\\"\r\n]*(?:\\(?:\r\n|.)[^\\"\r\n]*)*"', re.DOTALL),
+}
+
+
+class _CommentScanner:
+    """
+    Finds the comments in python source, skipping over the contents of string literals.
+    """
+
+    def __init__(self, source: bytes) -> None:
+        self.source = source
+        self.comments: list[bytes] = []
+        # Where each of the comments starts in the source.
+        self.starts: list[int] = []
+
+    def scan(self) -> list[bytes]:
+        pos = 0
+        while match := _NEXT_TOKEN.search(self.source, pos):
+            pos = self._skip_token(match.start())
+        return self.comments
+
+    def _skip_token(self, pos: int) -> int:
+        """
+        Record the comment or skip the string starting at `pos`, returning the position after.
+        """
+        if self.source[pos] == ord("#"):
+            comment = _COMMENT.match(self.source, pos)
+            assert comment is not None
+            self.comments.append(comment.group())
+            self.starts.append(pos)
+            return comment.end()
+        return self._skip_string(pos)
+
+    def _skip_string(self, pos: int) -> int:
+        prefix = self._string_prefix(pos)
+        quote = self.source[pos : pos + 3]
+        if quote not in (b"'''", b'"""'):
+            quote = quote[:1]
+        start = pos + len(quote)
+
+        if _TOKENIZED_FSTRINGS and b"f" in prefix:
+            return self._skip_fstring(start, quote, raw=b"r" in prefix)
+
+        end = _STRING_END[quote].match(self.source, start)
+        if end is None:
+            if len(quote) == 3:
+                raise tokenize.TokenError("EOF in multi-line string")
+            return pos + 1
+        return end.end()
+
+    def _string_prefix(self, pos: int) -> bytes:
+        """
+        Return the lowercased prefix of the string whose opening quote is at `pos`.
+        """
+        start = pos
+        while start > 0 and self.source[start - 1] in _IDENTIFIER_BYTES and pos - start <= 2:
+            start -= 1
+        prefix = self.source[start:pos].lower()
+        if prefix not in _VALID_PREFIXES or (
+            start > 0 and self.source[start - 1] in _IDENTIFIER_BYTES
+        ):
+            # The quote follows a name rather than a prefix, which tokenize treats as a name
+            # followed by a plain string.
+            return b""
+        return prefix
+
+    def _skip_fstring(self, pos: int, quote: bytes, raw: bool) -> int:
+        source = self.source
+        while pos < len(source):
+            if source.startswith(quote, pos):
+                return pos + len(quote)
+            char = source[pos]
+            if char == ord("\\") and pos + 1 < len(source):
+                named_escape = not raw and source.startswith(b"N{", pos + 1)
+                if named_escape:
+                    pos = source.find(b"}", pos) + 1 or len(source)
+                elif source[pos + 1] in b"{}":
+                    pos += 1
+                else:
+                    # Even in raw f-strings a backslash stops the next quote from ending it.
+                    pos += 2
+            elif source.startswith(b"{{", pos) or source.startswith(b"}}", pos):
+                pos += 2
+            elif char == ord("{"):
+                pos = self._skip_replacement_field(pos + 1, quote)
+            elif char in b"\r\n" and len(quote) == 1:
+                return pos
+            else:
+                pos += 1
+        if len(quote) == 3:
+            raise tokenize.TokenError("EOF in multi-line string")
+        return pos
+
+    def _skip_replacement_field(self, pos: int, quote: bytes) -> int:
+        source = self.source
+        brackets = 0
+        while pos < len(source):
+            char = source[pos]
+            if char in b"#'\"":
+                pos = self._skip_token(pos)
+            elif char in b"([{":
+                brackets += 1
+                pos += 1
+            elif char in b")]" or (char == ord("}") and brackets):
+                brackets -= 1
+                pos += 1
+            elif char == ord("}"):
+                return pos + 1
+            elif char == ord(":") and not brackets:
+                return self._skip_format_spec(pos + 1, quote)
+            elif char == ord("!") and not brackets and not source.startswith(b"!=", pos):
+                pos += 2
+            else:
+                pos += 1
+        return pos
+
+    def _skip_format_spec(self, pos: int, quote: bytes) -> int:
+        source = self.source
+        while pos < len(source) and not source.startswith(quote, pos):
+            char = source[pos]
+            if char == ord("{"):
+                pos = self._skip_replacement_field(pos + 1, quote)
+            elif char == ord("}"):
+                return pos + 1
+            else:
+                pos += 1
+        return pos
@@ -0,0 +1,102 @@
+"""
+Checkers for other tools' suppressions, provided by installed packages.
+
+A plugin is a `Plugin` registered in the `lint_ratchet.checkers` entry point group, under
+the name of the configuration section that holds its rules:
+
+    [project.entry-points."lint_ratchet.checkers"]
+    nosec = "my_package.ratchet:nosec"
+
+Plugins are only imported when a configuration has rules for them.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import functools
+import re
+from collections.abc import Callable, Collection, Iterable
+from typing import TYPE_CHECKING
+
+
+if TYPE_CHECKING:
+    from importlib.metadata import EntryPoint
+
+
+PLUGIN_GROUP = "lint_ratchet.checkers"
+
+# Splits a comma separated list of codes, stripping whitespace around each code.
+CODE_LIST = re.compile(r"[^,\s](?:[^,]*[^,\s])?")
+
+
+class PluginError(Exception):
+    pass
+
+
+def code_list(prefix: str, comment: str) -> list[str]:
+    """
+    Parse the comma separated codes that follow the prefix of a comment, such as
+    `# noqa: F401, E501`.
+    """
+    return CODE_LIST.findall(comment, len(prefix))
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class Plugin:
+    """
+    Counts the suppressions in comments that start with one of `prefixes`.
+
+    `parse` is given the matching prefix and the comment, and returns the code of each
+    suppression in it, which is counted if the configuration has a rule for it. Plugins
+    must be picklable, so that they can be sent to the processes that check files.
+    """
+
+    prefixes: Collection[str]
+    parse: Callable[[str, str], Iterable[str]] = code_list
+
+    @property
+    def markers(self) -> list[bytes]:
+        return [prefix.encode() for prefix in self.prefixes]
+
+
+def plugin_names() -> set[str]:
+    """
+    Return the names of the installed plugins, without importing them.
+    """
+    return set(_entry_points())
+
+
+@functools.cache
+def load_plugin(name: str) -> Plugin:
+    """
+    Import and return the plugin named `name`.
+    """
+    entry_point = _entry_points().get(name)
+    if entry_point is None:
+        raise PluginError(f"No checker plugin named `{name}` is installed")
+    try:
+        plugin = entry_point.load()
+    except (ImportError, AttributeError) as e:
+        raise PluginError(f"The checker plugin `{name}` could not be loaded: {e}") from e
+    if not isinstance(plugin, Plugin):
+        raise PluginError(f"The checker plugin `{name}` ({entry_point.value}) is not a Plugin")
+    return plugin
+
+
+def plugin_version(name: str) -> str | None:
+    """
+    Return the version of the package that provides the plugin named `name`.
+    """
+    entry_point = _entry_points().get(name)
+    if entry_point is None or entry_point.dist is None:
+        return None
+    return entry_point.dist.version
+
+
+@functools.cache
+def _entry_points() -> dict[str, EntryPoint]:
+    # Reading the metadata of every installed package is slow, and most projects don't
+    # use plugins, so it's only done once a configuration names a section of one.
+    from importlib.metadata import entry_points
+
+    return {entry_point.name: entry_point for entry_point in entry_points(group=PLUGIN_GROUP)}
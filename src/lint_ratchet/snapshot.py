@@ -0,0 +1,177 @@
+import dataclasses
+import hashlib
+import json
+import os
+import pathlib
+from collections.abc import Callable, Iterable, Mapping, Sequence
+from typing import IO, Any
+
+from .cache import ruleset_digest
+from .checkers import Violation
+from .configuration import Config, ProjectCounts, Tool
+
+
+# Bump when the layout of a snapshot changes in a way that isn't backwards compatible.
+SNAPSHOT_FORMAT = 1
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def config_digest(config: Config) -> str:
+    """
+    Return a digest of everything in the configuration that affects a snapshot.
+
+    That is the rules, as for the cache, and which files are scanned: the checked path,
+    the excluded folders and whether .gitignore files are followed.
+    """
+    digest = hashlib.sha256(ruleset_digest(config.rules).encode())
+    digest.update(f"\0{config.path.as_posix()}\0{config.gitignore}".encode())
+    for pattern in sorted(config.excluded_folders):
+        digest.update(f"\0{pattern}".encode())
+    return digest.hexdigest()
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class Snapshot:
+    """
+    The violations found by scanning some or all of the shards of a project.
+
+    Files are keyed by their path relative to the checked directory, and only files with
+    violations are kept. Shards are numbered from 1 to `shard_count`, and a snapshot that
+    covers all of them can be checked and cranked against.
+    """
+
+    digest: str
+    shard_count: int
+    shards: frozenset[int]
+    files: Mapping[str, Sequence[Violation]]
+    file_count: int
+
+    @property
+    def complete(self) -> bool:
+        return len(self.shards) == self.shard_count
+
+    def validate(self, config: Config) -> None:
+        """
+        Raise a SnapshotError unless the snapshot covers every shard and was scanned with
+        the configured rules and files, so that its counts can be used for them.
+        """
+        if self.digest != config_digest(config):
+            raise SnapshotError(
+                "The snapshot was scanned with a different configuration or another version "
+                "of ratchet"
+            )
+        if not self.complete:
+            missing = sorted(set(range(1, self.shard_count + 1)) - self.shards)
+            raise SnapshotError(
+                f"The snapshot is missing shards {', '.join(map(str, missing))} of {self.shard_count}"
+            )
+
+    def counts(self, config: Config) -> ProjectCounts:
+        """
+        Return the violation counts of the configured rules, which must be the rules that
+        the snapshot was scanned with.
+        """
+        self.validate(config)
+        counts = ProjectCounts(config)
+        for path, violations in self.files.items():
+            counts.add(path, violations)
+        return counts
+
+    def to_json(self) -> dict[str, Any]:
+        return {
+            "format": SNAPSHOT_FORMAT,
+            "digest": self.digest,
+            "shard_count": self.shard_count,
+            "shards": sorted(self.shards),
+            "file_count": self.file_count,
+            "files": {
+                path: [
+                    [violation.tool.value, violation.rule, violation.count]
+                    for violation in violations
+                ]
+                for path, violations in sorted(self.files.items())
+            },
+        }
+
+    @classmethod
+    def from_json(cls, data: Any) -> "Snapshot":
+        try:
+            if data["format"] != SNAPSHOT_FORMAT:
+                raise SnapshotError(f"Unsupported snapshot format {data['format']}")
+            return cls(
+                digest=data["digest"],
+                shard_count=int(data["shard_count"]),
+                shards=frozenset(int(shard) for shard in data["shards"]),
+                files={
+                    path: [
+                        Violation(tool=Tool(tool), rule=rule, count=count)
+                        for tool, rule, count in violations
+                    ]
+                    for path, violations in data["files"].items()
+                },
+                file_count=int(data["file_count"]),
+            )
+        except (KeyError, TypeError, ValueError) as e:
+            raise SnapshotError(f"Invalid snapshot: {e!r}") from e
+
+
+def read_snapshot(fp: IO[str]) -> Snapshot:
+    try:
+        data = json.load(fp)
+    except ValueError as e:
+        raise SnapshotError(f"Invalid snapshot: {e}") from e
+    return Snapshot.from_json(data)
+
+
+def write_snapshot(snapshot: Snapshot, fp: IO[str]) -> None:
+    json.dump(snapshot.to_json(), fp, separators=(",", ":"))
+    fp.write("\n")
+
+
+def merge(snapshots: Iterable[Snapshot]) -> Snapshot:
+    """
+    Combine the snapshots of different shards of the same project into one.
+    """
+    snapshots = list(snapshots)
+    if not snapshots:
+        raise SnapshotError("No snapshots to merge")
+    first = snapshots[0]
+    shards: set[int] = set()
+    files: dict[str, Sequence[Violation]] = {}
+    for snapshot in snapshots:
+        if (snapshot.digest, snapshot.shard_count) != (first.digest, first.shard_count):
+            raise SnapshotError(
+                "Snapshots can only be merged if they were scanned with the same rules, "
+                "version of ratchet and number of shards"
+            )
+        if overlap := shards & snapshot.shards:
+            raise SnapshotError(f"Shard {min(overlap)} is in more than one snapshot")
+        shards |= snapshot.shards
+        files.update(snapshot.files)
+    return Snapshot(
+        first.digest,
+        first.shard_count,
+        frozenset(shards),
+        files,
+        sum(snapshot.file_count for snapshot in snapshots),
+    )
+
+
+def shard_filter(check_dir: pathlib.Path, shard: int, shard_count: int) -> Callable[[str], bool]:
+    """
+    Return a function that decides whether a file beneath `check_dir` is in the shard.
+
+    Files are assigned to shards by a hash of their path relative to `check_dir`, so every
+    machine assigns them the same way, and adding a file never moves any other.
+    """
+    prefix = os.path.join(check_dir, "")
+
+    def in_shard(path: str) -> bool:
+        relative = path.removeprefix(prefix).replace(os.sep, "/").encode()
+        digest = hashlib.blake2b(relative, digest_size=8).digest()
+        return int.from_bytes(digest, "big") % shard_count == shard - 1
+
+    return in_shard
@@ -0,0 +1,200 @@
+import contextlib
+import dataclasses
+import heapq
+import sys
+import time
+from collections.abc import Iterator
+from typing import TYPE_CHECKING, Any, ContextManager
+
+
+if TYPE_CHECKING:
+    from .cache import ResultCache
+    from .content_cache import ContentCache
+
+
+# Bump when the layout of the JSON report changes in a way that isn't backwards compatible.
+STATS_FORMAT = 1
+
+# The phases that time is recorded for. Walking, reading and checking overlap, and files
+# are read by several threads, so the phases can add up to more than the elapsed time.
+PHASES = ("cache", "walk", "read", "extract", "check")
+
+# The number of slowest files that are reported.
+SLOWEST_FILES = 10
+
+
+@dataclasses.dataclass(slots=True)
+class FileStats:
+    """
+    The time spent on each phase of checking a single file.
+    """
+
+    path: str
+    bytes: int
+    read: float = 0.0
+    extract: float = 0.0
+    check: float = 0.0
+
+    @property
+    def seconds(self) -> float:
+        return self.read + self.extract + self.check
+
+    def to_json(self) -> dict[str, Any]:
+        return {
+            "path": self.path,
+            "bytes": self.bytes,
+            "seconds": round(self.seconds, 6),
+            "read": round(self.read, 6),
+            "extract": round(self.extract, 6),
+            "check": round(self.check, 6),
+        }
+
+
+@dataclasses.dataclass
+class Stats:
+    """
+    Timings and counters collected while checking a project.
+
+    Collection is opt-in: everywhere that records stats accepts `None` instead of a
+    `Stats` and skips timing entirely.
+    """
+
+    command: str
+    slowest_count: int = SLOWEST_FILES
+    phases: dict[str, float] = dataclasses.field(
+        default_factory=lambda: dict.fromkeys(PHASES, 0.0)
+    )
+    files: int = 0
+    files_read: int = 0
+    bytes_read: int = 0
+    elapsed: float = 0.0
+    cache_hits: int | None = None
+    cache_misses: int | None = None
+    content_cache_hits: int | None = None
+    content_cache_misses: int | None = None
+    peak_rss: int | None = None
+    _slowest: list[tuple[float, int, FileStats]] = dataclasses.field(default_factory=list)
+    _started: float | None = None
+
+    def start(self) -> None:
+        self._started = time.perf_counter()
+
+    def stop(
+        self, cache: "ResultCache | None", content_cache: "ContentCache | None" = None
+    ) -> None:
+        if self._started is not None:
+            self.elapsed += time.perf_counter() - self._started
+            self._started = None
+        if cache is not None:
+            self.cache_hits = cache.hits
+            self.cache_misses = cache.misses
+        if content_cache is not None:
+            self.content_cache_hits = content_cache.hits
+            self.content_cache_misses = content_cache.misses
+        self.peak_rss = peak_rss()
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] += time.perf_counter() - start
+
+    def add_file(self, file: FileStats) -> None:
+        """
+        Record the timings of a file that was read and checked.
+        """
+        self.files_read += 1
+        self.bytes_read += file.bytes
+        self.phases["read"] += file.read
+        self.phases["extract"] += file.extract
+        self.phases["check"] += file.check
+        # The read count breaks ties, so FileStats are never compared.
+        entry = (file.seconds, self.files_read, file)
+        if len(self._slowest) < self.slowest_count:
+            heapq.heappush(self._slowest, entry)
+        elif self._slowest and entry > self._slowest[0]:
+            heapq.heapreplace(self._slowest, entry)
+
+    @property
+    def slowest(self) -> list[FileStats]:
+        return [file for _, _, file in sorted(self._slowest, reverse=True)]
+
+    @property
+    def files_per_second(self) -> float:
+        return self.files / self.elapsed if self.elapsed else 0.0
+
+    def to_json(self) -> dict[str, Any]:
+        """
+        Return the stats as a JSON-serialisable dict, whose keys are always present.
+        """
+        cache = None
+        if self.cache_hits is not None:
+            cache = {"hits": self.cache_hits, "misses": self.cache_misses}
+        content_cache = None
+        if self.content_cache_hits is not None:
+            content_cache = {"hits": self.content_cache_hits, "misses": self.content_cache_misses}
+        return {
+            "format": STATS_FORMAT,
+            "command": self.command,
+            "elapsed_seconds": round(self.elapsed, 6),
+            "phases": {name: round(seconds, 6) for name, seconds in self.phases.items()},
+            "files": self.files,
+            "files_read": self.files_read,
+            "bytes_read": self.bytes_read,
+            "files_per_second": round(self.files_per_second, 3),
+            "cache": cache,
+            "content_cache": content_cache,
+            "peak_rss_bytes": self.peak_rss,
+            "slowest_files": [file.to_json() for file in self.slowest],
+        }
+
+    def summary(self) -> list[str]:
+        """
+        Return a human readable report, one line per item.
+        """
+        lines = [
+            f"elapsed: {self.elapsed:.3f}s",
+            *(f"  {name}: {seconds:.3f}s" for name, seconds in self.phases.items()),
+            f"files: {self.files} ({self.files_per_second:.1f}/s)",
+            f"read: {self.files_read} files, {self.bytes_read} bytes",
+        ]
+        if self.cache_hits is not None:
+            lines.append(f"cache: {self.cache_hits} hits, {self.cache_misses} misses")
+        if self.content_cache_hits is not None:
+            lines.append(
+                f"content cache: {self.content_cache_hits} hits,"
+                f" {self.content_cache_misses} misses"
+            )
+        if self.peak_rss is not None:
+            lines.append(f"peak RSS: {self.peak_rss / 1024 / 1024:.1f} MiB")
+        if self.slowest:
+            lines.append("slowest files:")
+            lines.extend(f"  {file.seconds:.3f}s {file.path}" for file in self.slowest)
+        return lines
+
+
+def phase(stats: Stats | None, name: str) -> ContextManager[None]:
+    """
+    Time the body of the `with` statement as the named phase, if collecting stats.
+    """
+    return contextlib.nullcontext() if stats is None else stats.phase(name)
+
+
+def peak_rss() -> int | None:
+    """
+    Return the peak resident set size of this process or its workers, in bytes.
+
+    Returns None on platforms that don't report it.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    # Linux reports kilobytes, macOS reports bytes.
+    return peak if sys.platform == "darwin" else peak * 1024
@@ -1,10 +1,28 @@
+from __future__ import annotations
+
+import contextlib
 import dataclasses
+import os
 import pathlib
 from collections import Counter
-from collections.abc import Iterable
+from collections.abc import Collection, Iterable, Iterator, Sequence
+from typing import TYPE_CHECKING, Literal, cast
 
 from . import check as check_module
 from . import configuration
+from .stats import Stats, phase
+
+
+if TYPE_CHECKING:
+    from . import git
+    from .cache import ResultCache
+    from .checkers import Violation
+    from .content_cache import ContentCache
+    from .snapshot import Snapshot
+
+
+# The tools that `init` writes rules for unless it's given others.
+INIT_TOOLS = (configuration.Tool.NOQA, configuration.Tool.FIXIT_ANY, configuration.Tool.MYPY)
 
 
 @dataclasses.dataclass
@@ -17,34 +35,182 @@ class CheckResult:
         return self.new_count > self.rule.violation_count
 
 
-def check(check_dir: pathlib.Path, config: configuration.Config) -> Iterable[CheckResult]:
+@dataclasses.dataclass
+class FailFastResult(CheckResult):
+    """
+    The first rule to exceed its violation count when checking with `fail_fast`.
+
+    `new_count` is the count when the scan stopped, which is a lower bound for the total.
+    """
+
+    files_checked: int
+
+
+@dataclasses.dataclass
+class HistoryEntry:
+    commit: git.Commit
+    results: list[CheckResult]
+
+
+@dataclasses.dataclass
+class ConfigResults:
+    """
+    The results of one of the configurations checked by `check_configs`.
+    """
+
+    root: pathlib.Path
+    config: configuration.Config
+    results: list[CheckResult]
+
+
+def check(
+    check_dir: pathlib.Path,
+    config: configuration.Config,
+    jobs: int | Literal["auto"] | None = None,
+    cache_dir: pathlib.Path | None = None,
+    changed_paths: Collection[pathlib.Path] | None = None,
+    fail_fast: bool = False,
+    stats: Stats | None = None,
+    rev: str | None = None,
+    content_cache: str | None = None,
+    snapshot: Snapshot | None = None,
+    index_path: pathlib.Path | None = None,
+    archive: pathlib.Path | None = None,
+) -> Iterable[CheckResult]:
     """
     Scan the project for matching rule violations and yield the results.
+
+    If `changed_paths` is given along with a `cache_dir` that holds the results of a
+    previous full scan, only the changed files are checked. Otherwise the whole project
+    is scanned and its results are cached for the next run.
+
+    With `fail_fast`, the scan stops as soon as any rule exceeds its violation count, and
+    only a `FailFastResult` for that rule is yielded.
+
+    When `stats` are given, the timings and counters of the scan are recorded in them.
+
+    With `rev`, the files are read from that git revision instead of the working tree,
+    and no cache is used.
+
+    `content_cache` is a directory or an http(s) URL that stores the violations of files
+    by their contents, which can be shared between checkouts and machines.
+
+    With a complete `snapshot` from `scan`, its counts are used and nothing is scanned.
+
+    With `index_path`, the violations of each file of a full scan of the working tree are
+    recorded in the `ViolationIndex` at that path.
+
+    With `archive`, the files are read from that tar or zip archive instead of `check_dir`,
+    and no cache is used.
     """
-    counts: Counter[str] = Counter()
-    for violation in check_module.check_recursive(check_dir, config):
-        counts[violation.rule] += violation.count
+    counts, tripped = _count_violations(
+        check_dir,
+        config,
+        jobs,
+        cache_dir,
+        changed_paths,
+        fail_fast,
+        stats,
+        rev,
+        content_cache,
+        snapshot,
+        index_path,
+        archive,
+    )
+    if tripped is not None:
+        yield tripped
+        return
 
     for rule in config.rules:
-        yield CheckResult(rule, counts[rule.code])
+        yield CheckResult(rule, counts[rule])
+
+
+def check_configs(
+    configs: Sequence[tuple[pathlib.Path, configuration.Config]],
+    jobs: int | Literal["auto"] | None = None,
+    stats: Stats | None = None,
+    content_cache: str | None = None,
+) -> list[ConfigResults]:
+    """
+    Check the projects of several configurations, each given with the directory that its
+    file is in, such as those found by `configuration.find_configurations`.
+
+    The checked directories are walked once, and each file is checked once with every rule
+    of every configuration, then its violations are counted for each configuration that
+    checks it, so overlapping projects cost no more than their union.
+    """
+    check_dirs = [(root / config.path).resolve() for root, config in configs]
+    filters = [
+        check_module.config_path_filter(check_dir, config)
+        for check_dir, (_, config) in zip(check_dirs, configs)
+    ]
+    counts = [
+        configuration.ProjectCounts(config, os.path.join(check_dir, ""))
+        for check_dir, (_, config) in zip(check_dirs, configs)
+    ]
+    merged = configuration.merge_configurations([config for _, config in configs])
+
+    with _scanning(merged, None, content_cache, stats) as (_, shared):
+        for walk_dir in _outermost(check_dirs):
+            files = check_module.check_files(
+                walk_dir, merged, jobs, stats=stats, content_cache=shared
+            )
+            for path, violations in files:
+                if not violations:
+                    continue
+                for is_checked, config_counts in zip(filters, counts):
+                    if is_checked(path):
+                        config_counts.add(path, violations)
+
+    return [
+        ConfigResults(
+            root,
+            config,
+            [CheckResult(rule, config_counts[rule]) for rule in config.rules],
+        )
+        for (root, config), config_counts in zip(configs, counts)
+    ]
 
 
 def crank(
-    check_dir: pathlib.Path, config: configuration.Config, root_dir: pathlib.Path
+    check_dir: pathlib.Path,
+    config: configuration.Config,
+    root_dir: pathlib.Path,
+    jobs: int | Literal["auto"] | None = None,
+    cache_dir: pathlib.Path | None = None,
+    stats: Stats | None = None,
+    rev: str | None = None,
+    content_cache: str | None = None,
+    snapshot: Snapshot | None = None,
+    index_path: pathlib.Path | None = None,
 ) -> Iterable[CheckResult]:
     """
     Recompute the violation counts and write the results back if they are lower.
+
+    With `rev`, the counts are taken from that git revision instead of the working tree.
+    With a complete `snapshot`, its counts are used instead of scanning. See `check` for
+    `index_path`.
     """
-    counts: Counter[str] = Counter()
-    for violation in check_module.check_recursive(check_dir, config):
-        counts[violation.rule] += violation.count
+    counts, _ = _count_violations(
+        check_dir,
+        config,
+        jobs,
+        cache_dir,
+        stats=stats,
+        rev=rev,
+        content_cache=content_cache,
+        snapshot=snapshot,
+        index_path=index_path,
+    )
 
+    # Each budget, whether for the whole project or a directory, is tightened on its own.
     new_rules = []
     cranked = []
     for rule in config.rules:
-        if (new_count := counts[rule.code]) < rule.violation_count:
-            new_rules.append(dataclasses.replace(rule, violation_count=new_count))
+        if (new_count := counts[rule]) < rule.violation_count:
             cranked.append(CheckResult(rule, new_count))
+            rule = dataclasses.replace(rule, violation_count=new_count)
+        new_rules.append(rule)
 
     if cranked:
         new_config = dataclasses.replace(config, rules=new_rules)
@@ -53,3 +219,372 @@ def crank(
             configuration.write_configuration(new_config, f)
 
     return cranked
+
+
+def scan(
+    check_dir: pathlib.Path,
+    config: configuration.Config,
+    jobs: int | Literal["auto"] | None = None,
+    cache_dir: pathlib.Path | None = None,
+    shard: tuple[int, int] | None = None,
+    stats: Stats | None = None,
+    content_cache: str | None = None,
+) -> Snapshot:
+    """
+    Scan the project, or only the files in one shard of it, into a snapshot.
+
+    `shard` is the number of the shard, from 1, and the number of shards. The snapshots of
+    every shard, scanned on different machines, can be merged into one that `check` and
+    `crank` use instead of scanning again.
+    """
+    from . import snapshot as snapshot_module
+
+    shard_number, shard_count = shard or (1, 1)
+    select = None
+    if shard_count > 1:
+        select = snapshot_module.shard_filter(check_dir, shard_number, shard_count)
+    prefix = os.path.join(check_dir, "")
+    files = {}
+    file_count = 0
+    with _scanning(config, cache_dir, content_cache, stats) as (cache, shared):
+        revision = None if cache is None else _head(check_dir)
+        for path, violations in check_module.check_files(
+            check_dir, config, jobs, cache, stats, shared, select
+        ):
+            file_count += 1
+            if violations:
+                files[path.removeprefix(prefix).replace(os.sep, "/")] = violations
+        if cache is not None:
+            cache.revision = revision
+    return snapshot_module.Snapshot(
+        snapshot_module.config_digest(config),
+        shard_count,
+        frozenset([shard_number]),
+        files,
+        file_count,
+    )
+
+
+def discover(
+    check_dir: pathlib.Path,
+    config: configuration.Config,
+    tools: Iterable[configuration.Tool] = INIT_TOOLS,
+    jobs: int | Literal["auto"] | None = None,
+    stats: Stats | None = None,
+) -> list[configuration.Rule]:
+    """
+    Find every code of the tools that's suppressed in the project, returning a rule for each
+    with its current violation count, sorted by tool and code.
+
+    The project is scanned once, with a wildcard rule for each tool in place of the
+    configured rules, so this takes as long as a `check`.
+    """
+    tools = list(dict.fromkeys(tools))
+    wildcard_rules = [configuration.Rule(tool, configuration.WILDCARD, 0) for tool in tools]
+    wildcard_config = dataclasses.replace(config, rules=wildcard_rules)
+    counts: Counter[tuple[configuration.Tool, str]] = Counter()
+    with _scanning(wildcard_config, None, None, stats):
+        for _, violations in check_module.check_files(
+            check_dir, wildcard_config, jobs, stats=stats
+        ):
+            for violation in violations:
+                counts[violation.tool, violation.rule] += violation.count
+    return [
+        configuration.Rule(tool, code, count)
+        for (tool, code), count in sorted(
+            counts.items(), key=lambda item: (tools.index(item[0][0]), item[0][1])
+        )
+    ]
+
+
+def init(
+    root_dir: pathlib.Path,
+    path: str = ".",
+    tools: Iterable[configuration.Tool] = INIT_TOOLS,
+    jobs: int | Literal["auto"] | None = None,
+    stats: Stats | None = None,
+) -> configuration.Config:
+    """
+    Write a configuration to `root_dir` that checks `path` with a rule for every code of
+    the tools that's suppressed in it, each at its current violation count.
+    """
+    config = configuration.Config(
+        pathlib.Path(path), rules=[], excluded_folders=configuration.DEFAULT_EXCLUDE
+    )
+    rules = discover(root_dir / path, config, tools, jobs, stats)
+    config = dataclasses.replace(config, rules=rules)
+    with configuration.get_configuration_path(root_dir).open("w") as f:
+        configuration.write_configuration(config, f)
+    return config
+
+
+def add(
+    check_dir: pathlib.Path,
+    config: configuration.Config,
+    root_dir: pathlib.Path,
+    tool: str,
+    code: str,
+    directory: str = "",
+    jobs: int | Literal["auto"] | None = None,
+    stats: Stats | None = None,
+) -> configuration.Rule:
+    """
+    Add a rule for `code` of `tool` to the configuration, starting at its current violation
+    count within `directory`, or the whole project if it's empty, and return it.
+
+    Only the new rule is counted, in a single scan of the project.
+    """
+    # Read as a configuration of its own, so that it's validated the same way.
+    section: dict[str, object] = {code: 0}
+    rule_config = {"path": ".", tool: {directory: section} if directory else section}
+    (rule,) = configuration.read_configuration(
+        cast(configuration.RatchetConfig, rule_config)
+    ).rules
+    for existing in config.rules:
+        if (existing.tool, existing.code, existing.path) == (rule.tool, rule.code, rule.path):
+            raise configuration.RatchetMisconfiguredError(
+                f"`{rule.name}` is already ratcheted at {existing.violation_count}"
+            )
+
+    rule_only = dataclasses.replace(config, rules=[rule])
+    counts, _ = _count_violations(check_dir, rule_only, jobs, None, stats=stats)
+    rule = dataclasses.replace(rule, violation_count=counts[rule])
+    new_config = dataclasses.replace(config, rules=[*config.rules, rule])
+    with configuration.get_configuration_path(root_dir).open("w") as f:
+        configuration.write_configuration(new_config, f)
+    return rule
+
+
+def history(
+    check_dir: pathlib.Path,
+    config: configuration.Config,
+    since: str,
+    until: str = "HEAD",
+    jobs: int | Literal["auto"] | None = None,
+) -> Iterator[HistoryEntry]:
+    """
+    Yield the violation counts of `since` and of each commit after it up to `until`, oldest
+    first, following first parents.
+
+    Results are kept per blob, so each version of a file is only checked once however many
+    commits it appears in. The counts of each commit are those of its parent, less the
+    counts of the blobs that changed, plus the counts of the blobs that replaced them.
+    """
+    from . import git
+
+    is_checked = check_module.tree_path_filter(config)
+    start = git.commit(check_dir, since)
+    tree = {
+        file.path: file.blob
+        for file in git.tree_files(check_dir, start.sha)
+        if is_checked(file.path)
+    }
+    commits = git.first_parent_log(check_dir, start.sha, until)
+
+    blobs = dict.fromkeys(tree.values())
+    for commit in commits:
+        for change in commit.changes:
+            if change.new_blob is not None and is_checked(change.path):
+                blobs[change.new_blob] = None
+    results = dict(check_module.check_blobs(check_dir, config, blobs, jobs))
+
+    counts = configuration.ProjectCounts(config)
+
+    def entry(commit: git.Commit) -> HistoryEntry:
+        return HistoryEntry(commit, [CheckResult(rule, counts[rule]) for rule in config.rules])
+
+    for path, blob in tree.items():
+        counts.add(path, results[blob])
+    yield entry(start)
+    for commit in commits:
+        for change in commit.changes:
+            if not is_checked(change.path):
+                continue
+            if (old_blob := tree.pop(change.path, None)) is not None:
+                counts.add(change.path, results[old_blob], -1)
+            if change.new_blob is not None:
+                tree[change.path] = change.new_blob
+                counts.add(change.path, results[change.new_blob])
+        yield entry(commit)
+
+
+def _outermost(directories: Iterable[pathlib.Path]) -> list[pathlib.Path]:
+    """
+    Return the directories that aren't within any of the others.
+    """
+    outermost: list[pathlib.Path] = []
+    for directory in sorted(set(directories)):
+        if not outermost or not directory.is_relative_to(outermost[-1]):
+            outermost.append(directory)
+    return outermost
+
+
+def _count_violations(
+    check_dir: pathlib.Path,
+    config: configuration.Config,
+    jobs: int | Literal["auto"] | None,
+    cache_dir: pathlib.Path | None,
+    changed_paths: Collection[pathlib.Path] | None = None,
+    fail_fast: bool = False,
+    stats: Stats | None = None,
+    rev: str | None = None,
+    content_cache: str | None = None,
+    snapshot: Snapshot | None = None,
+    index_path: pathlib.Path | None = None,
+    archive: pathlib.Path | None = None,
+) -> tuple[configuration.ProjectCounts, FailFastResult | None]:
+    """
+    Count the violations of each rule, returning the rule that failed first with `fail_fast`.
+
+    Each file's violations are added to the counts as soon as it has been checked, so
+    memory use doesn't grow with the number of files unless a cache is used.
+    """
+    if snapshot is not None:
+        return snapshot.counts(config), None
+    if rev is not None or archive is not None:
+        # Revisions are read by blob, which already never checks the same contents twice,
+        # and archives are read from memory.
+        cache_dir = content_cache = None
+
+    # The paths of the files in an archive are relative to the checked directory.
+    prefix = "" if archive is not None else os.path.join(check_dir, "")
+    counts = configuration.ProjectCounts(config, prefix)
+    with contextlib.ExitStack() as stack:
+        cache, shared = stack.enter_context(_scanning(config, cache_dir, content_cache, stats))
+        # Taken before scanning, so anything committed during the scan is checked next time.
+        revision = None if cache is None else _head(check_dir)
+        if changed_paths is not None and cache is not None and cache.complete:
+            committed = _changed_since_baseline(check_dir, cache)
+            if committed is not None:
+                # This leaves the results of every file of the project in the cache.
+                check_module.check_changed(
+                    check_dir,
+                    config,
+                    [*changed_paths, *committed],
+                    cache,
+                    stats,
+                    shared,
+                    lines=index_path is not None,
+                )
+                cache.revision = revision
+                files: Iterable[tuple[str, Sequence[Violation]]] = cache.files()
+                if index_path is not None:
+                    from . import index as index_module
+
+                    # Only the files that were checked again have changed fingerprints, so
+                    # only they are rewritten, and deleted files are removed.
+                    index = stack.enter_context(index_module.ViolationIndex(index_path))
+                    files = index.record(check_dir, config, files)
+                for path, violations in files:
+                    counts.add(path, violations)
+                return counts, None
+
+        # Scanning marks the cache incomplete until every file has been seen.
+        was_complete = cache is not None and cache.complete
+        # The rules to compare against once a file has been counted, by tool and code.
+        budgets: dict[tuple[configuration.Tool, str], list[configuration.Rule]] = {}
+        if fail_fast:
+            for rule in config.rules:
+                budgets.setdefault((rule.tool, rule.code), []).append(rule)
+        if archive is not None:
+            scan = check_module.check_archive(archive, config, jobs, stats)
+        elif rev is not None:
+            scan = check_module.check_revision(check_dir, config, rev, jobs, stats)
+        else:
+            scan = check_module.check_files(
+                check_dir, config, jobs, cache, stats, shared, lines=index_path is not None
+            )
+        # Stops any outstanding work if the scan ended early.
+        stack.callback(scan.close)
+        files = scan
+        if index_path is not None and rev is None and archive is None:
+            from . import index as index_module
+
+            index = stack.enter_context(index_module.ViolationIndex(index_path))
+            files = index.record(check_dir, config, scan)
+
+        for files_checked, (path, file_violations) in enumerate(files, start=1):
+            if not file_violations:
+                continue
+            counts.add(path, file_violations)
+            for violation in file_violations if budgets else ():
+                for rule in budgets.get((violation.tool, violation.rule), ()):
+                    if (new_count := counts[rule]) > rule.violation_count:
+                        if cache is not None:
+                            # The files that weren't reached keep their entries, so a
+                            # complete baseline stays complete, at its own revision.
+                            cache.keep_unseen()
+                            cache.complete = was_complete
+                        return counts, FailFastResult(rule, new_count, files_checked)
+        if cache is not None:
+            cache.revision = revision
+        return counts, None
+
+
+def _changed_since_baseline(
+    check_dir: pathlib.Path, cache: ResultCache
+) -> list[pathlib.Path] | None:
+    """
+    Return the files that differ from the commit that the cache's baseline was saved at,
+    so that files added in commits since are checked, or None if the baseline can't be
+    used because they can't be listed.
+    """
+    from . import git
+
+    if cache.revision is None:
+        # A baseline saved outside of a repository only misses files that aren't listed.
+        return None if _head(check_dir) is not None else []
+    try:
+        return git.changed_files(check_dir, cache.revision)
+    except git.GitError:
+        return None
+
+
+def _head(check_dir: pathlib.Path) -> str | None:
+    """
+    Return the commit that the repository of `check_dir` is at, or None if there isn't one.
+    """
+    from . import git
+
+    try:
+        return git.commit(check_dir, "HEAD").sha
+    except git.GitError:
+        return None
+
+
+@contextlib.contextmanager
+def _scanning(
+    config: configuration.Config,
+    cache_dir: pathlib.Path | None,
+    content_cache: str | None,
+    stats: Stats | None,
+) -> Iterator[tuple[ResultCache | None, ContentCache | None]]:
+    """
+    Open the caches for a scan, then save and close them once it's done, recording their
+    hits and misses in `stats`.
+    """
+    if stats is not None:
+        stats.start()
+    cache = None
+    if cache_dir is not None:
+        from . import cache as cache_module
+
+        with phase(stats, "cache"):
+            cache = cache_module.ResultCache(cache_dir, config.rules)
+    shared = None
+    if content_cache is not None:
+        from . import content_cache as content_cache_module
+
+        backend = content_cache_module.open_backend(content_cache)
+        shared = content_cache_module.ContentCache(backend, config.rules, config.engine)
+    try:
+        yield cache, shared
+    finally:
+        if cache is not None:
+            with phase(stats, "cache"):
+                cache.save()
+        if shared is not None:
+            with phase(stats, "cache"):
+                shared.close()
+        if stats is not None:
+            stats.stop(cache, shared)
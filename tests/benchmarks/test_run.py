@@ -0,0 +1,52 @@
+import pathlib
+
+from benchmarks import generate, run
+from lint_ratchet import check
+
+
+SMALL = generate.TreeSpec(files=6, lines=30, depth=2, fanout=2, suppression_density=0.2)
+
+
+class TestGenerateTree:
+    def test_is_reproducible(self, tmp_path: pathlib.Path) -> None:
+        first = generate.generate_tree(tmp_path / "first", SMALL)
+        second = generate.generate_tree(tmp_path / "second", SMALL)
+        assert [p.read_text() for p in first] == [p.read_text() for p in second]
+        assert len(first) == 6
+
+    def test_deep_trees_nest_a_module_at_every_level(self, tmp_path: pathlib.Path) -> None:
+        spec = generate.TreeSpec(files=5, lines=10, depth=4, fanout=1)
+        paths = generate.generate_tree(tmp_path, spec)
+        assert sorted(len(p.relative_to(tmp_path).parts) for p in paths) == [1, 2, 3, 4, 5]
+
+    def test_suppressions_are_counted(self, tmp_path: pathlib.Path) -> None:
+        generate.generate_tree(tmp_path, SMALL)
+        config = run.config_for(pathlib.Path("."))
+        assert sum(v.count for v in check.check_recursive(tmp_path, config)) > 0
+
+
+class TestRun:
+    def test_times_every_stage(self, tmp_path: pathlib.Path) -> None:
+        results = run.run_scenario(tmp_path, SMALL, repeat=1)
+        assert "cli" in results
+        assert all(result.files == 6 for result in results.values())
+
+    def test_compare_reports_regressions(self, tmp_path: pathlib.Path) -> None:
+        baseline = {
+            "small": {
+                "walk": run.StageResult(seconds=1.0, files=1, bytes=1_000_000),
+                "read": run.StageResult(seconds=1.0, files=1, bytes=1_000_000),
+                "quick": run.StageResult(seconds=0.001, files=1, bytes=1_000_000),
+            }
+        }
+        run.write_results(tmp_path / "baseline.json", baseline)
+        results = {
+            "small": {
+                "walk": run.StageResult(seconds=1.2, files=1, bytes=1_000_000),
+                "read": run.StageResult(seconds=2.0, files=1, bytes=1_000_000),
+                "new": run.StageResult(seconds=9.0, files=1, bytes=1_000_000),
+                "quick": run.StageResult(seconds=0.1, files=1, bytes=1_000_000),
+            }
+        }
+        regressions = run.compare(run.read_results(tmp_path / "baseline.json"), results, 0.25)
+        assert [r.stage for r in regressions] == ["read"]
@@ -0,0 +1,146 @@
+import io
+import pathlib
+import tarfile
+import zipfile
+from typing import IO, Any
+
+import pytest
+
+from lint_ratchet import archive, check, configuration
+from lint_ratchet.checkers import Violation
+
+
+MEMBERS = {
+    "pkg-1.0/src/pkg/a.py": b"import os  # noqa: F401\n",
+    "pkg-1.0/src/pkg/vendored/v.py": b"import os  # noqa: F401\n",
+    "pkg-1.0/src/pkg/data.txt": b"# noqa: F401\n",
+    "pkg-1.0/tests/t.py": b"import os  # noqa: F401\n",
+    "../escape.py": b"import os  # noqa: F401\n",
+}
+
+
+def write_tar(path: pathlib.Path, mode: str) -> pathlib.Path:
+    with tarfile.open(path, mode) as tar_file:  # type: ignore[call-overload]
+        for name, data in MEMBERS.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar_file.addfile(info, io.BytesIO(data))
+    return path
+
+
+def write_zip(path: pathlib.Path) -> pathlib.Path:
+    with zipfile.ZipFile(path, "w") as zip_file:
+        for name, data in MEMBERS.items():
+            zip_file.writestr(name, data)
+    return path
+
+
+def config(path: str) -> configuration.Config:
+    return configuration.Config(
+        path=pathlib.Path(path),
+        rules=[configuration.Rule(configuration.Tool.NOQA, "F401", 0)],
+        excluded_folders=["vendored"],
+    )
+
+
+class TestReadSources:
+    @pytest.mark.parametrize(
+        "name", ["sdist.tar.gz", "release.tar", "release.tar.xz", "pkg.whl", "sdist.zip"]
+    )
+    def test_formats(self, tmp_path: pathlib.Path, name: str) -> None:
+        path = tmp_path / name
+        if name.endswith((".whl", ".zip")):
+            write_zip(path)
+        else:
+            write_tar(path, {"gz": "w:gz", "xz": "w:xz"}.get(name.rpartition(".")[2], "w"))
+        sources = list(archive.read_sources(path, config("pkg-1.0/src")))
+        assert sources == [("pkg/a.py", MEMBERS["pkg-1.0/src/pkg/a.py"])]
+
+    def test_whole_archive(self, tmp_path: pathlib.Path) -> None:
+        path = write_tar(tmp_path / "sdist.tar.gz", "w:gz")
+        paths = [path for path, _ in archive.read_sources(path, config("."))]
+        assert paths == ["src/pkg/a.py", "tests/t.py"]
+
+    @pytest.mark.parametrize("name", ["pkg-1.0.tar.gz", "pkg-1.0.zip"])
+    def test_sdist_top_level_directory(self, tmp_path: pathlib.Path, name: str) -> None:
+        project = tmp_path / "project"
+        for file_name, data in [
+            ("PKG-INFO", b"Metadata-Version: 2.1\n"),
+            ("pyproject.toml", b"[project]\n"),
+            ("src/pkg/__init__.py", b""),
+            ("src/pkg/a.py", b"import os  # noqa: F401\n"),
+            ("tests/t.py", b"import os  # noqa: F401\n"),
+        ]:
+            (project / file_name).parent.mkdir(parents=True, exist_ok=True)
+            (project / file_name).write_bytes(data)
+        path = tmp_path / name
+        if name.endswith(".zip"):
+            with zipfile.ZipFile(path, "w") as zip_file:
+                for file in sorted(project.rglob("*")):
+                    zip_file.write(file, f"pkg-1.0/{file.relative_to(project)}")
+        else:
+            with tarfile.open(path, "w:gz") as tar_file:
+                tar_file.add(project, arcname="pkg-1.0")
+
+        sources = dict(archive.read_sources(path, config("src")))
+        assert sorted(sources) == ["pkg/__init__.py", "pkg/a.py"]
+        assert [path for path, _ in archive.read_sources(path, config("pkg-1.0/tests"))] == [
+            "t.py"
+        ]
+
+    def test_tar_members_are_read_once(
+        self, tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        path = write_tar(tmp_path / "sdist.tar.gz", "w:gz")
+        opened = []
+        extracted = []
+        open_tar = tarfile.open
+        extractfile = tarfile.TarFile.extractfile
+
+        def counting_open(*args: Any, **kwargs: Any) -> tarfile.TarFile:
+            opened.append(args[0])
+            return open_tar(*args, **kwargs)
+
+        def counting_extractfile(
+            self: tarfile.TarFile, member: str | tarfile.TarInfo
+        ) -> IO[bytes] | None:
+            extracted.append(member.name if isinstance(member, tarfile.TarInfo) else member)
+            return extractfile(self, member)
+
+        monkeypatch.setattr(tarfile, "open", counting_open)
+        monkeypatch.setattr(tarfile.TarFile, "extractfile", counting_extractfile)
+        paths = [path for path, _ in archive.read_sources(path, config("."))]
+        assert paths == ["src/pkg/a.py", "tests/t.py"]
+        assert opened == [path]
+        assert extracted == ["pkg-1.0/src/pkg/a.py", "pkg-1.0/tests/t.py"]
+
+    def test_no_common_top_level_directory(self, tmp_path: pathlib.Path) -> None:
+        path = tmp_path / "release.tar"
+        with tarfile.open(path, "w") as tar_file:
+            for name in ["pkg/a.py", "other/b.py", "pkg/c.py"]:
+                data = b"import os  # noqa: F401\n"
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                tar_file.addfile(info, io.BytesIO(data))
+        paths = [path for path, _ in archive.read_sources(path, config("pkg"))]
+        assert paths == ["a.py", "c.py"]
+
+    def test_no_files_in_path(self, tmp_path: pathlib.Path) -> None:
+        path = write_tar(tmp_path / "sdist.tar.gz", "w:gz")
+        with pytest.raises(archive.ArchiveError, match="has no files in lib"):
+            list(archive.read_sources(path, config("lib")))
+
+    def test_not_an_archive(self, tmp_path: pathlib.Path) -> None:
+        path = tmp_path / "a.py"
+        path.write_text("import os\n")
+        with pytest.raises(archive.ArchiveError, match="tar or zip"):
+            list(archive.read_sources(path, config(".")))
+
+
+def test_check_archive(tmp_path: pathlib.Path) -> None:
+    path = write_zip(tmp_path / "pkg.whl")
+    results = dict(check.check_archive(path, config("pkg-1.0")))
+    assert results == {
+        "src/pkg/a.py": [Violation(configuration.Tool.NOQA, "F401", 1)],
+        "tests/t.py": [Violation(configuration.Tool.NOQA, "F401", 1)],
+    }
@@ -0,0 +1,52 @@
+import asyncio
+import pathlib
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import lint_ratchet
+from lint_ratchet import batch, configuration, usecases
+
+
+def make_project(root: pathlib.Path, files: int, budget: int) -> pathlib.Path:
+    root.mkdir()
+    (root / ".ratchet.toml").write_text(f'path = "."\n[noqa]\nF401 = {budget}\n')
+    for number in range(files):
+        (root / f"m{number}.py").write_text("import os  # noqa: F401\n")
+    return root
+
+
+class TestCheckAsync:
+    def test_matches_check(self, tmp_path: pathlib.Path) -> None:
+        root = make_project(tmp_path / "project", batch.BATCH_CHUNK_SIZE * 2 + 1, 200)
+        with ThreadPoolExecutor(2) as executor:
+            results = asyncio.run(lint_ratchet.check_async(root, executor, limit=1))
+        config = configuration.open_configuration(root)
+        assert results == list(usecases.check(root, config))
+        assert [result.new_count for result in results] == [batch.BATCH_CHUNK_SIZE * 2 + 1]
+
+    def test_missing_path(self, tmp_path: pathlib.Path) -> None:
+        (tmp_path / ".ratchet.toml").write_text('path = "src"\n')
+        with pytest.raises(configuration.ProjectFileNotFoundError, match="does not exist"):
+            asyncio.run(batch.check_async(tmp_path))
+
+
+class TestCheckMany:
+    def test_shared_pool(self, tmp_path: pathlib.Path) -> None:
+        roots = [
+            make_project(tmp_path / "passing", 3, 3),
+            make_project(tmp_path / "failing", 2, 1),
+            tmp_path / "unconfigured",
+        ]
+        roots[2].mkdir()
+
+        async def collect() -> list[batch.ProjectResult]:
+            return [result async for result in batch.check_many(roots, jobs=1)]
+
+        results = {result.root.name: result for result in asyncio.run(collect())}
+        assert [result.new_count for result in results["passing"].results] == [3]
+        assert not results["passing"].failure
+        assert results["failing"].failure
+        assert results["failing"].to_json()["results"][0]["new_count"] == 2
+        assert results["unconfigured"].error is not None
+        assert "not found" in results["unconfigured"].to_json()["error"]
@@ -0,0 +1,112 @@
+import os
+import pathlib
+
+import pytest
+
+from lint_ratchet import cache, check
+from lint_ratchet.checkers import Violation
+from lint_ratchet.configuration import Config, Rule, Tool
+
+
+RULES = [Rule(tool=Tool.NOQA, code="F401", violation_count=1)]
+
+
+def write(path: pathlib.Path, contents: str) -> os.stat_result:
+    path.write_text(contents)
+    return path.stat()
+
+
+class TestResultCache:
+    def test_roundtrip(self, tmp_path: pathlib.Path) -> None:
+        stat = write(tmp_path / "a.py", "import os  # noqa: F401\n")
+        result_cache = cache.ResultCache(tmp_path / "cache", RULES)
+        assert result_cache.get("a.py", stat) is None
+        result_cache.put("a.py", stat, [Violation(tool=Tool.NOQA, rule="F401", count=1)])
+        result_cache.save()
+
+        result_cache = cache.ResultCache(tmp_path / "cache", RULES)
+        assert result_cache.get("a.py", stat) == [Violation(tool=Tool.NOQA, rule="F401", count=1)]
+        assert (result_cache.hits, result_cache.misses) == (1, 0)
+
+    def test_changed_file_misses(self, tmp_path: pathlib.Path) -> None:
+        stat = write(tmp_path / "a.py", "import os\n")
+        result_cache = cache.ResultCache(tmp_path / "cache", RULES)
+        result_cache.put("a.py", stat, [])
+        result_cache.save()
+
+        stat = write(tmp_path / "a.py", "import os  # noqa: F401\n")
+        result_cache = cache.ResultCache(tmp_path / "cache", RULES)
+        assert result_cache.get("a.py", stat) is None
+
+    def test_rule_change_invalidates(self, tmp_path: pathlib.Path) -> None:
+        stat = write(tmp_path / "a.py", "import os\n")
+        result_cache = cache.ResultCache(tmp_path / "cache", RULES)
+        result_cache.put("a.py", stat, [])
+        result_cache.save()
+
+        recounted = [Rule(tool=Tool.NOQA, code="F401", violation_count=0)]
+        assert cache.ResultCache(tmp_path / "cache", recounted).get("a.py", stat) == []
+
+        new_rules = [*RULES, Rule(tool=Tool.NOQA, code="E501", violation_count=0)]
+        assert cache.ResultCache(tmp_path / "cache", new_rules).get("a.py", stat) is None
+
+    def test_unseen_files_are_pruned(self, tmp_path: pathlib.Path) -> None:
+        stat_a = write(tmp_path / "a.py", "")
+        stat_b = write(tmp_path / "b.py", "")
+        result_cache = cache.ResultCache(tmp_path / "cache", RULES)
+        result_cache.put("a.py", stat_a, [])
+        result_cache.put("b.py", stat_b, [])
+        result_cache.save()
+
+        result_cache = cache.ResultCache(tmp_path / "cache", RULES)
+        assert result_cache.get("a.py", stat_a) == []
+        result_cache.save()
+
+        result_cache = cache.ResultCache(tmp_path / "cache", RULES)
+        assert result_cache.get("b.py", stat_b) is None
+
+    def test_max_entries(self, tmp_path: pathlib.Path) -> None:
+        result_cache = cache.ResultCache(tmp_path / "cache", RULES, max_entries=1)
+        for name in ("a.py", "b.py"):
+            result_cache.put(name, write(tmp_path / name, ""), [])
+        result_cache.save()
+
+        result_cache = cache.ResultCache(tmp_path / "cache", RULES)
+        assert result_cache.get("a.py", (tmp_path / "a.py").stat()) == []
+        assert result_cache.get("b.py", (tmp_path / "b.py").stat()) is None
+
+    def test_corrupt_cache_ignored(self, tmp_path: pathlib.Path) -> None:
+        (tmp_path / "cache").mkdir()
+        (tmp_path / "cache" / cache.CACHE_FILE_NAME).write_text("{not json")
+        stat = write(tmp_path / "a.py", "")
+        assert cache.ResultCache(tmp_path / "cache", RULES).get("a.py", stat) is None
+
+
+class TestCheckRecursiveWithCache:
+    def test_unchanged_files_are_not_reread(
+        self, tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        write(tmp_path / "a.py", "import os  # noqa: F401\n")
+        write(tmp_path / "b.py", "import sys  # noqa: F401\n")
+        config = Config(path=pathlib.Path("."), rules=RULES)
+
+        cold = cache.ResultCache(tmp_path / "cache", config.rules)
+        cold_violations = list(check.check_recursive(tmp_path, config, cache=cold))
+        cold.save()
+
+        checked = []
+        read = check._read
+
+        def spy(path):
+            checked.append(os.fspath(path))
+            return read(path)
+
+        monkeypatch.setattr(check, "_read", spy)
+        write(tmp_path / "b.py", "import sys  # noqa: F401\nimport re  # noqa: F401\n")
+
+        warm = cache.ResultCache(tmp_path / "cache", config.rules)
+        warm_violations = list(check.check_recursive(tmp_path, config, cache=warm))
+        assert checked == [str(tmp_path / "b.py")]
+        assert sum(v.count for v in cold_violations) == 2
+        assert sum(v.count for v in warm_violations) == 3
+        assert (warm.hits, warm.misses) == (1, 1)
@@ -1,10 +1,19 @@
 import io
+import os
 import pathlib
+import sys
+import threading
+import traceback
+from collections import Counter
+from collections.abc import Iterable
 from textwrap import dedent
 
-from lint_ratchet import check
+import pytest
+
+from lint_ratchet import cache, check, parsing, stats
 from lint_ratchet.checkers import Violation, get_checkers
 from lint_ratchet.configuration import Config, Rule, Tool
+from lint_ratchet.exclude import Excluder
 
 
 class TestCheckFile:
@@ -27,17 +36,100 @@ class TestCheckFile:
         )
         violations = list(check.check_file(io.BytesIO(source.encode()), checkers))
         assert violations == [
-            Violation(rule="F401", count=2),
-            Violation(rule="G007", count=1),
+            Violation(tool=Tool.NOQA, rule="F401", count=2),
+            Violation(tool=Tool.NOQA, rule="G007", count=1),
         ]
 
+    def test_files_without_markers_are_not_tokenized(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        def fail(*args: object) -> None:
+            raise AssertionError("should not be called")
+
+        monkeypatch.setattr(parsing, "extract_comments", fail)
+        monkeypatch.setattr(parsing, "extract_comments_fast", fail)
+        checkers = get_checkers([Rule(tool=Tool.NOQA, code="F401", violation_count=1)])
+        source = b"import a  # a normal comment\n"
+        assert list(check.check_file(io.BytesIO(source), checkers)) == []
+        assert list(check.check_file(io.BytesIO(source), checkers, "fast")) == []
+
+    def test_fast_engine(self):
+        checkers = get_checkers([Rule(tool=Tool.NOQA, code="F401", violation_count=1)])
+        source = b'import a  # noqa: F401\nb = "# noqa: F401"\n'
+        violations = list(check.check_file(io.BytesIO(source), checkers, "fast"))
+        assert violations == [Violation(tool=Tool.NOQA, rule="F401", count=1)]
+
+    def test_no_checkers(self):
+        source = b"import a  # noqa: F401\n"
+        assert list(check.check_file(io.BytesIO(source), get_checkers([]))) == []
+
 
 class TestRecursePaths:
     def test_paths_found_with_exclusion(self):
         root = pathlib.Path(__file__).parent.parent / "examples/"
-        paths = {p.name for p in check._recurse_paths([root], ["excluded"])}
+        paths = {p.name for p in check.walk(root, Excluder(["excluded"]))}
         assert paths == {"example.py", "basic.py", "__init__.py"}
 
+    def test_deeper_than_the_recursion_limit(self, tmp_path: pathlib.Path) -> None:
+        directory = tmp_path
+        for _ in range(100):
+            directory = directory / "d"
+            directory.mkdir()
+        (directory / "deep.py").write_text("")
+        limit = sys.getrecursionlimit()
+        # Leave far fewer frames than a recursive walk would need for 100 levels.
+        sys.setrecursionlimit(len(traceback.extract_stack()) + 50)
+        try:
+            paths = [p.name for p in check.walk(tmp_path, Excluder())]
+        finally:
+            sys.setrecursionlimit(limit)
+        assert paths == ["deep.py"]
+
+    def test_symlink_loops_are_followed_once(self, tmp_path: pathlib.Path) -> None:
+        (tmp_path / "pkg").mkdir()
+        (tmp_path / "pkg" / "mod.py").write_text("")
+        (tmp_path / "pkg" / "loop").symlink_to(tmp_path / "pkg", target_is_directory=True)
+        paths = [os.path.relpath(p, tmp_path) for p in check.walk(tmp_path, Excluder())]
+        assert sorted(paths) == ["pkg/loop/mod.py", "pkg/mod.py"]
+
+
+class TestReadAhead:
+    def test_reads_in_order(self, tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.setattr(check, "READAHEAD_DEPTH", 3)
+        paths = []
+        for i in range(10):
+            (tmp_path / f"{i}.py").write_text(str(i))
+            paths.append(str(tmp_path / f"{i}.py"))
+        with check._ReadAhead(
+            paths, lambda path: None if path.endswith("5.py") else path
+        ) as reads:
+            results = [(os.path.basename(path), source) for path, source, _ in reads]
+        assert results == [(f"{i}.py", None if i == 5 else str(i).encode()) for i in range(10)]
+
+
+class TestWalkInBackground:
+    def test_finds_the_same_files(self) -> None:
+        root = pathlib.Path(__file__).parent.parent / "examples/"
+        walked = {p.path for p in check.walk(root, Excluder(["excluded"]))}
+        assert {p.path for p in check._walk_in_background(root, Excluder(["excluded"]))} == walked
+
+    def test_closing_early_stops_the_walk(
+        self, tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr(check, "WALK_QUEUE_SIZE", 1)
+        monkeypatch.setattr(check, "WALK_BATCH_SIZE", 1)
+        for i in range(20):
+            (tmp_path / f"{i}").mkdir()
+            (tmp_path / f"{i}" / "mod.py").write_text("")
+        paths = check._walk_in_background(tmp_path, Excluder())
+        next(paths)
+        paths.close()
+        assert not any(t.name == "ratchet-walk" for t in threading.enumerate())
+
+    def test_errors_are_raised_to_the_consumer(self, tmp_path: pathlib.Path) -> None:
+        with pytest.raises(FileNotFoundError):
+            list(check._walk_in_background(tmp_path / "missing", Excluder()))
+
 
 class TestCheckRecursive:
     def test_violations_found(self):
@@ -51,4 +143,190 @@ class TestCheckRecursive:
         )
         check_dir = root / config.path
         violations = list(check.check_recursive(check_dir, config))
-        assert violations == [Violation(rule="F401", count=2)]
+        assert violations == [Violation(tool=Tool.NOQA, rule="F401", count=2)]
+
+    def test_parallel_totals_match_serial(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.setattr(check, "PARALLEL_MIN_FILES", 0)
+        check_dir = pathlib.Path(__file__).parent.parent / "examples/"
+        config = Config(
+            path=pathlib.Path("."),
+            rules=[
+                Rule(tool=Tool.NOQA, code="F401", violation_count=1),
+                Rule(tool=Tool.NOQA, code="N805", violation_count=1),
+            ],
+        )
+
+        def totals(violations: Iterable[Violation]) -> Counter[str]:
+            counts: Counter[str] = Counter()
+            for violation in violations:
+                counts[violation.rule] += violation.count
+            return counts
+
+        serial = totals(check.check_recursive(check_dir, config, jobs=1))
+        parallel = totals(check.check_recursive(check_dir, config, jobs=2))
+        assert parallel == serial == Counter({"F401": 3, "N805": 1})
+
+    def test_small_trees_stay_serial(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        def fail(*args: object) -> None:
+            raise AssertionError("should not be called")
+
+        monkeypatch.setattr(check, "_check_parallel", fail)
+        root = pathlib.Path(__file__).parent.parent
+        config = Config(
+            path=pathlib.Path("examples/"),
+            rules=[Rule(tool=Tool.NOQA, code="F401", violation_count=1)],
+            excluded_folders=["excluded"],
+        )
+        violations = list(check.check_recursive(root / config.path, config, jobs="auto"))
+        assert violations == [Violation(tool=Tool.NOQA, rule="F401", count=2)]
+
+
+class TestCheckFiles:
+    def test_yields_per_file(self):
+        check_dir = pathlib.Path(__file__).parent.parent / "examples/"
+        config = Config(
+            path=pathlib.Path("."),
+            rules=[Rule(tool=Tool.NOQA, code="F401", violation_count=1)],
+            excluded_folders=["excluded"],
+        )
+        results = {
+            pathlib.Path(path).name: list(v) for path, v in check.check_files(check_dir, config)
+        }
+        assert results == {
+            "__init__.py": [],
+            "basic.py": [Violation(tool=Tool.NOQA, rule="F401", count=2)],
+            "example.py": [],
+        }
+
+    def test_closing_early_cancels_parallel_work(
+        self, tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr(check, "PARALLEL_MIN_FILES", 0)
+        monkeypatch.setattr(check, "MAX_CHUNK_SIZE", 1)
+        for i in range(20):
+            (tmp_path / f"{i}.py").write_text("import os  # noqa: F401\n")
+        config = Config(
+            path=pathlib.Path("."),
+            rules=[Rule(tool=Tool.NOQA, code="F401", violation_count=1)],
+        )
+        result_cache = cache.ResultCache(tmp_path / "cache", config.rules)
+        files = check.check_files(tmp_path, config, jobs=2, cache=result_cache)
+        next(files)
+        files.close()
+        assert not result_cache.complete
+
+    @pytest.mark.parametrize("jobs", [1, 2])
+    def test_records_stats(self, jobs: int, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.setattr(check, "PARALLEL_MIN_FILES", 0)
+        check_dir = pathlib.Path(__file__).parent.parent / "examples/"
+        config = Config(
+            path=pathlib.Path("."),
+            rules=[Rule(tool=Tool.NOQA, code="F401", violation_count=1)],
+            excluded_folders=["excluded"],
+        )
+        recorded = stats.Stats("check", slowest_count=2)
+        list(check.check_files(check_dir, config, jobs=jobs, stats=recorded))
+        walked = list(check.walk(check_dir, config.excluder))
+        assert recorded.files == recorded.files_read == len(walked)
+        assert recorded.bytes_read == sum(path.stat().st_size for path in walked)
+        assert len(recorded.slowest) == 2
+        assert recorded.phases["extract"] > 0
+
+
+class TestCheckSources:
+    @pytest.mark.parametrize("jobs", [1, 2])
+    def test_results_in_order(self, monkeypatch: pytest.MonkeyPatch, jobs: int) -> None:
+        monkeypatch.setattr(check, "PARALLEL_MIN_FILES", 0)
+        monkeypatch.setattr(check, "MAX_CHUNK_SIZE", 2)
+        config = Config(path=pathlib.Path("."), rules=[Rule(Tool.NOQA, "F401", 0)])
+        sources = [(f"{i}", b"import os  # noqa: F401\n" * (i % 3)) for i in range(7)]
+        record = stats.Stats("check")
+        results = list(check.check_sources(sources, config, jobs, record))
+        assert results == [
+            (f"{i}", [Violation(Tool.NOQA, "F401", i % 3)] if i % 3 else []) for i in range(7)
+        ]
+        assert record.files == record.files_read == 7
+        assert {file.path for file in record.slowest} <= {f"{i}" for i in range(7)}
+
+
+class TestTreePathFilter:
+    def test_excluded(self) -> None:
+        config = Config(path=pathlib.Path("."), rules=[], excluded_folders=["gen/", "*_pb2.py"])
+        is_checked = check.tree_path_filter(config)
+        assert is_checked("a.py")
+        assert is_checked("pkg/b.py")
+        assert not is_checked("pkg/gen/c.py")
+        assert not is_checked("pkg/gen/sub/d.py")
+        assert not is_checked("api_pb2.py")
+        assert not is_checked("README.md")
+
+
+class TestConfigPathFilter:
+    def test_excluded(self, tmp_path: pathlib.Path) -> None:
+        (tmp_path / "pkg").mkdir()
+        (tmp_path / "pkg" / ".gitignore").write_text("ignored.py\n")
+        config = Config(
+            path=pathlib.Path("."), rules=[], excluded_folders=["gen/"], gitignore=True
+        )
+        is_checked = check.config_path_filter(tmp_path, config)
+        assert is_checked(str(tmp_path / "a.py"))
+        assert is_checked(str(tmp_path / "pkg" / "b.py"))
+        assert not is_checked(str(tmp_path / "pkg" / "ignored.py"))
+        assert is_checked(str(tmp_path / "ignored.py"))
+        assert not is_checked(str(tmp_path / "gen" / "sub" / "c.py"))
+        assert not is_checked(str(tmp_path.parent / "d.py"))
+        assert not is_checked(f"{tmp_path}-other/e.py")
+
+
+class TestResolveJobs:
+    def test_number(self):
+        assert check.resolve_jobs(3) == 3
+
+    def test_auto(self):
+        assert check.resolve_jobs("auto") >= 1
+
+
+class TestCheckChanged:
+    def test_only_changed_files_rescanned(self, tmp_path: pathlib.Path) -> None:
+        check_dir = tmp_path / "src"
+        (check_dir / "excluded").mkdir(parents=True)
+        (check_dir / "unchanged.py").write_text("import os  # noqa: F401\n")
+        (check_dir / "modified.py").write_text("import os  # noqa: F401\n")
+        (check_dir / "deleted.py").write_text("import os  # noqa: F401\n")
+        config = Config(
+            path=pathlib.Path("src"),
+            rules=[Rule(tool=Tool.NOQA, code="F401", violation_count=1)],
+            excluded_folders=["excluded"],
+        )
+        baseline = cache.ResultCache(tmp_path / "cache", config.rules)
+        assert sum(v.count for v in check.check_recursive(check_dir, config, cache=baseline)) == 3
+        baseline.save()
+
+        (check_dir / "unchanged.py").write_text("import os  # noqa: F401, F401\n")
+        (check_dir / "modified.py").write_text("import os\n")
+        (check_dir / "deleted.py").unlink()
+        (check_dir / "added.py").write_text("import os  # noqa: F401\nimport re  # noqa: F401\n")
+        (check_dir / "excluded" / "ignored.py").write_text("import os  # noqa: F401\n")
+        changed = [
+            check_dir / "modified.py",
+            check_dir / "deleted.py",
+            check_dir / "added.py",
+            check_dir / "excluded" / "ignored.py",
+            tmp_path / "outside.py",
+        ]
+
+        incremental = cache.ResultCache(tmp_path / "cache", config.rules)
+        violations = check.check_changed(check_dir, config, changed, incremental)
+        # unchanged.py wasn't listed, but its fingerprint changed, so it's checked again.
+        assert sum(v.count for v in violations) == 4
+        incremental.save()
+
+        reloaded = cache.ResultCache(tmp_path / "cache", config.rules)
+        assert reloaded.complete
+        reloaded.keep_unseen()
+        assert sum(v.count for v in reloaded.violations()) == 4
+
+    def test_requires_complete_cache(self, tmp_path: pathlib.Path) -> None:
+        config = Config(path=pathlib.Path("."), rules=[])
+        with pytest.raises(ValueError, match="complete cache"):
+            check.check_changed(tmp_path, config, [], cache.ResultCache(tmp_path, config.rules))
@@ -1,5 +1,12 @@
-from lint_ratchet.checkers import NoQAChecker, Violation, get_checkers
-from lint_ratchet.configuration import Rule, Tool
+from lint_ratchet.checkers import (
+    Checkers,
+    FixitChecker,
+    MypyChecker,
+    NoQAChecker,
+    Violation,
+    get_checkers,
+)
+from lint_ratchet.configuration import WILDCARD, Rule, Tool
 
 
 class TestGetCheckers:
@@ -12,6 +19,48 @@ class TestGetCheckers:
         assert len(checkers) == 1
         assert isinstance(list(checkers)[0], NoQAChecker)
 
+    def test_all_tools(self):
+        rules = [Rule(tool=tool, code="Code", violation_count=1) for tool in Tool]
+        checkers = get_checkers(rules)
+        assert {type(checker) for checker in checkers} == {NoQAChecker, FixitChecker, MypyChecker}
+
+
+class TestCheckers:
+    def test_routes_each_comment_to_its_tool(self):
+        rules = [
+            Rule(tool=Tool.NOQA, code="F401", violation_count=1),
+            Rule(tool=Tool.FIXIT_FIXME, code="NoBareExcept", violation_count=1),
+            Rule(tool=Tool.MYPY, code="attr-defined", violation_count=1),
+        ]
+        comments = [
+            "# noqa: F401",
+            "# lint-fixme: NoBareExcept",
+            "# type: ignore[attr-defined]",
+            "# an ordinary comment",
+        ]
+        assert Checkers(get_checkers(rules)).check(comments) == [
+            Violation(tool=Tool.NOQA, rule="F401", count=1),
+            Violation(tool=Tool.FIXIT_FIXME, rule="NoBareExcept", count=1),
+            Violation(tool=Tool.MYPY, rule="attr-defined", count=1),
+        ]
+
+    def test_markers(self):
+        rules = [
+            Rule(tool=Tool.NOQA, code="F401", violation_count=1),
+            Rule(tool=Tool.FIXIT_IGNORE, code="NoBareExcept", violation_count=1),
+        ]
+        assert Checkers(get_checkers(rules)).markers == {b"# noqa:", b"# lint-ignore:"}
+
+    def test_empty(self):
+        assert Checkers().check(["# noqa: F401"]) == []
+
+    def test_check_lines(self) -> None:
+        rules = [Rule(tool=Tool.NOQA, code="F401", violation_count=1)]
+        comments = [(1, "# noqa: F401"), (3, "# noqa: F401, F401"), (4, "# noqa: E501")]
+        (violation,) = Checkers(get_checkers(rules)).check_lines(comments)
+        assert violation == Violation(tool=Tool.NOQA, rule="F401", count=3)
+        assert violation.lines == (1, 3)
+
 
 class TestNoQAChecker:
     def test_no_violations(self):
@@ -25,7 +74,7 @@ class TestNoQAChecker:
     def test_multiple_comments(self):
         checker = NoQAChecker([Rule(tool=Tool.NOQA, code="F401", violation_count=1)])
         comments = ["# noqa: F401", "# noqa: F401", "# noqa: F401"]
-        assert checker.check(comments) == [Violation(rule="F401", count=3)]
+        assert checker.check(comments) == [Violation(tool=Tool.NOQA, rule="F401", count=3)]
 
     def test_multiple_rules(self):
         rules = [
@@ -35,8 +84,8 @@ class TestNoQAChecker:
         checker = NoQAChecker(rules)
         comments = ["# noqa: F401", "# noqa: F401", "# noqa: BB12"]
         assert checker.check(comments) == [
-            Violation(rule="F401", count=2),
-            Violation(rule="BB12", count=1),
+            Violation(tool=Tool.NOQA, rule="F401", count=2),
+            Violation(tool=Tool.NOQA, rule="BB12", count=1),
         ]
 
     def test_comma_separated_violations(self):
@@ -47,6 +96,82 @@ class TestNoQAChecker:
         checker = NoQAChecker(rules)
         comments = ["# noqa: F401, BB12, ignore", "# noqa: F401", "# noqa: BB12", "# noqa: ignore"]
         assert checker.check(comments) == [
-            Violation(rule="F401", count=2),
-            Violation(rule="BB12", count=2),
+            Violation(tool=Tool.NOQA, rule="F401", count=2),
+            Violation(tool=Tool.NOQA, rule="BB12", count=2),
+        ]
+
+    def test_wildcard(self) -> None:
+        checker = NoQAChecker([Rule(tool=Tool.NOQA, code=WILDCARD, violation_count=0)])
+        comments = ["# noqa: F401, BB12", "# noqa: F401", "# type: ignore[misc]"]
+        assert checker.check(comments) == [
+            Violation(tool=Tool.NOQA, rule="F401", count=2),
+            Violation(tool=Tool.NOQA, rule="BB12", count=1),
+        ]
+
+
+class TestFixitChecker:
+    def test_fixme_and_ignore_counted_separately(self):
+        rules = [
+            Rule(tool=Tool.FIXIT_FIXME, code="NoBareExcept", violation_count=1),
+            Rule(tool=Tool.FIXIT_IGNORE, code="NoBareExcept", violation_count=1),
+        ]
+        checker = FixitChecker(rules)
+        comments = [
+            "# lint-fixme: NoBareExcept",
+            "# lint-ignore: NoBareExcept",
+            "# lint-ignore: NoBareExcept, Other",
+        ]
+        assert checker.check(comments) == [
+            Violation(tool=Tool.FIXIT_FIXME, rule="NoBareExcept", count=1),
+            Violation(tool=Tool.FIXIT_IGNORE, rule="NoBareExcept", count=2),
+        ]
+
+    def test_fixit_counts_both(self):
+        rules = [
+            Rule(tool=Tool.FIXIT_ANY, code="NoBareExcept", violation_count=1),
+            Rule(tool=Tool.FIXIT_FIXME, code="NoBareExcept", violation_count=1),
+        ]
+        checker = FixitChecker(rules)
+        comments = ["# lint-fixme: NoBareExcept", "# lint-ignore: NoBareExcept"]
+        assert checker.check(comments) == [
+            Violation(tool=Tool.FIXIT_ANY, rule="NoBareExcept", count=2),
+            Violation(tool=Tool.FIXIT_FIXME, rule="NoBareExcept", count=1),
+        ]
+
+    def test_only_configured_prefixes(self):
+        checker = FixitChecker([Rule(tool=Tool.FIXIT_FIXME, code="Rule", violation_count=1)])
+        assert checker.prefixes == ["# lint-fixme:"]
+        assert checker.check(["# lint-ignore: Rule"]) == []
+
+    def test_wildcard(self) -> None:
+        rules = [
+            Rule(tool=Tool.FIXIT_ANY, code=WILDCARD, violation_count=0),
+            Rule(tool=Tool.FIXIT_FIXME, code="Named", violation_count=0),
+        ]
+        checker = FixitChecker(rules)
+        comments = ["# lint-fixme: Named", "# lint-ignore: Other"]
+        assert checker.check(comments) == [
+            Violation(tool=Tool.FIXIT_FIXME, rule="Named", count=1),
+            Violation(tool=Tool.FIXIT_ANY, rule="Named", count=1),
+            Violation(tool=Tool.FIXIT_ANY, rule="Other", count=1),
+        ]
+
+
+class TestMypyChecker:
+    def test_codes(self):
+        rules = [
+            Rule(tool=Tool.MYPY, code="attr-defined", violation_count=1),
+            Rule(tool=Tool.MYPY, code="misc", violation_count=1),
+        ]
+        checker = MypyChecker(rules)
+        comments = [
+            "# type: ignore[attr-defined]",
+            "# type: ignore[misc, attr-defined]  # with an explanation",
+            "# type: ignore",
+            "# type: ignore[unconfigured]",
+            "# type: ignore[misc",
+        ]
+        assert checker.check(comments) == [
+            Violation(tool=Tool.MYPY, rule="attr-defined", count=2),
+            Violation(tool=Tool.MYPY, rule="misc", count=1),
         ]
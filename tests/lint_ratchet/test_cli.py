@@ -1,9 +1,14 @@
+import io
+import json
 import pathlib
+import tarfile
 
+import pytest
 from click.testing import CliRunner
 
 from lint_ratchet import configuration
 from lint_ratchet.cli import main
+from tests.lint_ratchet.test_git import run_git
 
 
 class TestCheckCommand:
@@ -14,6 +19,208 @@ class TestCheckCommand:
         assert result.exit_code == 1
         assert "noqa.F401 failed: 2 > 1" in result.output
 
+    def test_check_command_with_jobs(self):
+        root_path = (pathlib.Path(__file__).parent.parent / "examples").resolve()
+        runner = CliRunner()
+        result = runner.invoke(main, ["--root", f"{root_path}", "check", "--jobs", "auto"])
+        assert result.exit_code == 1
+        assert "noqa.F401 failed: 2 > 1" in result.output
+
+    def test_check_command_fail_fast(self):
+        root_path = (pathlib.Path(__file__).parent.parent / "examples").resolve()
+        runner = CliRunner()
+        result = runner.invoke(main, ["--root", f"{root_path}", "check", "--fail-fast"])
+        assert result.exit_code == 1
+        assert "noqa.F401 failed: at least 2 > 1 (stopped after" in result.output
+
+    def test_check_command_invalid_jobs(self):
+        root_path = (pathlib.Path(__file__).parent.parent / "examples").resolve()
+        runner = CliRunner()
+        result = runner.invoke(main, ["--root", f"{root_path}", "check", "--jobs", "0"])
+        assert result.exit_code == 2
+        assert "must be at least 1" in result.output
+
+    def test_check_command_with_cache(self, tmp_path: pathlib.Path) -> None:
+        config = configuration.Config(
+            path=pathlib.Path("."),
+            rules=[
+                configuration.Rule(tool=configuration.Tool.NOQA, code="F401", violation_count=1)
+            ],
+        )
+        with (tmp_path / ".ratchet.toml").open("w") as f:
+            configuration.write_configuration(config, f)
+        (tmp_path / "foo.py").write_text("import os  # noqa: F401\n")
+
+        runner = CliRunner()
+        for _ in range(2):
+            result = runner.invoke(main, ["--root", f"{tmp_path}", "check", "--cache"])
+            assert result.exit_code == 0
+        assert (tmp_path / ".ratchet_cache" / "results.json").exists()
+
+    def test_check_command_files_from(self, tmp_path: pathlib.Path) -> None:
+        config = configuration.Config(
+            path=pathlib.Path("."),
+            rules=[
+                configuration.Rule(tool=configuration.Tool.NOQA, code="F401", violation_count=1)
+            ],
+        )
+        with (tmp_path / ".ratchet.toml").open("w") as f:
+            configuration.write_configuration(config, f)
+        (tmp_path / "foo.py").write_text("import os  # noqa: F401\n")
+
+        runner = CliRunner()
+        result = runner.invoke(main, ["--root", f"{tmp_path}", "check", "--files-from", "-"])
+        assert result.exit_code == 0
+
+        (tmp_path / "bar.py").write_text("import os  # noqa: F401\n")
+        (tmp_path / "baz.py").write_text("import os  # noqa: F401\n")
+        result = runner.invoke(
+            main,
+            ["--root", f"{tmp_path}", "check", "--files-from", "-"],
+            input=f"{tmp_path / 'bar.py'}\n",
+        )
+        assert result.exit_code == 1
+        assert "noqa.F401 failed: 2 > 1" in result.output
+
+    def test_check_command_files_from_relative_to_root(
+        self, tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        root = tmp_path / "root"
+        root.mkdir()
+        config = configuration.Config(
+            path=pathlib.Path("."),
+            rules=[
+                configuration.Rule(tool=configuration.Tool.NOQA, code="F401", violation_count=1)
+            ],
+        )
+        with (root / ".ratchet.toml").open("w") as f:
+            configuration.write_configuration(config, f)
+        (root / "foo.py").write_text("import os  # noqa: F401\n")
+
+        runner = CliRunner()
+        result = runner.invoke(main, ["--root", f"{root}", "check", "--files-from", "-"])
+        assert result.exit_code == 0
+
+        (root / "bar.py").write_text("import os  # noqa: F401\n")
+        (tmp_path / "bar.py").write_text("x = 1\n")
+        monkeypatch.chdir(tmp_path)
+        result = runner.invoke(
+            main, ["--root", f"{root}", "check", "--files-from", "-"], input="bar.py\n"
+        )
+        assert result.exit_code == 1
+        assert "noqa.F401 failed: 2 > 1" in result.output
+
+    def test_check_command_stats(self, tmp_path: pathlib.Path) -> None:
+        root_path = (pathlib.Path(__file__).parent.parent / "examples").resolve()
+        runner = CliRunner()
+        result = runner.invoke(
+            main,
+            [
+                "--root",
+                f"{root_path}",
+                "check",
+                "--stats",
+                "--stats-json",
+                f"{tmp_path / 's.json'}",
+            ],
+        )
+        assert result.exit_code == 1
+        assert "slowest files:" in result.output
+        report = json.loads((tmp_path / "s.json").read_text())
+        assert report["command"] == "check"
+        assert report["files"] == report["files_read"] == 4
+        assert report["cache"] is None
+
+    def test_check_command_content_cache(self, tmp_path: pathlib.Path) -> None:
+        root_path = (pathlib.Path(__file__).parent.parent / "examples").resolve()
+        runner = CliRunner(env={"RATCHET_CONTENT_CACHE": str(tmp_path / "cache")})
+        reports = []
+        for _ in range(2):
+            result = runner.invoke(
+                main, ["--root", f"{root_path}", "check", "--stats-json", f"{tmp_path / 's.json'}"]
+            )
+            assert result.exit_code == 1
+            reports.append(json.loads((tmp_path / "s.json").read_text()))
+        # Only the files with markers are looked up.
+        assert sum(reports[0]["content_cache"].values()) == 2
+        assert reports[1]["content_cache"] == {"hits": 2, "misses": 0}
+
+    def test_check_command_daemon_not_running(
+        self, tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+        root_path = (pathlib.Path(__file__).parent.parent / "examples").resolve()
+        runner = CliRunner()
+        result = runner.invoke(main, ["--root", f"{root_path}", "check", "--daemon"])
+        assert result.exit_code == 1
+        assert "No daemon is running" in result.output
+
+        result = runner.invoke(main, ["--root", f"{root_path}", "check", "--daemon", "--stats"])
+        assert result.exit_code == 2
+
+    @pytest.mark.parametrize(
+        ("args", "message"),
+        [
+            (["--daemon", "--cache"], "--daemon can't be used with any other option"),
+            (["--daemon", "--jobs", "2"], "--daemon can't be used with any other option"),
+            (["--daemon", "--fail-fast"], "--daemon can't be used with any other option"),
+            (["--rev", "HEAD", "--archive", __file__], "--rev and --archive can't be"),
+            (["--rev", "HEAD", "--content-cache", "x"], "not --content-cache"),
+            (["--rev", "HEAD", "--index"], "not --index"),
+            (["--recursive-configs", "--fail-fast"], "not --fail-fast"),
+        ],
+    )
+    def test_check_command_unused_options(self, args: list[str], message: str) -> None:
+        root_path = (pathlib.Path(__file__).parent.parent / "examples").resolve()
+        result = CliRunner().invoke(main, ["--root", f"{root_path}", "check", *args])
+        assert result.exit_code == 2
+        assert message in result.output
+
+    def test_check_command_content_cache_from_environment(
+        self, tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+        root_path = (pathlib.Path(__file__).parent.parent / "examples").resolve()
+        runner = CliRunner(env={"RATCHET_CONTENT_CACHE": str(tmp_path / "cache")})
+        # The environment applies to every command, so it isn't an unused option.
+        result = runner.invoke(main, ["--root", f"{root_path}", "check", "--daemon"])
+        assert "No daemon is running" in result.output
+
+
+class TestRecursiveConfigs:
+    def test_reports_each_config(self, tmp_path: pathlib.Path) -> None:
+        for service, budget in (("a", 1), ("b", 0)):
+            (tmp_path / service).mkdir()
+            (tmp_path / service / "m.py").write_text("import os  # noqa: F401\n")
+            (tmp_path / service / ".ratchet.toml").write_text(
+                f'path = "."\n[noqa]\nF401 = {budget}\n'
+            )
+        runner = CliRunner()
+        result = runner.invoke(main, ["--root", f"{tmp_path}", "check", "--recursive-configs"])
+        assert result.exit_code == 1
+        assert result.output.splitlines() == [
+            "a/.ratchet.toml:",
+            "✅ All rules passed",
+            "b/.ratchet.toml:",
+            "noqa.F401 failed: 1 > 0",
+            "❌ 1/1 failed",
+            "Error: ❌ 1/2 configurations failed",
+        ]
+
+    def test_not_with_cache(self, tmp_path: pathlib.Path) -> None:
+        (tmp_path / ".ratchet.toml").write_text('path = "."\n')
+        result = CliRunner().invoke(
+            main, ["--root", f"{tmp_path}", "check", "--recursive-configs", "--cache"]
+        )
+        assert result.exit_code == 2
+
+    def test_no_configs(self, tmp_path: pathlib.Path) -> None:
+        result = CliRunner().invoke(
+            main, ["--root", f"{tmp_path}", "check", "--recursive-configs"]
+        )
+        assert result.exit_code == 1
+        assert "No .ratchet.toml files found" in result.output
+
 
 class TestCrankCommand:
     def test_nothing_to_crank(self):
@@ -45,3 +252,335 @@ class TestCrankCommand:
         new_config = configuration.open_configuration(root_path)
         assert new_config.rules[0].code == "F401"
         assert new_config.rules[0].violation_count == 1
+
+    def test_stats_json(self, tmp_path: pathlib.Path) -> None:
+        root_path = (pathlib.Path(__file__).parent.parent / "examples").resolve()
+        runner = CliRunner()
+        result = runner.invoke(
+            main, ["--root", f"{root_path}", "crank", "--stats-json", f"{tmp_path / 's.json'}"]
+        )
+        assert result.exit_code == 0
+        assert "elapsed:" not in result.output
+        assert json.loads((tmp_path / "s.json").read_text())["command"] == "crank"
+
+    @pytest.mark.parametrize(
+        ("args", "message"),
+        [
+            (["--from-snapshot", __file__, "--jobs", "2"], "can't be used with any other"),
+            (["--from-snapshot", __file__, "--content-cache", "x"], "can't be used with any"),
+            (["--from-snapshot", __file__, "--stats"], "can't be used with any other option"),
+            (["--from-snapshot", __file__, "--stats-json", "s.json"], "can't be used with any"),
+            (["--from-snapshot", __file__, "--rev", "HEAD"], "can't be used together"),
+            (["--rev", "HEAD", "--content-cache", "x"], "not --content-cache"),
+            (["--rev", "HEAD", "--cache"], "not --cache"),
+            (["--rev", "HEAD", "--index"], "not --index"),
+        ],
+    )
+    def test_unused_options(self, args: list[str], message: str) -> None:
+        root_path = (pathlib.Path(__file__).parent.parent / "examples").resolve()
+        result = CliRunner().invoke(main, ["--root", f"{root_path}", "crank", *args])
+        assert result.exit_code == 2
+        assert message in result.output
+
+
+class TestSnapshots:
+    @pytest.fixture
+    def root(self, tmp_path: pathlib.Path) -> pathlib.Path:
+        config = configuration.Config(
+            path=pathlib.Path("."), rules=[configuration.Rule(configuration.Tool.NOQA, "F401", 9)]
+        )
+        with (tmp_path / ".ratchet.toml").open("w") as f:
+            configuration.write_configuration(config, f)
+        for i in range(4):
+            (tmp_path / f"m{i}.py").write_text("import os  # noqa: F401\n" * i)
+        return tmp_path
+
+    def test_scan_merge_check_and_crank(self, root: pathlib.Path) -> None:
+        runner = CliRunner()
+        shards = []
+        for shard in ("1/2", "2/2"):
+            path = root / f"shard{shard[0]}.json"
+            result = runner.invoke(
+                main, ["--root", f"{root}", "scan", "--shard", shard, "-o", f"{path}"]
+            )
+            assert result.exit_code == 0
+            shards.append(f"{path}")
+        merged = root / "merged.json"
+        result = runner.invoke(main, ["merge", *shards, "-o", f"{merged}"])
+        assert result.exit_code == 0
+
+        # The files aren't read again, so changing them doesn't change the counts.
+        (root / "m0.py").write_text("import os  # noqa: F401\n" * 10)
+        result = runner.invoke(
+            main, ["--root", f"{root}", "check", "--from-snapshot", f"{merged}"]
+        )
+        assert result.exit_code == 0
+        result = runner.invoke(
+            main, ["--root", f"{root}", "crank", "--from-snapshot", f"{merged}"]
+        )
+        assert result.exit_code == 0
+        assert "noqa.F401 cranked: 9 -> 6" in result.output
+
+    def test_check_incomplete_snapshot(self, root: pathlib.Path) -> None:
+        runner = CliRunner()
+        result = runner.invoke(main, ["--root", f"{root}", "scan", "--shard", "2/3"])
+        assert result.exit_code == 0
+        (root / "shard.json").write_text(result.output)
+        result = runner.invoke(
+            main, ["--root", f"{root}", "check", "--from-snapshot", f"{root / 'shard.json'}"]
+        )
+        assert result.exit_code == 1
+        assert "missing shards 1, 3 of 3" in result.output
+
+    @pytest.mark.parametrize("shard", ["0/2", "3/2", "1", "a/b"])
+    def test_invalid_shard(self, root: pathlib.Path, shard: str) -> None:
+        result = CliRunner().invoke(main, ["--root", f"{root}", "scan", "--shard", shard])
+        assert result.exit_code == 2
+
+    def test_not_with_rev(self, root: pathlib.Path) -> None:
+        (root / "snapshot.json").write_text("{}")
+        result = CliRunner().invoke(
+            main,
+            [
+                "--root",
+                f"{root}",
+                "check",
+                "--rev",
+                "HEAD",
+                "--from-snapshot",
+                f"{root / 'snapshot.json'}",
+            ],
+        )
+        assert result.exit_code == 2
+
+
+class TestIndex:
+    @pytest.fixture
+    def root(self, tmp_path: pathlib.Path) -> pathlib.Path:
+        config = configuration.Config(
+            path=pathlib.Path("."), rules=[configuration.Rule(configuration.Tool.NOQA, "F401", 9)]
+        )
+        with (tmp_path / ".ratchet.toml").open("w") as f:
+            configuration.write_configuration(config, f)
+        (tmp_path / "pkg").mkdir()
+        (tmp_path / "a.py").write_text("x = 1\nimport os  # noqa: F401\n")
+        (tmp_path / "pkg" / "b.py").write_text("import os  # noqa: F401\n" * 2)
+        return tmp_path
+
+    def test_query_and_top(self, root: pathlib.Path) -> None:
+        runner = CliRunner()
+        result = runner.invoke(main, ["--root", f"{root}", "check", "--index"])
+        assert result.exit_code == 0
+
+        result = runner.invoke(main, ["--root", f"{root}", "query", "--rule", "noqa.F401"])
+        assert result.exit_code == 0
+        assert result.output == "a.py:2 noqa.F401 1\npkg/b.py:1,2 noqa.F401 2\n"
+
+        result = runner.invoke(main, ["--root", f"{root}", "top", "--by", "dir", "-n", "2"])
+        assert result.exit_code == 0
+        assert result.output == "3 .\n2 pkg\n"
+
+    def test_no_index(self, root: pathlib.Path) -> None:
+        result = CliRunner().invoke(main, ["--root", f"{root}", "top"])
+        assert result.exit_code == 1
+        assert "ratchet check --index" in result.output
+
+    def test_updated_with_files_from(self, root: pathlib.Path) -> None:
+        runner = CliRunner()
+        result = runner.invoke(main, ["--root", f"{root}", "check", "--index", "--cache"])
+        assert result.exit_code == 0
+
+        (root / "a.py").write_text("import os  # noqa: F401\nimport re  # noqa: F401\n")
+        (root / "pkg" / "b.py").unlink()
+        result = runner.invoke(
+            main,
+            ["--root", f"{root}", "check", "--index", "--files-from", "-"],
+            input=f"{root / 'a.py'}\n{root / 'pkg' / 'b.py'}\n",
+        )
+        assert result.exit_code == 0
+        result = runner.invoke(main, ["--root", f"{root}", "query"])
+        assert result.output == "a.py:1,2 noqa.F401 2\n"
+
+
+class TestRev:
+    @pytest.fixture
+    def repo(self, tmp_path: pathlib.Path) -> pathlib.Path:
+        config = configuration.Config(
+            path=pathlib.Path("."),
+            rules=[configuration.Rule(configuration.Tool.NOQA, "F401", 2)],
+            excluded_folders=["excluded"],
+        )
+        with (tmp_path / ".ratchet.toml").open("w") as f:
+            configuration.write_configuration(config, f)
+        (tmp_path / "excluded").mkdir()
+        (tmp_path / "excluded" / "a.py").write_text("import os  # noqa: F401\n" * 5)
+        (tmp_path / "b.py").write_text("import os  # noqa: F401\n")
+        run_git(tmp_path, "init", "-q")
+        run_git(tmp_path, "add", ".")
+        run_git(tmp_path, "commit", "-q", "-m", "initial")
+        (tmp_path / "b.py").write_text("import os  # noqa: F401\n" * 3)
+        return tmp_path
+
+    def test_check(self, repo: pathlib.Path) -> None:
+        runner = CliRunner()
+        result = runner.invoke(main, ["--root", f"{repo}", "check"])
+        assert result.exit_code == 1
+        result = runner.invoke(main, ["--root", f"{repo}", "check", "--rev", "HEAD"])
+        assert result.exit_code == 0
+        assert (repo / "b.py").read_text().count("noqa") == 3
+
+    def test_crank(self, repo: pathlib.Path) -> None:
+        runner = CliRunner()
+        result = runner.invoke(main, ["--root", f"{repo}", "crank", "--rev", "HEAD"])
+        assert result.exit_code == 0
+        assert "noqa.F401 cranked: 2 -> 1" in result.output
+
+    def test_unknown_rev(self, repo: pathlib.Path) -> None:
+        runner = CliRunner()
+        result = runner.invoke(main, ["--root", f"{repo}", "check", "--rev", "not-a-ref"])
+        assert result.exit_code == 1
+        assert "git ls-tree failed" in result.output
+
+    def test_not_with_cache(self, repo: pathlib.Path) -> None:
+        runner = CliRunner()
+        result = runner.invoke(main, ["--root", f"{repo}", "check", "--rev", "HEAD", "--cache"])
+        assert result.exit_code == 2
+
+
+class TestHistoryCommand:
+    def test_csv(self, tmp_path: pathlib.Path) -> None:
+        config = configuration.Config(
+            path=pathlib.Path("."), rules=[configuration.Rule(configuration.Tool.NOQA, "F401", 0)]
+        )
+        with (tmp_path / ".ratchet.toml").open("w") as f:
+            configuration.write_configuration(config, f)
+        run_git(tmp_path, "init", "-q")
+        for count in range(3):
+            (tmp_path / "a.py").write_text("import os  # noqa: F401\n" * count)
+            run_git(tmp_path, "add", "-A")
+            run_git(tmp_path, "commit", "-q", "-m", f"{count}")
+
+        runner = CliRunner()
+        result = runner.invoke(main, ["--root", f"{tmp_path}", "history", "--since", "HEAD~2"])
+        assert result.exit_code == 0
+        lines = result.output.splitlines()
+        assert lines[0] == "commit,date,noqa.F401"
+        assert [line.rsplit(",", 1)[1] for line in lines[1:]] == ["0", "1", "2"]
+
+        result = runner.invoke(
+            main, ["--root", f"{tmp_path}", "history", "--since", "HEAD~1", "--format", "json"]
+        )
+        assert result.exit_code == 0
+        assert [row["counts"] for row in json.loads(result.output)] == [
+            {"noqa.F401": 1},
+            {"noqa.F401": 2},
+        ]
+
+    def test_unknown_ref(self, tmp_path: pathlib.Path) -> None:
+        (tmp_path / ".ratchet.toml").write_text('path = "."\n')
+        run_git(tmp_path, "init", "-q")
+        runner = CliRunner()
+        result = runner.invoke(main, ["--root", f"{tmp_path}", "history", "--since", "nope"])
+        assert result.exit_code == 1
+        assert "git show failed" in result.output
+
+
+class TestInitCommand:
+    def test_init(self, tmp_path: pathlib.Path) -> None:
+        (tmp_path / "a.py").write_text("import os  # noqa: F401\nx = 1  # type: ignore[misc]\n")
+        runner = CliRunner()
+        result = runner.invoke(main, ["--root", f"{tmp_path}", "init", "--tool", "noqa"])
+        assert result.exit_code == 0
+        assert "noqa.F401 = 1" in result.output
+        assert "Wrote 1 rules to .ratchet.toml" in result.output
+        assert configuration.open_configuration(tmp_path).rules == [
+            configuration.Rule(configuration.Tool.NOQA, "F401", 1)
+        ]
+
+        result = runner.invoke(main, ["--root", f"{tmp_path}", "init"])
+        assert result.exit_code == 1
+        assert "--force" in result.output
+        result = runner.invoke(main, ["--root", f"{tmp_path}", "init", "--force"])
+        assert result.exit_code == 0
+        assert len(configuration.open_configuration(tmp_path).rules) == 2
+
+    def test_unknown_tool(self, tmp_path: pathlib.Path) -> None:
+        runner = CliRunner()
+        result = runner.invoke(main, ["--root", f"{tmp_path}", "init", "--tool", "pylint"])
+        assert result.exit_code == 2
+        assert "No checker plugin named `pylint`" in result.output
+
+
+class TestAddCommand:
+    def test_add(self, tmp_path: pathlib.Path) -> None:
+        (tmp_path / ".ratchet.toml").write_text('path = "."\n')
+        (tmp_path / "a.py").write_text("import os  # noqa: F401\n")
+        runner = CliRunner()
+        result = runner.invoke(main, ["--root", f"{tmp_path}", "add", "noqa", "F401"])
+        assert result.exit_code == 0
+        assert "Added noqa.F401 = 1" in result.output
+
+        result = runner.invoke(main, ["--root", f"{tmp_path}", "add", "noqa", "F401"])
+        assert result.exit_code == 1
+        assert "already ratcheted at 1" in result.output
+
+    @pytest.mark.parametrize("directory", ["missing", "a.py", ".."])
+    def test_directory_must_exist(self, tmp_path: pathlib.Path, directory: str) -> None:
+        (tmp_path / "src").mkdir()
+        (tmp_path / ".ratchet.toml").write_text('path = "src"\n')
+        (tmp_path / "src" / "a.py").write_text("import os  # noqa: F401\n")
+        result = CliRunner().invoke(
+            main, ["--root", f"{tmp_path}", "add", "noqa", "F401", "--directory", directory]
+        )
+        assert result.exit_code == 2
+        assert f"{directory} is not a directory within src" in result.output
+        assert configuration.open_configuration(tmp_path).rules == []
+
+
+class TestRootsFrom:
+    def test_streams_each_project(self, tmp_path: pathlib.Path) -> None:
+        for name, budget in [("a", 1), ("b", 0)]:
+            (tmp_path / name).mkdir()
+            (tmp_path / name / ".ratchet.toml").write_text(
+                f'path = "."\n[noqa]\nF401 = {budget}\n'
+            )
+            (tmp_path / name / "m.py").write_text("import os  # noqa: F401\n")
+        roots = f"{tmp_path / 'a'}\n\n{tmp_path / 'b'}\n"
+
+        runner = CliRunner()
+        result = runner.invoke(main, ["check", "--roots-from", "-", "-j", "1"], input=roots)
+        assert result.exit_code == 1
+        assert "1/2 projects failed" in result.output
+        lines = [json.loads(line) for line in result.output.splitlines() if line.startswith("{")]
+        assert {line["root"]: line["failure"] for line in lines} == {
+            str(tmp_path / "a"): False,
+            str(tmp_path / "b"): True,
+        }
+
+    def test_conflicts(self, tmp_path: pathlib.Path) -> None:
+        runner = CliRunner()
+        result = runner.invoke(main, ["check", "--roots-from", "-", "--cache"], input="")
+        assert result.exit_code == 2
+        assert "--roots-from can only be used with --jobs" in result.output
+
+
+class TestArchive:
+    def test_check_archive(self, tmp_path: pathlib.Path) -> None:
+        (tmp_path / ".ratchet.toml").write_text('path = "pkg-1.0"\n[noqa]\nF401 = 1\n')
+        with tarfile.open(tmp_path / "pkg.tar.gz", "w:gz") as tar_file:
+            for name in ["pkg-1.0/a.py", "pkg-1.0/b.py"]:
+                data = b"import os  # noqa: F401\n"
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                tar_file.addfile(info, io.BytesIO(data))
+
+        runner = CliRunner()
+        archive = f"{tmp_path / 'pkg.tar.gz'}"
+        result = runner.invoke(main, ["--root", f"{tmp_path}", "check", "--archive", archive])
+        assert result.exit_code == 1
+        assert "noqa.F401 failed: 2 > 1" in result.output
+
+        result = runner.invoke(
+            main, ["--root", f"{tmp_path}", "check", "--archive", archive, "--cache"]
+        )
+        assert result.exit_code == 2
@@ -6,6 +6,7 @@ import pytest
 import tomllib
 
 from lint_ratchet import configuration
+from lint_ratchet.checkers import Violation
 
 
 class TestReadConfiguration:
@@ -58,6 +59,95 @@ class TestReadConfiguration:
         with pytest.raises(configuration.RatchetMisconfiguredError, match="F401"):
             configuration.read_configuration(parsed)
 
+    def test_jobs(self):
+        toml = dedent("""
+            path = "src/"
+            jobs = "auto"
+        """)
+        parsed = cast(configuration.RatchetConfig, tomllib.loads(toml))
+        config = configuration.read_configuration(parsed)
+        assert config.jobs == "auto"
+
+    @pytest.mark.parametrize("jobs", ["0", '"many"', "true"])
+    def test_jobs_invalid(self, jobs: str) -> None:
+        toml = f"""
+            path = "src/"
+            jobs = {jobs}
+        """
+        parsed = cast(configuration.RatchetConfig, tomllib.loads(dedent(toml)))
+        with pytest.raises(configuration.RatchetMisconfiguredError, match="`jobs`"):
+            configuration.read_configuration(parsed)
+
+    def test_engine(self):
+        toml = dedent("""
+            path = "src/"
+            engine = "fast"
+        """)
+        parsed = cast(configuration.RatchetConfig, tomllib.loads(toml))
+        assert configuration.read_configuration(parsed).engine == "fast"
+
+    def test_engine_invalid(self):
+        toml = dedent("""
+            path = "src/"
+            engine = "regex"
+        """)
+        parsed = cast(configuration.RatchetConfig, tomllib.loads(toml))
+        with pytest.raises(configuration.RatchetMisconfiguredError, match="`engine`"):
+            configuration.read_configuration(parsed)
+
+    def test_gitignore(self):
+        toml = dedent("""
+            path = "src/"
+            exclude = ["build/", "*_pb2.py"]
+            gitignore = true
+        """)
+        parsed = cast(configuration.RatchetConfig, tomllib.loads(toml))
+        config = configuration.read_configuration(parsed)
+        assert config.gitignore
+        assert config.excluder.excludes("api/users_pb2.py", is_dir=False)
+        assert config.excluder.excludes("build", is_dir=True)
+
+    def test_gitignore_invalid(self):
+        toml = dedent("""
+            path = "src/"
+            gitignore = "yes"
+        """)
+        parsed = cast(configuration.RatchetConfig, tomllib.loads(toml))
+        with pytest.raises(configuration.RatchetMisconfiguredError, match="`gitignore`"):
+            configuration.read_configuration(parsed)
+
+    def test_directory_budgets(self) -> None:
+        toml = dedent("""
+            path = "."
+
+            [noqa]
+            F401 = 7
+
+            [noqa."src/billing/"]
+            F401 = 3
+            E501 = 1
+        """)
+        config = configuration.read_configuration(
+            cast(configuration.RatchetConfig, tomllib.loads(toml))
+        )
+        assert config.rules == [
+            configuration.Rule(configuration.Tool.NOQA, "F401", 7),
+            configuration.Rule(configuration.Tool.NOQA, "F401", 3, "src/billing"),
+            configuration.Rule(configuration.Tool.NOQA, "E501", 1, "src/billing"),
+        ]
+        assert config.rules[1].name == 'noqa."src/billing".F401'
+
+    @pytest.mark.parametrize("path", [".", "..", "../other", "/src"])
+    def test_directory_budget_outside(self, path: str) -> None:
+        toml = {"path": ".", "noqa": {path: {"F401": 1}}}
+        with pytest.raises(configuration.RatchetMisconfiguredError, match="within the checked"):
+            configuration.read_configuration(cast(configuration.RatchetConfig, toml))
+
+    def test_wildcard_code(self) -> None:
+        toml = {"path": ".", "noqa": {"*": 1}}
+        with pytest.raises(configuration.RatchetMisconfiguredError, match="isn't a code"):
+            configuration.read_configuration(cast(configuration.RatchetConfig, toml))
+
 
 class TestOpenConfiguration:
     def test_example_config_loads(self):
@@ -80,6 +170,55 @@ class TestOpenConfiguration:
             configuration.open_configuration(root)
 
 
+class TestFindConfigurations:
+    def test_finds_nested_configurations(self, tmp_path: pathlib.Path) -> None:
+        for directory in ("", "services/a", "services/b", "node_modules/c"):
+            (tmp_path / directory).mkdir(parents=True, exist_ok=True)
+            (tmp_path / directory / ".ratchet.toml").write_text('path = "."\n[noqa]\nF401 = 1\n')
+        configs = configuration.find_configurations(tmp_path)
+        assert [root for root, _ in configs] == [
+            tmp_path,
+            tmp_path / "services/a",
+            tmp_path / "services/b",
+        ]
+
+    def test_none_found(self, tmp_path: pathlib.Path) -> None:
+        with pytest.raises(configuration.ProjectFileNotFoundError):
+            configuration.find_configurations(tmp_path)
+
+    def test_misconfigured_names_the_file(self, tmp_path: pathlib.Path) -> None:
+        (tmp_path / ".ratchet.toml").write_text("[noqa]\n")
+        with pytest.raises(configuration.RatchetMisconfiguredError, match=r"\.ratchet\.toml: "):
+            configuration.find_configurations(tmp_path)
+
+
+class TestMergeConfigurations:
+    def test_merged(self) -> None:
+        noqa = configuration.Rule(configuration.Tool.NOQA, "F401", 3)
+        mypy = configuration.Rule(configuration.Tool.MYPY, "assignment", 2)
+        merged = configuration.merge_configurations(
+            [
+                configuration.Config(
+                    pathlib.Path("src"), [noqa], excluded_folders=["gen/", "build/", "a/b"]
+                ),
+                configuration.Config(
+                    pathlib.Path("."),
+                    [mypy, noqa],
+                    excluded_folders=["a/b", "gen/"],
+                    jobs=4,
+                    engine="fast",
+                ),
+            ]
+        )
+        assert merged.rules == [
+            configuration.Rule(configuration.Tool.NOQA, "F401", 0),
+            configuration.Rule(configuration.Tool.MYPY, "assignment", 0),
+        ]
+        assert merged.excluded_folders == ["gen/"]
+        assert merged.jobs == 4
+        assert merged.engine == "tokenize"
+
+
 class TestWriteConfiguration:
     def test_example_config_roundtrips(self, tmp_path: pathlib.Path) -> None:
         root = pathlib.Path(__file__).parent.parent / "examples"
@@ -102,9 +241,52 @@ class TestWriteConfiguration:
                 configuration.Rule(configuration.Tool.MYPY, "misc", 0),
             ],
             excluded_folders=["__pycache__", ".git"],
+            gitignore=True,
         )
         config_file = tmp_path / ".ratchet.toml"
         with config_file.open("w") as f:
             configuration.write_configuration(config, f)
         config2 = configuration.open_configuration(config_file)
         assert config == config2
+
+
+class TestProjectCounts:
+    def test_counts_each_budgeted_directory(self) -> None:
+        noqa = configuration.Tool.NOQA
+        config = configuration.Config(
+            path=pathlib.Path("."),
+            rules=[
+                configuration.Rule(noqa, "F401", 0),
+                configuration.Rule(noqa, "F401", 0, "src"),
+                configuration.Rule(noqa, "F401", 0, "src/billing"),
+                configuration.Rule(noqa, "F401", 0, "tests"),
+            ],
+        )
+        counts = configuration.ProjectCounts(config, "/project/")
+        violations = [Violation(noqa, "F401", 2), Violation(noqa, "E501", 1)]
+        counts.add("/project/src/billing/api.py", violations)
+        counts.add("/project/src/billing/sub/models.py", violations)
+        counts.add("/project/src/auth.py", violations)
+        counts.add("/project/setup.py", violations)
+        counts.add("/project/src/billing_old/x.py", violations)
+        counts.add("/project/src/billing/api.py", violations, -1)
+        assert [counts[rule] for rule in config.rules] == [8, 6, 2, 0]
+
+
+class TestRuleCounts:
+    def test_counts_configured_rules(self) -> None:
+        config = configuration.Config(
+            path=pathlib.Path("."),
+            rules=[
+                configuration.Rule(configuration.Tool.NOQA, "F401", 0),
+                configuration.Rule(configuration.Tool.MYPY, "F401", 0),
+            ],
+        )
+        counts = config.rule_index.counts()
+        assert counts.add(configuration.Tool.NOQA, "F401", 2) == 0
+        assert counts.add(configuration.Tool.MYPY, "F401", 3) == 1
+        assert counts.add(configuration.Tool.NOQA, "E501", 4) is None
+        assert counts[configuration.Tool.NOQA, "F401"] == 2
+        assert counts[configuration.Tool.MYPY, "F401"] == 3
+        assert counts[configuration.Tool.NOQA, "E501"] == 0
+        assert list(counts.array) == [2, 3]
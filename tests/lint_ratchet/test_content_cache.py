@@ -0,0 +1,210 @@
+import http.server
+import os
+import pathlib
+import threading
+from collections.abc import Iterator
+
+import pytest
+
+from lint_ratchet import check, content_cache
+from lint_ratchet.checkers import Violation
+from lint_ratchet.configuration import Config, Rule, Tool
+from lint_ratchet.parsing import Engine
+
+
+RULES = [Rule(tool=Tool.NOQA, code="F401", violation_count=1)]
+VIOLATIONS = [Violation(tool=Tool.NOQA, rule="F401", count=2)]
+
+
+class StoreHandler(http.server.BaseHTTPRequestHandler):
+    """
+    A stand-in for a shared cache server, storing the bodies of PUT requests in memory.
+    """
+
+    protocol_version = "HTTP/1.1"
+    store: dict[str, bytes] = {}
+
+    def do_GET(self) -> None:  # noqa: N802
+        value = self.store.get(self.path)
+        self.send_response(404 if value is None else 200)
+        self.send_header("Content-Length", str(len(value or b"")))
+        self.end_headers()
+        self.wfile.write(value or b"")
+
+    def do_PUT(self) -> None:  # noqa: N802
+        self.store[self.path] = self.rfile.read(int(self.headers["Content-Length"]))
+        self.send_response(204)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+@pytest.fixture
+def server() -> Iterator[tuple[str, dict[str, bytes]]]:
+    store: dict[str, bytes] = {}
+    handler = type("Handler", (StoreHandler,), {"store": store})
+    with http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler) as httpd:
+        thread = threading.Thread(target=httpd.serve_forever)
+        thread.start()
+        try:
+            yield f"http://127.0.0.1:{httpd.server_address[1]}/cache", store
+        finally:
+            httpd.shutdown()
+            thread.join()
+
+
+def directory_cache(
+    path: pathlib.Path, rules: list[Rule] = RULES, engine: Engine = "tokenize"
+) -> content_cache.ContentCache:
+    return content_cache.ContentCache(content_cache.DirectoryBackend(path), rules, engine)
+
+
+class TestContentCache:
+    def test_roundtrip(self, tmp_path: pathlib.Path) -> None:
+        cache = directory_cache(tmp_path)
+        key = cache.key(b"import os  # noqa: F401\n")
+        assert cache.get(key) is None
+        cache.put(key, VIOLATIONS)
+
+        cache = directory_cache(tmp_path)
+        assert cache.get(key) == VIOLATIONS
+        assert cache.get(cache.key(b"")) is None
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_key_depends_on_contents_rules_and_engine(self, tmp_path: pathlib.Path) -> None:
+        key = directory_cache(tmp_path).key(b"a")
+        assert directory_cache(tmp_path).key(b"a") == key
+        assert directory_cache(tmp_path).key(b"b") != key
+        new_rules = [*RULES, Rule(tool=Tool.NOQA, code="E501", violation_count=0)]
+        assert directory_cache(tmp_path, new_rules).key(b"a") != key
+        assert directory_cache(tmp_path, engine="fast").key(b"a") != key
+
+    def test_corrupt_entry_is_a_miss(self, tmp_path: pathlib.Path) -> None:
+        cache = directory_cache(tmp_path)
+        key = cache.key(b"")
+        cache.backend.put(key, b"{not json")
+        assert cache.get(key) is None
+        assert (cache.hits, cache.misses) == (0, 1)
+
+
+class TestDirectoryBackend:
+    def test_put_leaves_no_temporary_files(self, tmp_path: pathlib.Path) -> None:
+        backend = content_cache.DirectoryBackend(tmp_path)
+        backend.put("abcdef", b"1")
+        backend.put("abcdef", b"2")
+        assert backend.get("abcdef") == b"2"
+        assert os.listdir(tmp_path / "ab") == ["abcdef"]
+
+    def test_unwritable_directory_is_ignored(self, tmp_path: pathlib.Path) -> None:
+        (tmp_path / "file").touch()
+        backend = content_cache.DirectoryBackend(tmp_path / "file")
+        backend.put("abcdef", b"1")
+        assert backend.get("abcdef") is None
+
+    def test_evicts_least_recently_used(self, tmp_path: pathlib.Path) -> None:
+        backend = content_cache.DirectoryBackend(tmp_path, max_bytes=None)
+        for age, key in enumerate(["aa1", "bb2", "cc3"]):
+            backend.put(key, b"1234")
+            os.utime(tmp_path / key[:2] / key, (1000 - age, 1000 - age))
+        # Reading an entry makes it the most recently used.
+        assert backend.get("cc3") == b"1234"
+
+        assert backend.evict(2 * entry_usage(tmp_path / "aa" / "aa1")) == 1
+        assert backend.get("aa1") == b"1234"
+        assert backend.get("bb2") is None
+
+    def test_put_evicts_over_max_bytes(self, tmp_path: pathlib.Path) -> None:
+        content_cache.DirectoryBackend(tmp_path, max_bytes=None).put("aa1", b"1234")
+        usage = entry_usage(tmp_path / "aa" / "aa1")
+        os.utime(tmp_path / "aa" / "aa1", (1000, 1000))
+
+        backend = content_cache.DirectoryBackend(tmp_path, max_bytes=2 * usage)
+        backend.put("bb2", b"1234")
+        assert count_entries(tmp_path) == 2
+        # Going over the limit evicts below it, so the next puts don't evict again.
+        backend.put("cc3", b"1234")
+        assert count_entries(tmp_path) == 1
+        assert backend.get("cc3") == b"1234"
+
+
+def entry_usage(path: pathlib.Path) -> int:
+    return content_cache._disk_usage(path.stat())
+
+
+def count_entries(path: pathlib.Path) -> int:
+    return sum(len(files) for _, _, files in os.walk(path))
+
+
+class TestHTTPBackend:
+    def test_roundtrip(self, server: tuple[str, dict[str, bytes]]) -> None:
+        url, store = server
+        backend = content_cache.HTTPBackend(url)
+        try:
+            assert backend.get("abc") is None
+            backend.put("abc", b"[]")
+            assert backend.get("abc") == b"[]"
+        finally:
+            backend.close()
+        assert store == {"/cache/abc": b"[]"}
+
+    def test_shared_between_caches(self, server: tuple[str, dict[str, bytes]]) -> None:
+        url, _ = server
+        for expected in (None, VIOLATIONS):
+            cache = content_cache.ContentCache(content_cache.HTTPBackend(url), RULES, "tokenize")
+            key = cache.key(b"import os  # noqa: F401\n")
+            try:
+                assert cache.get(key) == expected
+                cache.put(key, VIOLATIONS)
+            finally:
+                cache.close()
+
+    def test_unavailable_server_is_disabled(self) -> None:
+        # Nothing listens on the discard port.
+        backend = content_cache.HTTPBackend("http://127.0.0.1:9/cache", timeout=1)
+        for _ in range(content_cache.HTTP_MAX_FAILURES + 1):
+            assert backend.get("abc") is None
+        assert backend.failures == content_cache.HTTP_MAX_FAILURES
+        backend.close()
+
+    def test_rejects_other_schemes(self) -> None:
+        with pytest.raises(ValueError):
+            content_cache.HTTPBackend("ftp://example.com/cache")
+
+    def test_open_backend(self, tmp_path: pathlib.Path) -> None:
+        assert isinstance(
+            content_cache.open_backend("http://localhost/cache"), content_cache.HTTPBackend
+        )
+        assert isinstance(
+            content_cache.open_backend(str(tmp_path)), content_cache.DirectoryBackend
+        )
+
+
+class TestCheckFilesWithContentCache:
+    @pytest.mark.parametrize("jobs", [1, 2])
+    def test_fresh_checkout_hits(
+        self, tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch, jobs: int
+    ) -> None:
+        monkeypatch.setattr(check, "PARALLEL_MIN_FILES", 0)
+        config = Config(path=pathlib.Path("."), rules=RULES)
+        for checkout in ("one", "two"):
+            (tmp_path / checkout).mkdir()
+            (tmp_path / checkout / "a.py").write_text("import os  # noqa: F401\n")
+            (tmp_path / checkout / "b.py").write_text("import os\n")
+
+        results = []
+        caches = []
+        for checkout in ("one", "two"):
+            cache = directory_cache(tmp_path / "cache")
+            files = check.check_files(tmp_path / checkout, config, jobs, content_cache=cache)
+            results.append({os.path.basename(path): violations for path, violations in files})
+            cache.close()
+            caches.append(cache)
+
+        cold, warm = caches
+        assert results[0] == results[1]
+        assert results[0]["a.py"] == [Violation(tool=Tool.NOQA, rule="F401", count=1)]
+        # Files without markers are skipped before they're hashed.
+        assert (cold.hits, cold.misses) == (0, 1)
+        assert (warm.hits, warm.misses) == (1, 0)
@@ -0,0 +1,144 @@
+import pathlib
+import tempfile
+import threading
+from collections.abc import Iterator
+
+import pytest
+
+from lint_ratchet import configuration, daemon
+
+
+def write_config(root: pathlib.Path, count: int = 1, gitignore: bool = False) -> None:
+    config = configuration.Config(
+        path=pathlib.Path("src"),
+        rules=[configuration.Rule(configuration.Tool.NOQA, "F401", count)],
+        excluded_folders=["excluded"],
+        gitignore=gitignore,
+    )
+    with (root / ".ratchet.toml").open("w") as f:
+        configuration.write_configuration(config, f)
+
+
+def noqa(path: pathlib.Path, count: int = 1) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("import os  # noqa: F401\n" * count)
+
+
+@pytest.fixture
+def root(tmp_path: pathlib.Path) -> pathlib.Path:
+    write_config(tmp_path)
+    noqa(tmp_path / "src" / "a.py")
+    noqa(tmp_path / "src" / "excluded" / "b.py")
+    return tmp_path
+
+
+@pytest.fixture(params=[True, False], ids=["poll", "inotify"])
+def warm(request: pytest.FixtureRequest, root: pathlib.Path) -> Iterator[daemon.Daemon]:
+    if not request.param and daemon._Inotify.create() is None:
+        pytest.skip("inotify isn't available")
+    instance = daemon.Daemon(root, poll=request.param)
+    assert instance.polling == request.param
+    yield instance
+    instance.close()
+
+
+def new_counts(warm: daemon.Daemon) -> list[int]:
+    warm.poll()
+    return [result.new_count for result in warm.results()]
+
+
+class TestDaemon:
+    def test_updates_changed_files(self, warm: daemon.Daemon, root: pathlib.Path) -> None:
+        assert new_counts(warm) == [1]
+        noqa(root / "src" / "a.py", 3)
+        noqa(root / "src" / "c.py")
+        noqa(root / "src" / "excluded" / "d.py")
+        assert new_counts(warm) == [4]
+        (root / "src" / "c.py").unlink()
+        assert new_counts(warm) == [3]
+
+    def test_updates_changed_directories(self, warm: daemon.Daemon, root: pathlib.Path) -> None:
+        noqa(root / "src" / "pkg" / "sub" / "c.py", 2)
+        assert new_counts(warm) == [3]
+        noqa(root / "src" / "pkg" / "sub" / "d.py")
+        assert new_counts(warm) == [4]
+        (root / "src" / "pkg").rename(root / "moved")
+        assert new_counts(warm) == [1]
+        (root / "moved").rename(root / "src" / "excluded" / "pkg")
+        assert new_counts(warm) == [1]
+
+    def test_forgets_deleted_directories(self, warm: daemon.Daemon, root: pathlib.Path) -> None:
+        for name in ["c", "d", "e"]:
+            noqa(root / "src" / "pkg" / f"{name}.py")
+        noqa(root / "src" / "pkg_other" / "f.py")
+        assert new_counts(warm) == [5]
+        for path in (root / "src" / "pkg").iterdir():
+            path.unlink()
+        (root / "src" / "pkg").rmdir()
+        assert new_counts(warm) == [2]
+
+    def test_reloads_the_configuration(self, warm: daemon.Daemon, root: pathlib.Path) -> None:
+        write_config(root, count=0)
+        warm.poll()
+        assert [result.failure for result in warm.results()] == [True]
+
+        (root / ".ratchet.toml").write_text("[noqa]\n")
+        warm.poll()
+        assert warm.error == "Key `path` not found"
+        write_config(root)
+        assert new_counts(warm) == [1]
+        assert not warm.error
+
+    def test_reloads_gitignore_files(self, warm: daemon.Daemon, root: pathlib.Path) -> None:
+        (root / ".git").mkdir()
+        noqa(root / "src" / "pkg" / "c.py", 2)
+        write_config(root, gitignore=True)
+        assert new_counts(warm) == [3]
+
+        (root / ".gitignore").write_text("a.py\n")
+        assert new_counts(warm) == [2]
+        (root / "src" / "pkg" / ".gitignore").write_text("c.py\n")
+        assert new_counts(warm) == [0]
+        (root / "src" / ".gitignore").write_text("!a.py\n")
+        assert new_counts(warm) == [1]
+        (root / "src" / "pkg" / ".gitignore").unlink()
+        assert new_counts(warm) == [3]
+        (root / ".gitignore").write_text("pkg/\n")
+        assert new_counts(warm) == [1]
+        (root / ".gitignore").unlink()
+        assert new_counts(warm) == [3]
+        noqa(root / "src" / "pkg" / "d.py")
+        assert new_counts(warm) == [4]
+
+
+class TestServe:
+    def test_query(self, root: pathlib.Path) -> None:
+        # Socket paths are limited to around 100 characters, which tmp_path can exceed.
+        with tempfile.TemporaryDirectory() as socket_dir:
+            self.check_query(root, pathlib.Path(socket_dir) / "daemon.sock")
+
+    def check_query(self, root: pathlib.Path, socket_path: pathlib.Path) -> None:
+        warm = daemon.Daemon(root, poll_interval=0.05)
+        stop = threading.Event()
+        thread = threading.Thread(target=warm.serve, args=(socket_path, stop))
+        thread.start()
+        try:
+            other = daemon.Daemon(root)
+            with pytest.raises(daemon.DaemonError, match="already listening"):
+                other.serve(socket_path)
+            other.close()
+
+            results = daemon.query(root, socket_path)
+            assert [(r.rule.code, r.new_count) for r in results] == [("F401", 1)]
+            if not warm.polling:
+                noqa(root / "src" / "c.py")
+                assert daemon.query(root, socket_path)[0].new_count == 2
+        finally:
+            stop.set()
+            thread.join()
+            warm.close()
+        assert not socket_path.exists()
+
+    def test_query_without_daemon(self, root: pathlib.Path) -> None:
+        with pytest.raises(daemon.DaemonError, match="No daemon is running"):
+            daemon.query(root, root / "missing.sock")
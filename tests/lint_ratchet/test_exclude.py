@@ -0,0 +1,110 @@
+import os
+import pathlib
+
+import pytest
+
+from lint_ratchet import check
+from lint_ratchet.exclude import Excluder
+
+
+class TestExcludes:
+    @pytest.mark.parametrize(
+        ("pattern", "path", "is_dir", "excluded"),
+        [
+            ("__pycache__", "__pycache__", True, True),
+            ("__pycache__", "a/b/__pycache__", True, True),
+            ("*_pb2.py", "api/users_pb2.py", False, True),
+            ("*_pb2.py", "api/users_pb2.pyi", False, False),
+            ("build/", "build", True, True),
+            ("build/", "build", False, False),
+            ("/build", "build", True, True),
+            ("/build", "src/build", True, False),
+            ("src/gen", "src/gen", True, True),
+            ("src/gen", "lib/src/gen", True, False),
+            ("build/**", "build/a/b.py", False, True),
+            ("build/**", "build", True, False),
+            ("**/migrations", "app/db/migrations", True, True),
+            ("**/migrations", "migrations", True, True),
+            ("a/**/b", "a/b", True, True),
+            ("a/**/b", "a/x/y/b", True, True),
+            ("a/*/b", "a/x/y/b", True, False),
+            ("mod?.py", "mod1.py", False, True),
+            ("mod?.py", "mod10.py", False, False),
+            ("mod[0-2].py", "mod1.py", False, True),
+            ("mod[!0-2].py", "mod1.py", False, False),
+            ("mod[!0-2].py", "mod3.py", False, True),
+            ("\\#notes.py", "#notes.py", False, True),
+            ("# a comment", "# a comment", False, False),
+            ("a.py   ", "a.py", False, True),
+        ],
+    )
+    def test_pattern(self, pattern: str, path: str, is_dir: bool, excluded: bool) -> None:
+        assert Excluder([pattern]).excludes(path, is_dir) is excluded
+
+    def test_last_matching_pattern_wins(self) -> None:
+        excluder = Excluder(["*.py", "!keep.py", "keep.py/"])
+        assert excluder.excludes("drop.py", is_dir=False)
+        assert not excluder.excludes("keep.py", is_dir=False)
+        assert excluder.excludes("keep.py", is_dir=True)
+
+    def test_excluded_parents(self, tmp_path: pathlib.Path) -> None:
+        excluder = Excluder(["build/", "!build/keep.py"])
+        assert excluder.excludes_path(tmp_path, pathlib.PurePath("build/keep.py"))
+        assert not excluder.excludes_path(tmp_path, pathlib.PurePath("src/keep.py"))
+
+
+class TestGitignore:
+    def test_nested_gitignore_files(self, tmp_path: pathlib.Path) -> None:
+        (tmp_path / ".gitignore").write_text("generated/\n*_pb2.py\n")
+        (tmp_path / "pkg" / "generated").mkdir(parents=True)
+        (tmp_path / "pkg" / ".gitignore").write_text("/local.py\n!api_pb2.py\n")
+        for name in ["a.py", "a_pb2.py", "pkg/local.py", "pkg/api_pb2.py", "pkg/b_pb2.py"]:
+            (tmp_path / name).write_text("")
+        (tmp_path / "pkg" / "generated" / "c.py").write_text("")
+        excluder = Excluder(gitignore=True).for_directory(tmp_path)
+        walked = {os.path.relpath(p, tmp_path) for p in check.walk(tmp_path, excluder)}
+        assert walked == {"a.py", "pkg/api_pb2.py"}
+        assert excluder.excludes_path(tmp_path, pathlib.PurePath("pkg/local.py"))
+        assert not excluder.excludes_path(tmp_path, pathlib.PurePath("pkg/api_pb2.py"))
+
+    def test_exclude_takes_precedence(self, tmp_path: pathlib.Path) -> None:
+        (tmp_path / ".gitignore").write_text("!*.py\n")
+        excluder = Excluder(["a.py"], gitignore=True).for_directory(tmp_path)
+        assert excluder.excludes("a.py", is_dir=False)
+
+    def test_ignored_unless_enabled(self, tmp_path: pathlib.Path) -> None:
+        (tmp_path / ".gitignore").write_text("*.py\n")
+        (tmp_path / "a.py").write_text("")
+        excluder = Excluder().for_directory(tmp_path)
+        assert [p.name for p in check.walk(tmp_path, excluder)] == ["a.py"]
+
+    def test_parent_gitignore_files_in_the_repository(self, tmp_path: pathlib.Path) -> None:
+        (tmp_path / ".gitignore").write_text("/repo/src/outside/\n")
+        (tmp_path / "repo" / ".git").mkdir(parents=True)
+        (tmp_path / "repo" / "src").mkdir()
+        (tmp_path / "repo" / ".gitignore").write_text("/src/gen/\n")
+        (tmp_path / "repo" / "src" / ".gitignore").write_text("/other/\n")
+        excluder = Excluder(gitignore=True).for_directory(tmp_path / "repo" / "src")
+        assert excluder.excludes("gen", is_dir=True)
+        assert excluder.excludes("other", is_dir=True)
+        assert not excluder.excludes("src/gen", is_dir=True)
+        assert not excluder.excludes("outside", is_dir=True)
+
+    def test_excluded_directories_are_not_listed(
+        self, tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        (tmp_path / ".gitignore").write_text("node_modules/\n")
+        (tmp_path / "node_modules" / "pkg").mkdir(parents=True)
+        (tmp_path / "node_modules" / "pkg" / "a.py").write_text("")
+        (tmp_path / "b.py").write_text("")
+        listed = []
+        scandir = os.scandir
+
+        def spy(path: str | os.PathLike[str]) -> "os._ScandirIterator[str]":
+            listed.append(os.path.relpath(path, tmp_path))
+            return scandir(path)
+
+        monkeypatch.setattr(os, "scandir", spy)
+        excluder = Excluder(gitignore=True).for_directory(tmp_path)
+        assert [p.name for p in check.walk(tmp_path, excluder)] == ["b.py"]
+        assert listed == ["."]
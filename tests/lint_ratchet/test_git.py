@@ -0,0 +1,117 @@
+import pathlib
+import subprocess
+
+import pytest
+
+from lint_ratchet import git
+
+
+def run_git(repo: pathlib.Path, *args: str) -> None:
+    subprocess.run(
+        ["git", "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+        cwd=repo,
+        check=True,
+        capture_output=True,
+    )
+
+
+@pytest.fixture
+def repo(tmp_path: pathlib.Path) -> pathlib.Path:
+    run_git(tmp_path, "init", "-q")
+    (tmp_path / "src").mkdir()
+    for name in ("modified.py", "deleted.py", "renamed.py", "unchanged.py"):
+        (tmp_path / "src" / name).write_text("import os\n")
+    (tmp_path / "outside.py").write_text("import os\n")
+    run_git(tmp_path, "add", ".")
+    run_git(tmp_path, "commit", "-q", "-m", "initial")
+    return tmp_path
+
+
+class TestChangedFiles:
+    def test_changed_files(self, repo: pathlib.Path) -> None:
+        src = repo / "src"
+        (src / "modified.py").write_text("import os  # noqa: F401\n")
+        (src / "deleted.py").unlink()
+        (src / "renamed.py").rename(src / "moved.py")
+        (src / "untracked.py").write_text("import os\n")
+        (repo / "outside.py").write_text("import os  # noqa: F401\n")
+
+        assert git.changed_files(src, "HEAD") == [
+            src / "deleted.py",
+            src / "modified.py",
+            src / "moved.py",
+            src / "renamed.py",
+            src / "untracked.py",
+        ]
+
+    def test_unknown_ref(self, repo: pathlib.Path) -> None:
+        with pytest.raises(git.GitError, match="git diff failed"):
+            git.changed_files(repo, "not-a-ref")
+
+
+class TestTreeFiles:
+    def test_lists_files_under_the_directory(self, repo: pathlib.Path) -> None:
+        (repo / "src" / "link.py").symlink_to("unchanged.py")
+        run_git(repo, "add", ".")
+        run_git(repo, "commit", "-q", "-m", "symlink")
+        files = git.tree_files(repo / "src", "HEAD")
+        assert [file.path for file in files] == [
+            "deleted.py",
+            "modified.py",
+            "renamed.py",
+            "unchanged.py",
+        ]
+        assert all(len(file.blob) == 40 for file in files)
+
+    def test_unknown_ref(self, repo: pathlib.Path) -> None:
+        with pytest.raises(git.GitError, match="git ls-tree failed"):
+            git.tree_files(repo, "not-a-ref")
+
+
+class TestBlobReader:
+    def test_reads_blobs_in_order(self, repo: pathlib.Path) -> None:
+        (repo / "src" / "modified.py").write_text("import os  # noqa: F401\n")
+        run_git(repo, "commit", "-q", "-am", "modified")
+        files = git.tree_files(repo / "src", "HEAD")
+        with git.BlobReader(repo) as reader:
+            contents = list(reader.read(file.blob for file in files))
+        assert contents == [(repo / "src" / file.path).read_bytes() for file in files]
+
+    def test_closing_early(self, repo: pathlib.Path) -> None:
+        blob = git.tree_files(repo, "HEAD")[0].blob
+        with git.BlobReader(repo) as reader:
+            contents = reader.read([blob] * 10_000)
+            assert next(contents) == b"import os\n"
+
+    def test_missing_blob(self, repo: pathlib.Path) -> None:
+        with git.BlobReader(repo) as reader, pytest.raises(git.GitError, match="couldn't read"):
+            list(reader.read(["0" * 40]))
+
+
+class TestFirstParentLog:
+    def test_changes_of_each_commit(self, repo: pathlib.Path) -> None:
+        src = repo / "src"
+        start = git.commit(repo, "HEAD")
+        (src / "modified.py").write_text("import os  # noqa: F401\n")
+        (src / "deleted.py").unlink()
+        (src / "added.py").write_text("import sys\n")
+        run_git(repo, "add", "-A")
+        run_git(repo, "commit", "-q", "-m", "change")
+        (repo / "outside.py").write_text("import sys\n")
+        run_git(repo, "commit", "-q", "-am", "outside")
+
+        commits = git.first_parent_log(src, start.sha)
+        assert len(commits) == 2
+        assert commits[-1].sha == git.commit(repo, "HEAD").sha
+        assert commits[-1].changes == []
+        blobs = {file.path: file.blob for file in git.tree_files(src, "HEAD")}
+        old_blobs = {file.path: file.blob for file in git.tree_files(src, start.sha)}
+        assert commits[0].changes == [
+            git.TreeChange("added.py", None, blobs["added.py"]),
+            git.TreeChange("deleted.py", old_blobs["deleted.py"], None),
+            git.TreeChange("modified.py", old_blobs["modified.py"], blobs["modified.py"]),
+        ]
+
+    def test_unknown_ref(self, repo: pathlib.Path) -> None:
+        with pytest.raises(git.GitError, match="git log failed"):
+            git.first_parent_log(repo, "not-a-ref")
@@ -0,0 +1,139 @@
+import builtins
+import os
+import pathlib
+
+import pytest
+
+from lint_ratchet import check, configuration, index, usecases
+
+
+@pytest.fixture
+def config() -> configuration.Config:
+    return configuration.Config(
+        path=pathlib.Path("."),
+        rules=[
+            configuration.Rule(configuration.Tool.NOQA, "F401", 10),
+            configuration.Rule(configuration.Tool.NOQA, "E501", 10),
+            configuration.Rule(configuration.Tool.MYPY, "assignment", 10),
+        ],
+    )
+
+
+@pytest.fixture
+def project(tmp_path: pathlib.Path) -> pathlib.Path:
+    project = tmp_path / "project"
+    (project / "pkg" / "sub").mkdir(parents=True)
+    (project / "a.py").write_text(
+        "import os  # noqa: F401\n"
+        "x: int = ''  # type: ignore[assignment]\n"
+        "import re  # noqa: F401, E501\n"
+    )
+    (project / "pkg" / "b.py").write_text("import os  # noqa: F401\n" * 3)
+    (project / "pkg" / "sub" / "c.py").write_text("import os  # noqa: F401\n")
+    (project / "clean.py").write_text("x = 1\n")
+    return project
+
+
+def update(
+    project: pathlib.Path, config: configuration.Config, path: pathlib.Path
+) -> index.ViolationIndex:
+    with index.ViolationIndex(path) as violation_index:
+        files = check.check_files(project, config, lines=True)
+        list(violation_index.record(project, config, files))
+    return index.ViolationIndex(path, create=False)
+
+
+class TestViolationIndex:
+    def test_entries(
+        self, project: pathlib.Path, config: configuration.Config, tmp_path: pathlib.Path
+    ) -> None:
+        with update(project, config, tmp_path / "index.sqlite3") as violation_index:
+            assert violation_index.entries() == [
+                index.IndexEntry("a.py", "mypy", "assignment", 1, [2]),
+                index.IndexEntry("a.py", "noqa", "E501", 1, [3]),
+                index.IndexEntry("a.py", "noqa", "F401", 2, [1, 3]),
+                index.IndexEntry("pkg/b.py", "noqa", "F401", 3, [1, 2, 3]),
+                index.IndexEntry("pkg/sub/c.py", "noqa", "F401", 1, [1]),
+            ]
+            assert [entry.path for entry in violation_index.entries(path="pkg")] == [
+                "pkg/b.py",
+                "pkg/sub/c.py",
+            ]
+            assert violation_index.entries(path="pk") == []
+            assert violation_index.entries("noqa", "E501") == [
+                index.IndexEntry("a.py", "noqa", "E501", 1, [3])
+            ]
+
+    def test_top(
+        self, project: pathlib.Path, config: configuration.Config, tmp_path: pathlib.Path
+    ) -> None:
+        with update(project, config, tmp_path / "index.sqlite3") as violation_index:
+            assert violation_index.top(rule="F401") == [
+                ("pkg/b.py", 3),
+                ("a.py", 2),
+                ("pkg/sub/c.py", 1),
+            ]
+            # Directories total their subdirectories too.
+            assert violation_index.top(by="dir") == [(".", 8), ("pkg", 4), ("pkg/sub", 1)]
+            assert violation_index.top(rule="F401", by="dir", limit=2) == [(".", 6), ("pkg", 4)]
+
+    def test_lines_come_from_the_check(
+        self,
+        project: pathlib.Path,
+        config: configuration.Config,
+        tmp_path: pathlib.Path,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        files = list(check.check_files(project, config, lines=True))
+
+        def no_reads(*args: object, **kwargs: object) -> None:
+            raise AssertionError("the index read a file again")
+
+        monkeypatch.setattr(builtins, "open", no_reads)
+        with index.ViolationIndex(tmp_path / "index.sqlite3") as violation_index:
+            list(violation_index.record(project, config, files))
+            assert violation_index.entries(path="pkg/b.py")[0].lines == [1, 2, 3]
+
+    def test_incremental_update(
+        self, project: pathlib.Path, config: configuration.Config, tmp_path: pathlib.Path
+    ) -> None:
+        path = tmp_path / "index.sqlite3"
+        update(project, config, path).close()
+
+        (project / "pkg" / "b.py").unlink()
+        (project / "clean.py").write_text("import os  # noqa: F401\n")
+        # Files with the same fingerprint aren't read again, so keep the lines they had.
+        a = project / "a.py"
+        stat = a.stat()
+        a.write_text("".join(reversed(a.read_text().splitlines(keepends=True))))
+        os.utime(a, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        with update(project, config, path) as violation_index:
+            assert violation_index.top(rule="F401") == [
+                ("a.py", 2),
+                ("clean.py", 1),
+                ("pkg/sub/c.py", 1),
+            ]
+            assert violation_index.entries(path="a.py")[0].lines == [2]
+
+    def test_rebuilt_for_other_rules(
+        self, project: pathlib.Path, config: configuration.Config, tmp_path: pathlib.Path
+    ) -> None:
+        path = tmp_path / "index.sqlite3"
+        update(project, config, path).close()
+        config = configuration.Config(path=pathlib.Path("."), rules=config.rules[1:])
+        with update(project, config, path) as violation_index:
+            assert {entry.rule for entry in violation_index.entries()} == {"E501", "assignment"}
+
+    def test_missing(self, tmp_path: pathlib.Path) -> None:
+        with pytest.raises(index.ViolationIndexError, match="ratchet check --index"):
+            index.ViolationIndex(tmp_path / "index.sqlite3", create=False)
+
+
+def test_check_records_index(
+    project: pathlib.Path, config: configuration.Config, tmp_path: pathlib.Path
+) -> None:
+    path = tmp_path / "index.sqlite3"
+    results = list(usecases.check(project, config, index_path=path))
+    assert [result.new_count for result in results] == [6, 1, 1]
+    with index.ViolationIndex(path, create=False) as violation_index:
+        assert sum(entry.count for entry in violation_index.entries()) == 8
@@ -1,5 +1,65 @@
+import pathlib
+import subprocess
+import sys
+
 import lint_ratchet as package  # fmt: skip
 
 
+# Modules that are slow to import and that `ratchet check` doesn't need for a tree without
+# files, so hooks and editors that run it often don't pay for them.
+DEFERRED_MODULES = {
+    "asyncio",
+    "concurrent.futures",
+    "csv",
+    "ctypes",
+    "http.client",
+    "importlib.metadata",
+    "lint_ratchet.archive",
+    "lint_ratchet.batch",
+    "lint_ratchet.cache",
+    "lint_ratchet.content_cache",
+    "lint_ratchet.daemon",
+    "multiprocessing",
+    "socket",
+    "subprocess",
+    "tarfile",
+    "tempfile",
+    "toml",
+}
+
+# The most time that importing the package's own modules may take for `ratchet check`, in
+# microseconds, excluding the standard library and click. This is several times what it
+# takes, to leave room for slow machines and compiling without cached bytecode.
+IMPORT_BUDGET_US = 50_000
+
+
 def test_has_docstring():
     assert package.__doc__ is not None
+
+
+def test_version_is_looked_up_lazily() -> None:
+    assert isinstance(package.__version__, str)
+
+
+def test_check_startup_imports(tmp_path: pathlib.Path) -> None:
+    (tmp_path / ".ratchet.toml").write_text('path = "."\n[noqa]\nF401 = 0\n')
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "lint_ratchet", "--root", tmp_path, "check"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    # Each line is "import time: <self us> | <cumulative us> | <indented module name>".
+    imports = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, _, name = line.removeprefix("import time:").split("|")
+        # Skips the header line.
+        if self_us.strip().isdigit():
+            imports[name.strip()] = int(self_us)
+
+    assert "lint_ratchet.cli" in imports
+    assert DEFERRED_MODULES.isdisjoint(imports)
+    own = sum(us for name, us in imports.items() if name.partition(".")[0] == "lint_ratchet")
+    assert own < IMPORT_BUDGET_US
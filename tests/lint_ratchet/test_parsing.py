@@ -1,6 +1,11 @@
 import io
+import pathlib
+import sys
+import tokenize
 from textwrap import dedent
 
+import pytest
+
 from lint_ratchet import parsing
 
 
@@ -42,3 +47,70 @@ class TestExtractComments:
             "# it's 8",
             "# you got to the bottom?",
         ]
+        fast = list(parsing.extract_comments_fast(io.BytesIO(source.encode())))
+        assert fast == suppressions
+
+
+# Sources that the fast engine has to extract exactly the same comments from as tokenize.
+DIFFERENTIAL_CORPUS = [
+    b'x = "# not a comment"  # a comment\n',
+    b"x = '# not a comment'  # a comment\n",
+    b"x = '''\n# not a comment\n'''  # a comment\n",
+    b'x = """\n# not a comment\n"""  # a comment\n',
+    b'x = """a "quoted" ""# not a comment"""  # a comment\n',
+    b'x = "escaped \\" # not a comment"  # a comment\n',
+    b'x = "continued \\\n# not a comment"  # a comment\n',
+    b'x = r"\\\\"  # a comment\n',
+    b'x = rb"\\" # not a comment"  # a comment\n',
+    b"x = u'#', B'#', Rb'#', bR'#'  # a comment\n",
+    b'x = f"{a:#x}"  # a comment\n',
+    b'x = f"{a!r:>{width}}"  # a comment\n',
+    b'x = f"{{#}}"  # a comment\n',
+    b"x = f\"{d['#']}\"  # a comment\n",
+    b'x = f"{a!=b}"  # a comment\n',
+    b'x = f"\\N{EM DASH} {a}"  # a comment\n',
+    b'x = rf"\\{a}" + fR"{b}\\\\"  # a comment\n',
+    b'x = f"""{\n    a  # a comment in an expression\n}"""  # a comment\n',
+    b"x = 1  # trailing whitespace   \r\ny = 2  # windows line endings\r\n",
+    b"x = (\n    1,  # inside brackets\n)\n",
+    b"if x:\n    pass\n# no trailing newline",
+    b"\xef\xbb\xbf# byte order mark\nx = 1\n",
+    b"# -*- coding: latin-1 -*-\nx = '\xe9'  # caf\xe9\n",
+    b"# -*- coding: shift_jis -*-\nx = '\x83\\'  # \x83\x5c\n",
+]
+if sys.version_info >= (3, 12):
+    DIFFERENTIAL_CORPUS += [
+        b'x = f"{f"{1}"}"  # a comment\n',
+        b'x = f"{"#"}"  # a comment\n',
+    ]
+
+
+class TestExtractCommentsFast:
+    @pytest.mark.parametrize("source", DIFFERENTIAL_CORPUS)
+    def test_matches_tokenize(self, source: bytes) -> None:
+        expected = list(parsing.extract_comments(io.BytesIO(source)))
+        assert list(parsing.extract_comments_fast(io.BytesIO(source))) == expected
+
+    @pytest.mark.parametrize("source", DIFFERENTIAL_CORPUS)
+    def test_lines_match_tokenize(self, source: bytes) -> None:
+        expected = list(parsing.extract_comment_lines(io.BytesIO(source)))
+        assert list(parsing.extract_comment_lines_fast(io.BytesIO(source))) == expected
+
+    @pytest.mark.parametrize(
+        "path",
+        [
+            *pathlib.Path(tokenize.__file__).parent.glob("email/*.py"),
+            *pathlib.Path(parsing.__file__).parent.glob("*.py"),
+        ],
+        ids=lambda path: f"{path.parent.name}/{path.name}",
+    )
+    def test_matches_tokenize_on_real_files(self, path: pathlib.Path) -> None:
+        source = path.read_bytes()
+        expected = list(parsing.extract_comments(io.BytesIO(source)))
+        assert list(parsing.extract_comments_fast(io.BytesIO(source))) == expected
+        expected_lines = list(parsing.extract_comment_lines(io.BytesIO(source)))
+        assert list(parsing.extract_comment_lines_fast(io.BytesIO(source))) == expected_lines
+
+    def test_unterminated_multiline_string(self) -> None:
+        with pytest.raises(tokenize.TokenError):
+            list(parsing.extract_comments_fast(io.BytesIO(b'x = """\n# never closed\n')))
@@ -0,0 +1,126 @@
+import pathlib
+from collections.abc import Iterator
+
+import pytest
+
+from lint_ratchet import cache, checkers, configuration, plugins, usecases
+
+
+def parse_nosec(prefix: str, comment: str) -> list[str]:
+    return comment[len(prefix) :].split()
+
+
+NOSEC = plugins.Plugin(prefixes=["# nosec "], parse=parse_nosec)
+PYLINT = plugins.Plugin(prefixes=["# pylint: disable="])
+NOT_A_PLUGIN = object()
+
+
+@pytest.fixture
+def installed(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[None]:
+    """
+    Install a distribution that registers the plugins in this module.
+    """
+    dist_info = tmp_path / "site" / "ratchet_plugins-1.0.dist-info"
+    dist_info.mkdir(parents=True)
+    (dist_info / "METADATA").write_text("Name: ratchet-plugins\nVersion: 1.0\n")
+    (dist_info / "entry_points.txt").write_text(
+        f"[{plugins.PLUGIN_GROUP}]\n"
+        f"nosec = {__name__}:NOSEC\n"
+        f"pylint = {__name__}:PYLINT\n"
+        f"broken = {__name__}:NOT_A_PLUGIN\n"
+        "missing = tests.lint_ratchet.no_such_module:PLUGIN\n"
+    )
+    monkeypatch.syspath_prepend(tmp_path / "site")
+    plugins.load_plugin.cache_clear()
+    plugins._entry_points.cache_clear()
+    yield
+    plugins.load_plugin.cache_clear()
+    plugins._entry_points.cache_clear()
+
+
+def read(toml: dict[str, object]) -> configuration.Config:
+    return configuration.read_configuration({"path": ".", **toml})  # type: ignore[typeddict-item]
+
+
+@pytest.mark.usefixtures("installed")
+class TestPlugins:
+    def test_plugin_names(self) -> None:
+        assert plugins.plugin_names() == {"nosec", "pylint", "broken", "missing"}
+
+    def test_read_configuration(self) -> None:
+        config = read({"noqa": {"F401": 1}, "nosec": {"B101": 2}})
+        assert config.rules == [
+            configuration.Rule(configuration.Tool.NOQA, "F401", 1),
+            configuration.Rule(configuration.Tool("nosec"), "B101", 2),
+        ]
+        assert not config.rules[1].tool.builtin
+        assert config.to_toml_dict()["nosec"] == {"B101": 2}  # type: ignore[typeddict-item]
+
+    @pytest.mark.parametrize(
+        ("section", "message"),
+        [
+            ("unknown", "No checker plugin named `unknown` is installed"),
+            ("broken", "is not a Plugin"),
+            ("missing", "could not be loaded"),
+        ],
+    )
+    def test_unusable_plugin(self, section: str, message: str) -> None:
+        with pytest.raises(configuration.RatchetMisconfiguredError, match=message):
+            read({section: {"X1": 1}})
+
+    def test_only_configured_plugins_are_loaded(self) -> None:
+        read({"nosec": {"B101": 0}})
+        assert plugins.load_plugin.cache_info().currsize == 1
+
+    def test_shared_lookup(self) -> None:
+        config = read(
+            {"noqa": {"F401": 0}, "nosec": {"B101": 0, "B602": 0}, "pylint": {"W0611": 0}}
+        )
+        shared = checkers.Checkers(checkers.get_checkers(config.rules))
+        assert len(shared) == 3
+        assert shared.markers == {b"# noqa:", b"# nosec ", b"# pylint: disable="}
+        assert sorted(
+            shared.check(
+                [
+                    "# nosec B101 B602",
+                    "# nosec B101",
+                    "# pylint: disable=W0611, C0301",
+                    "# noqa: F401",
+                    "# type: ignore[assignment]",
+                ]
+            ),
+            key=lambda violation: (violation.tool.value, violation.rule),
+        ) == [
+            checkers.Violation(configuration.Tool.NOQA, "F401", 1),
+            checkers.Violation(configuration.Tool("nosec"), "B101", 2),
+            checkers.Violation(configuration.Tool("nosec"), "B602", 1),
+            checkers.Violation(configuration.Tool("pylint"), "W0611", 1),
+        ]
+
+    @pytest.mark.parametrize("jobs", [1, 2])
+    def test_check(self, tmp_path: pathlib.Path, jobs: int) -> None:
+        (tmp_path / "a.py").write_text("assert x  # nosec B101\nimport os  # noqa: F401\n")
+        (tmp_path / "b.py").write_text("assert y  # nosec B101\n")
+        config = read({"noqa": {"F401": 1}, "nosec": {"B101": 1}})
+        results = list(usecases.check(tmp_path, config, jobs))
+        assert [result.new_count for result in results] == [1, 2]
+
+    def test_digest_includes_plugin_version(self, tmp_path: pathlib.Path) -> None:
+        rules = read({"nosec": {"B101": 0}}).rules
+        digest = cache.ruleset_digest(rules)
+        metadata = tmp_path / "site" / "ratchet_plugins-1.0.dist-info" / "METADATA"
+        metadata.write_text("Name: ratchet-plugins\nVersion: 2.0\n")
+        assert cache.ruleset_digest(rules) != digest
+
+
+def test_tool_lookup() -> None:
+    assert configuration.Tool("noqa") is configuration.Tool.NOQA
+    assert configuration.Tool.NOQA.builtin
+    assert configuration.Tool("custom") is configuration.Tool("custom")
+    assert list(configuration.Tool) == [
+        configuration.Tool.NOQA,
+        configuration.Tool.FIXIT_FIXME,
+        configuration.Tool.FIXIT_IGNORE,
+        configuration.Tool.FIXIT_ANY,
+        configuration.Tool.MYPY,
+    ]
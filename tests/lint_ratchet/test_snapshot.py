@@ -0,0 +1,109 @@
+import dataclasses
+import io
+import pathlib
+
+import pytest
+
+from lint_ratchet import configuration, snapshot, usecases
+from lint_ratchet.checkers import Violation
+
+
+def make_project(root: pathlib.Path) -> configuration.Config:
+    for i in range(10):
+        (root / f"m{i}.py").write_text("import os  # noqa: F401\n" * i)
+    (root / "pkg").mkdir()
+    (root / "pkg" / "a.py").write_text("import os  # noqa: F401, E501\n")
+    return configuration.Config(
+        path=pathlib.Path("."),
+        rules=[
+            configuration.Rule(configuration.Tool.NOQA, "F401", 50),
+            configuration.Rule(configuration.Tool.NOQA, "E501", 0),
+        ],
+    )
+
+
+class TestScan:
+    def test_shards_cover_every_file_once(self, tmp_path: pathlib.Path) -> None:
+        config = make_project(tmp_path)
+        shards = [usecases.scan(tmp_path, config, shard=(i, 3)) for i in (1, 2, 3)]
+        assert sum(shard.file_count for shard in shards) == 11
+        paths = [path for shard in shards for path in shard.files]
+        assert sorted(paths) == sorted([*(f"m{i}.py" for i in range(1, 10)), "pkg/a.py"])
+
+        merged = snapshot.merge(shards)
+        assert merged.complete
+        assert merged.file_count == 11
+        results = [
+            usecases.CheckResult(rule, count)
+            for rule, count in zip(config.rules, merged.counts(config).totals.array)
+        ]
+        assert results == list(usecases.check(tmp_path, config))
+
+    def test_unsharded(self, tmp_path: pathlib.Path) -> None:
+        config = make_project(tmp_path)
+        scanned = usecases.scan(tmp_path, config)
+        assert scanned.complete
+        assert scanned.files["pkg/a.py"] == [
+            Violation(configuration.Tool.NOQA, "F401", 1),
+            Violation(configuration.Tool.NOQA, "E501", 1),
+        ]
+        results = list(usecases.check(tmp_path, config, snapshot=scanned))
+        assert [result.new_count for result in results] == [46, 1]
+
+
+class TestSnapshot:
+    def test_roundtrip(self, tmp_path: pathlib.Path) -> None:
+        scanned = usecases.scan(tmp_path, make_project(tmp_path), shard=(2, 3))
+        fp = io.StringIO()
+        snapshot.write_snapshot(scanned, fp)
+        fp.seek(0)
+        assert snapshot.read_snapshot(fp) == scanned
+
+    @pytest.mark.parametrize("text", ["not json", "{}", '{"format": 99}', "[]"])
+    def test_invalid(self, text: str) -> None:
+        with pytest.raises(snapshot.SnapshotError):
+            snapshot.read_snapshot(io.StringIO(text))
+
+    def test_incomplete(self, tmp_path: pathlib.Path) -> None:
+        config = make_project(tmp_path)
+        scanned = usecases.scan(tmp_path, config, shard=(2, 3))
+        with pytest.raises(snapshot.SnapshotError, match="missing shards 1, 3 of 3"):
+            scanned.counts(config)
+
+    def test_different_rules(self, tmp_path: pathlib.Path) -> None:
+        config = make_project(tmp_path)
+        scanned = usecases.scan(tmp_path, config)
+        config = dataclasses.replace(config, rules=config.rules[:1])
+        with pytest.raises(snapshot.SnapshotError, match="different configuration"):
+            scanned.counts(config)
+
+    def test_different_excluded_folders(self, tmp_path: pathlib.Path) -> None:
+        config = make_project(tmp_path)
+        scanned = usecases.scan(tmp_path, config)
+        config = dataclasses.replace(config, excluded_folders=["pkg"])
+        with pytest.raises(snapshot.SnapshotError, match="different configuration"):
+            scanned.counts(config)
+        with pytest.raises(snapshot.SnapshotError, match="different configuration"):
+            list(usecases.check(tmp_path, config, snapshot=scanned))
+
+
+class TestMerge:
+    def test_overlapping_shards(self, tmp_path: pathlib.Path) -> None:
+        config = make_project(tmp_path)
+        shard = usecases.scan(tmp_path, config, shard=(1, 2))
+        with pytest.raises(snapshot.SnapshotError, match="Shard 1 is in more than one"):
+            snapshot.merge([shard, shard])
+
+    def test_different_shard_counts(self, tmp_path: pathlib.Path) -> None:
+        config = make_project(tmp_path)
+        with pytest.raises(snapshot.SnapshotError, match="number of shards"):
+            snapshot.merge(
+                [
+                    usecases.scan(tmp_path, config, shard=(1, 2)),
+                    usecases.scan(tmp_path, config, shard=(2, 3)),
+                ]
+            )
+
+    def test_nothing_to_merge(self) -> None:
+        with pytest.raises(snapshot.SnapshotError):
+            snapshot.merge([])
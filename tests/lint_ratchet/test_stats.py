@@ -0,0 +1,44 @@
+import json
+
+from lint_ratchet import stats
+
+
+class TestStats:
+    def test_keeps_the_slowest_files(self):
+        recorded = stats.Stats("check", slowest_count=2)
+        for i, seconds in enumerate([0.3, 0.1, 0.5, 0.2]):
+            recorded.add_file(stats.FileStats(f"{i}.py", 10, read=seconds))
+        assert [f.path for f in recorded.slowest] == ["2.py", "0.py"]
+        assert recorded.files_read == 4
+        assert recorded.bytes_read == 40
+        assert round(recorded.phases["read"], 6) == 1.1
+
+    def test_json_layout_is_stable(self):
+        recorded = stats.Stats("crank")
+        recorded.start()
+        recorded.files = 1
+        recorded.add_file(stats.FileStats("a.py", 3, read=0.1, extract=0.2, check=0.3))
+        recorded.stop(None)
+        report = json.loads(json.dumps(recorded.to_json()))
+        assert list(report) == [
+            "format",
+            "command",
+            "elapsed_seconds",
+            "phases",
+            "files",
+            "files_read",
+            "bytes_read",
+            "files_per_second",
+            "cache",
+            "content_cache",
+            "peak_rss_bytes",
+            "slowest_files",
+        ]
+        assert list(report["phases"]) == list(stats.PHASES)
+        assert report["slowest_files"] == [
+            {"path": "a.py", "bytes": 3, "seconds": 0.6, "read": 0.1, "extract": 0.2, "check": 0.3}
+        ]
+
+    def test_phase_is_a_no_op_without_stats(self):
+        with stats.phase(None, "walk"):
+            pass
@@ -1,6 +1,13 @@
+import os
 import pathlib
+import tracemalloc
+from collections.abc import Iterable, Iterator
 
-from lint_ratchet import configuration, usecases
+import pytest
+
+from lint_ratchet import check, configuration, git, usecases
+from lint_ratchet.cache import ResultCache
+from tests.lint_ratchet.test_git import run_git
 
 
 class TestCheck:
@@ -27,3 +34,401 @@ class TestCheck:
         )
         results = list(usecases.check(check_dir, config))
         assert results == [usecases.CheckResult(rule=config.rules[0], new_count=2)]
+
+    def test_same_code_for_different_tools(self, tmp_path: pathlib.Path) -> None:
+        (tmp_path / "a.py").write_text(
+            "try:  # lint-fixme: NoBareExcept\n"
+            "    pass\n"
+            "except:  # lint-ignore: NoBareExcept\n"
+            "    pass\n"
+        )
+        config = configuration.Config(
+            path=pathlib.Path("."),
+            rules=[
+                configuration.Rule(configuration.Tool.FIXIT_FIXME, "NoBareExcept", 0),
+                configuration.Rule(configuration.Tool.FIXIT_IGNORE, "NoBareExcept", 0),
+                configuration.Rule(configuration.Tool.FIXIT_ANY, "NoBareExcept", 0),
+            ],
+        )
+        results = list(usecases.check(tmp_path, config))
+        assert [result.new_count for result in results] == [1, 1, 2]
+
+    def test_fail_fast(self, tmp_path: pathlib.Path) -> None:
+        for i in range(10):
+            (tmp_path / f"{i}.py").write_text("import os  # noqa: F401\n")
+        config = configuration.Config(
+            path=pathlib.Path("."),
+            rules=[
+                configuration.Rule(configuration.Tool.NOQA, "F401", 1),
+                configuration.Rule(configuration.Tool.NOQA, "E501", 0),
+            ],
+        )
+        results = list(usecases.check(tmp_path, config, fail_fast=True))
+        assert results == [
+            usecases.FailFastResult(rule=config.rules[0], new_count=2, files_checked=2)
+        ]
+        assert results[0].failure
+
+    def test_fail_fast_passing(self, tmp_path: pathlib.Path) -> None:
+        (tmp_path / "a.py").write_text("import os  # noqa: F401\n")
+        config = configuration.Config(
+            path=pathlib.Path("."),
+            rules=[configuration.Rule(configuration.Tool.NOQA, "F401", 1)],
+        )
+        results = list(usecases.check(tmp_path, config, fail_fast=True))
+        assert results == [usecases.CheckResult(rule=config.rules[0], new_count=1)]
+
+    def test_fail_fast_keeps_the_cache(self, tmp_path: pathlib.Path) -> None:
+        for i in range(10):
+            (tmp_path / f"{i}.py").write_text("import os  # noqa: F401\n")
+        config = configuration.Config(
+            path=pathlib.Path("."),
+            rules=[configuration.Rule(configuration.Tool.NOQA, "F401", 1)],
+        )
+        cache_dir = tmp_path / ".ratchet_cache"
+        list(usecases.check(tmp_path, config, cache_dir=cache_dir))
+
+        results = list(usecases.check(tmp_path, config, cache_dir=cache_dir, fail_fast=True))
+        assert results[0] == usecases.FailFastResult(config.rules[0], 2, 2)
+        cache = ResultCache(cache_dir, config.rules)
+        assert cache.complete
+        assert len(cache.unseen()) == 10
+
+        # The files that weren't reached still count as a baseline for changed files.
+        changed = usecases.check(tmp_path, config, cache_dir=cache_dir, changed_paths=[])
+        assert [result.new_count for result in changed] == [10]
+
+    def test_changed_since_after_commit(self, tmp_path: pathlib.Path) -> None:
+        config = configuration.Config(
+            path=pathlib.Path("."),
+            rules=[configuration.Rule(configuration.Tool.NOQA, "F401", 0)],
+        )
+        cache_dir = tmp_path / ".ratchet_cache"
+        (tmp_path / ".gitignore").write_text(".ratchet_cache/\n")
+        (tmp_path / "edited.py").write_text("import os  # noqa: F401\n")
+        run_git(tmp_path, "init", "-q")
+        run_git(tmp_path, "add", "-A")
+        run_git(tmp_path, "commit", "-q", "-m", "first")
+        assert [
+            result.new_count for result in usecases.check(tmp_path, config, cache_dir=cache_dir)
+        ] == [1]
+
+        # Commit an edit and a new file after the cache was saved, then check the changes
+        # since the new commit, which are none.
+        (tmp_path / "edited.py").write_text("import os  # noqa: F401\nimport re  # noqa: F401\n")
+        (tmp_path / "added.py").write_text("import os  # noqa: F401\n")
+        run_git(tmp_path, "add", "-A")
+        run_git(tmp_path, "commit", "-q", "-m", "second")
+        changed = git.changed_files(tmp_path, "HEAD")
+        assert changed == []
+        results = usecases.check(tmp_path, config, cache_dir=cache_dir, changed_paths=changed)
+        assert [result.new_count for result in results] == [3]
+
+    def test_memory_does_not_grow_with_files(
+        self, tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr(check, "WALK_QUEUE_SIZE", 2)
+        monkeypatch.setattr(check, "WALK_BATCH_SIZE", 4)
+        monkeypatch.setattr(check, "READAHEAD_DEPTH", 4)
+        config = configuration.Config(
+            path=pathlib.Path("."),
+            rules=[
+                configuration.Rule(configuration.Tool.NOQA, "F401", 0),
+                configuration.Rule(configuration.Tool.MYPY, "assignment", 0),
+            ],
+        )
+        source = "import os  # noqa: F401, E501\nx: int = ''  # type: ignore[assignment]\n"
+
+        def peak_memory(root: pathlib.Path, directories: int) -> int:
+            for i in range(directories):
+                directory = root / f"d{i % 10}" / f"e{i}"
+                directory.mkdir(parents=True)
+                for j in range(30):
+                    (directory / f"m{j}.py").write_text(source)
+            # Warm up first, so that one-off allocations like imports aren't counted.
+            list(usecases.check(root, config, jobs=1))
+            tracemalloc.start()
+            try:
+                results = list(usecases.check(root, config, jobs=1))
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+            assert [result.new_count for result in results] == [30 * directories] * 2
+            return peak
+
+        small = peak_memory(tmp_path / "small", 10)
+        large = peak_memory(tmp_path / "large", 100)
+        assert large < small * 1.5
+
+
+class TestDirectoryBudgets:
+    @pytest.fixture
+    def project(self, tmp_path: pathlib.Path) -> pathlib.Path:
+        (tmp_path / "billing" / "api").mkdir(parents=True)
+        (tmp_path / "auth").mkdir()
+        (tmp_path / "billing" / "a.py").write_text("import os  # noqa: F401\n")
+        (tmp_path / "billing" / "api" / "b.py").write_text("import os  # noqa: F401\n" * 2)
+        (tmp_path / "auth" / "c.py").write_text("import os  # noqa: F401, E501\n")
+        return tmp_path
+
+    def config(self, *rules: configuration.Rule) -> configuration.Config:
+        return configuration.Config(path=pathlib.Path("."), rules=list(rules))
+
+    def test_check(self, project: pathlib.Path) -> None:
+        noqa = configuration.Tool.NOQA
+        config = self.config(
+            configuration.Rule(noqa, "F401", 10),
+            configuration.Rule(noqa, "F401", 2, "billing"),
+            configuration.Rule(noqa, "F401", 2, "billing/api"),
+            configuration.Rule(noqa, "E501", 0, "billing"),
+        )
+        results = list(usecases.check(project, config))
+        assert [(result.new_count, result.failure) for result in results] == [
+            (4, False),
+            (3, True),
+            (2, False),
+            (0, False),
+        ]
+
+    def test_fail_fast(self, project: pathlib.Path) -> None:
+        config = self.config(
+            configuration.Rule(configuration.Tool.NOQA, "F401", 10),
+            configuration.Rule(configuration.Tool.NOQA, "F401", 1, "billing/api"),
+        )
+        results = list(usecases.check(project, config, fail_fast=True))
+        assert len(results) == 1
+        assert isinstance(results[0], usecases.FailFastResult)
+        assert results[0].rule == config.rules[1]
+
+    def test_crank_tightens_each_budget(self, project: pathlib.Path) -> None:
+        noqa = configuration.Tool.NOQA
+        config = self.config(
+            configuration.Rule(noqa, "F401", 4),
+            configuration.Rule(noqa, "E501", 1),
+            configuration.Rule(noqa, "F401", 5, "billing"),
+            configuration.Rule(noqa, "F401", 2, "billing/api"),
+            configuration.Rule(noqa, "F401", 3, "auth"),
+        )
+        cranked = usecases.crank(project, config, project)
+        assert [(result.rule.name, result.new_count) for result in cranked] == [
+            ('noqa."billing".F401', 3),
+            ('noqa."auth".F401', 1),
+        ]
+        # The rules that weren't cranked are written back unchanged.
+        assert configuration.open_configuration(project).rules == [
+            configuration.Rule(noqa, "F401", 4),
+            configuration.Rule(noqa, "E501", 1),
+            configuration.Rule(noqa, "F401", 3, "billing"),
+            configuration.Rule(noqa, "F401", 2, "billing/api"),
+            configuration.Rule(noqa, "F401", 1, "auth"),
+        ]
+
+    def test_changed_files(self, project: pathlib.Path, tmp_path: pathlib.Path) -> None:
+        config = self.config(configuration.Rule(configuration.Tool.NOQA, "F401", 1, "billing"))
+        cache_dir = tmp_path / "cache"
+        assert [
+            result.new_count for result in usecases.check(project, config, cache_dir=cache_dir)
+        ] == [3]
+        changed = project / "billing" / "a.py"
+        changed.write_text("import os\n")
+        results = usecases.check(project, config, cache_dir=cache_dir, changed_paths=[changed])
+        assert [result.new_count for result in results] == [2]
+
+
+class TestInit:
+    @pytest.fixture
+    def project(self, tmp_path: pathlib.Path) -> pathlib.Path:
+        (tmp_path / "src").mkdir()
+        (tmp_path / "src" / "a.py").write_text(
+            "import os  # noqa: F401, E501\n"
+            "x: int = ''  # type: ignore[assignment]\n"
+            "# lint-fixme: NoBareExcept\n"
+        )
+        (tmp_path / "src" / "b.py").write_text("import os  # noqa: F401\n")
+        return tmp_path
+
+    def test_discover(self, project: pathlib.Path) -> None:
+        config = configuration.Config(path=pathlib.Path("src"), rules=[])
+        rules = usecases.discover(project / "src", config)
+        assert rules == [
+            configuration.Rule(configuration.Tool.NOQA, "E501", 1),
+            configuration.Rule(configuration.Tool.NOQA, "F401", 2),
+            configuration.Rule(configuration.Tool.FIXIT_ANY, "NoBareExcept", 1),
+            configuration.Rule(configuration.Tool.MYPY, "assignment", 1),
+        ]
+
+    def test_init_writes_passing_configuration(self, project: pathlib.Path) -> None:
+        config = usecases.init(project, "src", [configuration.Tool.NOQA])
+        written = configuration.open_configuration(project)
+        assert written == config
+        assert written.path == pathlib.Path("src")
+        assert written.excluded_folders == configuration.DEFAULT_EXCLUDE
+        assert [rule.name for rule in written.rules] == ["noqa.E501", "noqa.F401"]
+        results = usecases.check(project / "src", written)
+        assert not any(result.failure for result in results)
+
+
+class TestAdd:
+    @pytest.fixture
+    def project(self, tmp_path: pathlib.Path) -> pathlib.Path:
+        (tmp_path / "billing").mkdir()
+        (tmp_path / "a.py").write_text("import os  # noqa: F401\n")
+        (tmp_path / "billing" / "b.py").write_text("import os  # noqa: F401, E501\n")
+        return tmp_path
+
+    def config(self) -> configuration.Config:
+        return configuration.Config(
+            path=pathlib.Path("."), rules=[configuration.Rule(configuration.Tool.NOQA, "E501", 1)]
+        )
+
+    def test_add(self, project: pathlib.Path) -> None:
+        rule = usecases.add(project, self.config(), project, "noqa", "F401")
+        assert rule == configuration.Rule(configuration.Tool.NOQA, "F401", 2)
+        assert configuration.open_configuration(project).rules == [*self.config().rules, rule]
+
+    def test_add_directory(self, project: pathlib.Path) -> None:
+        rule = usecases.add(project, self.config(), project, "noqa", "F401", "billing/")
+        assert rule == configuration.Rule(configuration.Tool.NOQA, "F401", 1, "billing")
+
+    def test_already_added(self, project: pathlib.Path) -> None:
+        with pytest.raises(configuration.RatchetMisconfiguredError, match="already ratcheted"):
+            usecases.add(project, self.config(), project, "noqa", "E501")
+        assert not (project / configuration.CONFIG_FILE_NAME).exists()
+
+    def test_unknown_tool(self, project: pathlib.Path) -> None:
+        with pytest.raises(configuration.RatchetMisconfiguredError, match="No checker plugin"):
+            usecases.add(project, self.config(), project, "pylint", "W0611")
+
+
+class TestCheckConfigs:
+    def test_matches_checking_each_config(
+        self, tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        files = {
+            "a.py": "import os  # noqa: F401\n",
+            "services/api/b.py": "import os  # noqa: F401\nx: int = ''  # type: ignore[assignment]\n",
+            "services/api/gen/c.py": "import os  # noqa: F401\n",
+            "services/web/d.py": "import os  # noqa: F401, E501\n",
+        }
+        for name, contents in files.items():
+            (tmp_path / name).parent.mkdir(parents=True, exist_ok=True)
+            (tmp_path / name).write_text(contents)
+        (tmp_path / ".ratchet.toml").write_text('path = "."\n[noqa]\nF401 = 1\n')
+        (tmp_path / "services/api/.ratchet.toml").write_text(
+            'path = "."\nexclude = ["gen/"]\n[noqa]\nF401 = 1\n[mypy]\nassignment = 1\n'
+        )
+        (tmp_path / "services/web/.ratchet.toml").write_text('path = "."\n[noqa]\nE501 = 0\n')
+        configs = configuration.find_configurations(tmp_path)
+
+        read = []
+        original_read = check._read
+
+        def spy(path: str | os.PathLike[str]) -> bytes:
+            read.append(os.fspath(path))
+            return original_read(path)
+
+        monkeypatch.setattr(check, "_read", spy)
+        config_results = usecases.check_configs(configs)
+        assert sorted(read) == sorted(str(tmp_path / name) for name in files)
+
+        for (root, config), result in zip(configs, config_results):
+            assert result.root == root
+            assert result.results == list(usecases.check(root / config.path, config))
+        assert [[r.new_count for r in result.results] for result in config_results] == [
+            [4],
+            [1, 1],
+            [1],
+        ]
+
+
+class TestHistory:
+    def test_matches_checking_each_commit(
+        self, tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        config = configuration.Config(
+            path=pathlib.Path("."),
+            rules=[
+                configuration.Rule(configuration.Tool.NOQA, "F401", 0),
+                configuration.Rule(configuration.Tool.MYPY, "misc", 0),
+            ],
+            excluded_folders=["excluded"],
+        )
+        noqa = "import os  # noqa: F401\n"
+        ignore = "x = 1  # type: ignore[misc]\n"
+        run_git(tmp_path, "init", "-q")
+        (tmp_path / "excluded").mkdir()
+        (tmp_path / "excluded" / "a.py").write_text(noqa)
+        (tmp_path / "a.py").write_text(noqa)
+        (tmp_path / "b.py").write_text(noqa)
+        run_git(tmp_path, "add", "-A")
+        run_git(tmp_path, "commit", "-q", "-m", "1")
+        commits: list[dict[str, str | None]] = [
+            {"a.py": noqa * 2, "c.py": noqa},
+            {"b.py": None, "a.py": ignore},
+            {"excluded/a.py": noqa * 5},
+            {"a.py": noqa * 2, "d.py": ignore},
+        ]
+        for message, changes in enumerate(commits, start=2):
+            for name, source in changes.items():
+                if source is None:
+                    (tmp_path / name).unlink()
+                else:
+                    (tmp_path / name).write_text(source)
+            run_git(tmp_path, "add", "-A")
+            run_git(tmp_path, "commit", "-q", "-m", f"{message}")
+
+        read: list[str] = []
+        original_read = git.BlobReader.read
+
+        def spy(reader: git.BlobReader, blobs: Iterable[str]) -> Iterator[bytes]:
+            blobs = list(blobs)
+            read.extend(blobs)
+            return original_read(reader, blobs)
+
+        monkeypatch.setattr(git.BlobReader, "read", spy)
+        entries = list(usecases.history(tmp_path, config, "HEAD~4"))
+        assert len(read) == len(set(read))
+        monkeypatch.undo()
+
+        assert [entry.commit.sha for entry in entries] == [
+            git.commit(tmp_path, f"HEAD~{i}").sha for i in range(4, -1, -1)
+        ]
+        for entry in entries:
+            expected = list(usecases.check(tmp_path, config, rev=entry.commit.sha))
+            assert entry.results == expected
+        assert [[result.new_count for result in entry.results] for entry in entries] == [
+            [2, 0],
+            [4, 0],
+            [1, 1],
+            [1, 1],
+            [3, 1],
+        ]
+
+    def test_merge_commits(self, tmp_path: pathlib.Path) -> None:
+        config = configuration.Config(
+            path=pathlib.Path("."),
+            rules=[configuration.Rule(configuration.Tool.NOQA, "F401", 0)],
+        )
+        noqa = "import os  # noqa: F401\n"
+        run_git(tmp_path, "init", "-q", "-b", "main")
+        (tmp_path / "a.py").write_text(noqa)
+        run_git(tmp_path, "add", "-A")
+        run_git(tmp_path, "commit", "-q", "-m", "1")
+        run_git(tmp_path, "checkout", "-q", "-b", "side")
+        (tmp_path / "b.py").write_text(noqa * 3)
+        run_git(tmp_path, "add", "-A")
+        run_git(tmp_path, "commit", "-q", "-m", "2")
+        run_git(tmp_path, "checkout", "-q", "main")
+        (tmp_path / "a.py").write_text(noqa * 2)
+        run_git(tmp_path, "commit", "-q", "-am", "3")
+        run_git(tmp_path, "merge", "-q", "--no-ff", "-m", "4", "side")
+
+        entries = list(usecases.history(tmp_path, config, "HEAD~2"))
+        assert [entry.commit.sha for entry in entries] == [
+            git.commit(tmp_path, rev).sha for rev in ("HEAD~2", "HEAD~1", "HEAD")
+        ]
+        assert [[result.new_count for result in entry.results] for entry in entries] == [
+            [1],
+            [2],
+            [5],
+        ]